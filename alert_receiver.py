@@ -0,0 +1,79 @@
+"""
+Local Webhook Receiver for IPAM System
+Stand-in endpoint for IPAM_ALERT_SINKS=webhook and IPAM_WEBHOOK_DESTINATIONS; prints every alert and
+change event batch it receives. --fail-rate answers that share of batches with 503 to exercise retries.
+
+Usage:
+    python alert_receiver.py [port] [--fail-rate 0.3]
+    IPAM_ALERT_SINKS=log,webhook IPAM_ALERT_WEBHOOK_URL=http://127.0.0.1:5099/alerts python main_server.py
+    IPAM_WEBHOOK_DESTINATIONS=local=http://127.0.0.1:5099/events python main_server.py
+"""
+
+import sys
+import json
+import random
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+EVENT_ICONS = {'triggered': '🚨', 'reminder': '🔁', 'resolved': '✅',
+               'reserve': '📌', 'release': '🔓', 'import': '📥'}
+
+class AlertHandler(BaseHTTPRequestHandler):
+    """Accept POSTed alert and change event batches"""
+
+    fail_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        if random.random() < self.fail_rate:
+            print(f"💥 Rejected batch {self.headers.get('X-IPAM-Batch', '')}")
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        for alert in payload.get('alerts', []):
+            icon = EVENT_ICONS.get(alert.get('event'), '📣')
+            print(f"{icon} {alert.get('at')} {alert.get('event'):<9} {alert.get('alert_type'):<11} "
+                  f"{alert.get('subnet'):<18} {alert.get('utilization')}% "
+                  f"(threshold {alert.get('threshold_percentage')}%)")
+
+        if payload.get('events'):
+            print(f"📦 {payload.get('destination')} batch {self.headers.get('X-IPAM-Batch', '')}: "
+                  f"{len(payload['events'])} events")
+        for event in payload.get('events', []):
+            icon = EVENT_ICONS.get(event.get('event'), '📣')
+            print(f"   {icon} #{event.get('id')} {event.get('at')} {event.get('event'):<8} "
+                  f"{event.get('ip_address') or '':<16} {event.get('subnet') or '':<18} {event.get('status') or ''}")
+
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    """Main function"""
+    args = sys.argv[1:]
+    if '--fail-rate' in args:
+        index = args.index('--fail-rate')
+        AlertHandler.fail_rate = float(args[index + 1])
+        del args[index:index + 2]
+    port = int(args[0]) if args else 5099
+    print("🚀 IPAM Webhook Receiver")
+    print("=" * 50)
+    print(f"🌐 Listening on http://127.0.0.1:{port}/alerts and http://127.0.0.1:{port}/events")
+    if AlertHandler.fail_rate:
+        print(f"💥 Failing {AlertHandler.fail_rate:.0%} of batches")
+    try:
+        HTTPServer(('127.0.0.1', port), AlertHandler).serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+if __name__ == "__main__":
+    main()
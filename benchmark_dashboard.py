@@ -0,0 +1,88 @@
+"""
+Dashboard Query Benchmark for IPAM System
+Times the main dashboard endpoints and counts the InnoDB rows each one reads, so the effect of
+archiving dead sections (python migrate_database.py --archive-section NAME) can be compared
+
+Usage:
+    python benchmark_dashboard.py --save before.json
+    python migrate_database.py --archive-section Delete_True
+    python benchmark_dashboard.py --compare before.json
+"""
+
+import sys
+import json
+import time
+
+from main_server import app, get_db_connection
+
+ENDPOINTS = [
+    '/api/statistics',
+    '/api/charts-data',
+    '/api/sections',
+    '/api/ip-data?limit=100',
+    '/api/search?q=10.&limit=50',
+    '/api/available-subnets',
+]
+
+def rows_read(cursor):
+    """Server-wide InnoDB rows read so far (run on an otherwise quiet server)"""
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_rows_read'")
+    return int(cursor.fetchone()[1])
+
+def measure(client, cursor, path, repeat=3):
+    """Best wall time and rows read of one endpoint"""
+    best = None
+    rows = None
+    for _ in range(repeat):
+        before = rows_read(cursor)
+        started = time.perf_counter()
+        response = client.get(path)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+        rows = rows_read(cursor) - before
+        best = elapsed if best is None else min(best, elapsed)
+    return {'ms': round(best * 1000, 1), 'rows_read': rows}
+
+def main():
+    """Main function"""
+    print("🚀 Dashboard Query Benchmark")
+    print("=" * 70)
+
+    connection = get_db_connection()
+    if not connection:
+        print("❌ Database connection failed")
+        sys.exit(1)
+    cursor = connection.cursor()
+
+    baseline = {}
+    if '--compare' in sys.argv:
+        with open(sys.argv[sys.argv.index('--compare') + 1], encoding='utf-8') as handle:
+            baseline = json.load(handle)
+
+    client = app.test_client()
+    results = {}
+    print(f"   {'endpoint':<30} {'time':>10} {'rows read':>12} {'before':>22}")
+    for path in ENDPOINTS:
+        try:
+            results[path] = measure(client, cursor, path)
+        except Exception as e:
+            print(f"   ❌ {path}: {e}")
+            continue
+        result = results[path]
+        line = f"   {path:<30} {result['ms']:>7.1f} ms {result['rows_read']:>12}"
+        if path in baseline:
+            line += f"   {baseline[path]['ms']:>7.1f} ms {baseline[path]['rows_read']:>10}"
+        print(line)
+
+    cursor.close()
+    connection.close()
+
+    if '--save' in sys.argv:
+        output = sys.argv[sys.argv.index('--save') + 1]
+        with open(output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"\n✅ Saved results to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+JSON Serialization Benchmark for IPAM API responses
+Compares response size and encode time of the legacy per-row conversion path,
+the FastJSONProvider (stdlib and orjson backends) and the columnar list format
+"""
+
+import json
+import time
+import ipaddress
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from main_server import app, json_default, to_columnar, SUBNET_IP_COLUMNS
+
+COLUMNS = SUBNET_IP_COLUMNS + ['utilization']
+
+def build_rows(subnet='10.20.0.0/16'):
+    """Build rows shaped like the /api/subnet-all-ips payload"""
+    network = ipaddress.ip_network(subnet)
+    base_time = datetime(2024, 1, 1, 8, 0, 0)
+    rows = []
+    for index, ip in enumerate(network.hosts()):
+        used = index % 3 == 0
+        rows.append({
+            'ip_address': str(ip),
+            'status': 'used' if used else 'available',
+            'hostname': f'host-{index}' if used else '',
+            'description': 'Interface: ge-0/0/1 | core' if used else '',
+            'vrf_vpn': 'CORP-VRF' if used else 'Default',
+            'utilization': Decimal('12.50'),
+            'created_at': base_time + timedelta(minutes=index) if used else None,
+            'updated_at': base_time + timedelta(minutes=index * 2) if used else None
+        })
+    return rows
+
+def legacy_encode(rows):
+    """Per-row isoformat() loop followed by the stdlib encoder (previous behaviour)"""
+    converted = []
+    for row in rows:
+        row = dict(row)
+        row['created_at'] = row['created_at'].isoformat() if row['created_at'] else None
+        row['updated_at'] = row['updated_at'].isoformat() if row['updated_at'] else None
+        row['utilization'] = float(row['utilization'])
+        converted.append(row)
+    return json.dumps({'ips': converted}, sort_keys=True).encode('utf-8')
+
+def measure(label, encode, repeat=3):
+    """Run encode a few times and print the best time and the payload size"""
+    best = None
+    payload = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = encode()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"   {label:<32} {len(payload) / 1024:>10.1f} KB {best * 1000:>10.1f} ms")
+
+def main():
+    """Main function"""
+    print("🚀 JSON Serialization Benchmark")
+    print("=" * 60)
+
+    rows = build_rows()
+    print(f"📋 Rows: {len(rows)}")
+    print(f"   {'encoder':<32} {'size':>13} {'encode':>13}")
+
+    provider = app.json
+    measure('legacy (isoformat loop + json)', lambda: legacy_encode(rows))
+
+    app.config['JSON_BACKEND'] = 'stdlib'
+    measure('provider stdlib (rows)', lambda: provider.encode_bytes({'ips': rows}))
+    measure('provider stdlib (columnar)', lambda: provider.encode_bytes({'ips': to_columnar(rows, COLUMNS)}))
+
+    app.config['JSON_BACKEND'] = 'auto'
+    if provider._use_orjson():
+        measure('provider orjson (rows)', lambda: provider.encode_bytes({'ips': rows}))
+        measure('provider orjson (columnar)', lambda: provider.encode_bytes({'ips': to_columnar(rows, COLUMNS)}))
+    else:
+        print("⚠️  orjson is not installed - skipping orjson measurements")
+
+    # Sanity check: the fast path must produce the same data as the legacy path
+    legacy = json.loads(legacy_encode(rows))
+    fast = json.loads(provider.encode_bytes({'ips': rows}))
+    print("✅ Outputs match" if legacy == fast else "❌ Outputs differ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Analytics Snapshot Exporter for IPAM System
+Writes ip_inventory, subnets and per-subnet utilization as compressed Parquet files
+
+Usage:
+    python export_snapshot.py [output_dir] [table ...]
+"""
+
+import sys
+from datetime import datetime
+
+from main_server import write_snapshot, SNAPSHOT_QUERIES
+
+def main():
+    """Main function"""
+    print("🚀 IPAM Analytics Snapshot Export")
+    print("=" * 50)
+
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else f"snapshots/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    tables = sys.argv[2:] or list(SNAPSHOT_QUERIES)
+
+    unknown = [table for table in tables if table not in SNAPSHOT_QUERIES]
+    if unknown:
+        print(f"❌ Unknown tables: {', '.join(unknown)} (choose from {', '.join(SNAPSHOT_QUERIES)})")
+        sys.exit(1)
+
+    try:
+        results = write_snapshot(output_dir, tables)
+    except Exception as e:
+        print(f"❌ Snapshot export failed: {e}")
+        sys.exit(1)
+
+    print("✅ Snapshot completed")
+    for table_name, info in results.items():
+        print(f"   - {table_name}: {info['rows']} rows")
+    print(f"\n📊 Load with: pandas.read_parquet('{output_dir}/ip_inventory.parquet')")
+
+if __name__ == "__main__":
+    main()
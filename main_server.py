@@ -4,16 +4,30 @@ Simple IP Address Management System
 Only IP Management functionality
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response, Response, send_file, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 import mysql.connector
+import mysql.connector.pooling
 from mysql.connector import Error
 import json
 import ipaddress
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from decimal import Decimal
 import csv
 import io
 from werkzeug.utils import secure_filename
 import os
+import tempfile
+import threading
+import concurrent.futures
+import queue
+import itertools
+import functools
+import bisect
+import time
+import zlib
+import urllib.request
+import hashlib
 
 app = Flask(__name__)
 
@@ -28,6 +42,466 @@ def allowed_file(filename):
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# ================== JSON SERIALIZATION ==================
+# orjson is optional; without it the stdlib encoder is used with the same type handling
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 'auto' uses orjson when installed, 'stdlib' forces the json module
+app.config['JSON_BACKEND'] = os.environ.get('IPAM_JSON_BACKEND', 'auto')
+
+def json_default(value):
+    """Serialize the types MySQL hands back that JSON does not know about"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # SUM()/AVG() return Decimal; keep whole numbers as ints
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, (bytes, bytearray)):
+        # Address columns are decoded where they are selected (see decode_address_columns)
+        return value.decode('utf-8', errors='replace')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes datetimes and Decimals natively, using orjson when available"""
+
+    sort_keys = False
+    default = staticmethod(json_default)
+
+    def _use_orjson(self):
+        return orjson is not None and self._app.config.get('JSON_BACKEND', 'auto') != 'stdlib'
+
+    def encode_bytes(self, obj):
+        """Encode obj to UTF-8 JSON bytes with the configured backend"""
+        if self._use_orjson():
+            try:
+                return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+            except (TypeError, orjson.JSONEncodeError):
+                # e.g. integers beyond 64 bits; the stdlib encoder handles them
+                pass
+        return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', json_default)
+            return json.dumps(obj, **kwargs)
+        return self.encode_bytes(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode_bytes(obj), mimetype=self.mimetype)
+
+app.json_provider_class = FastJSONProvider
+app.json = FastJSONProvider(app)
+
+def wants_columnar():
+    """True when the client asked for the compact columnar list format (?format=columnar)"""
+    return request.args.get('format', '').lower() == 'columnar'
+
+# Column lists for ?format=columnar responses; rows of one list can differ in keys, so never infer them
+SUBNET_IP_COLUMNS = ['ip_address', 'status', 'hostname', 'description', 'vrf_vpn', 'created_at', 'updated_at']
+SUBNET_DETAIL_IP_COLUMNS = SUBNET_IP_COLUMNS + ['interface_name', 'device_name']
+UTILIZATION_POINT_COLUMNS = ['t', 'capacity', 'used', 'used_max', 'reserved', 'utilization', 'utilization_max']
+
+def to_columnar(rows, columns):
+    """Convert a list of row dicts into column arrays: {'columns': [...], 'values': [[...], ...]}"""
+    return {
+        'columns': columns,
+        'values': [[row.get(column) for row in rows] for column in columns],
+        'count': len(rows)
+    }
+
+# ================== DERIVED STATUS ==================
+# One canonical status per row, kept in the indexed virtual column ip_inventory.derived_status:
+# an explicit reservation wins, then an explicit 'used' or any hostname, then a "reserved" note.
+SQL_DERIVED_STATUS = ("CASE WHEN status = 'reserved' THEN 'reserved' "
+                      "WHEN status = 'used' OR hostname != '' THEN 'used' "
+                      "WHEN description LIKE '%reserved%' THEN 'reserved' "
+                      "ELSE 'available' END")
+OCCUPIED_CONDITION = "derived_status IN ('used', 'reserved')"
+
+# ================== ADDRESS MODEL ==================
+# Addresses of both families share one 128-bit space: IPv6 as is, IPv4 mapped into ::ffff:0:0/96.
+# ip_inventory.ip_bin holds the same 16-byte value (a generated column), so one index orders and
+# range-scans IPv4 and IPv6 alike and subnets are handled as [first, last] ranges, never host lists.
+IPV4_MAPPED_BASE = 0xFFFF << 32
+SQL_ADDRESS_BIN = "IF(IS_IPV4({0}), CONCAT(UNHEX('00000000000000000000FFFF'), INET6_ATON({0})), INET6_ATON({0}))"
+SQL_HOST_BITS = ("(IF(IS_IPV6(SUBSTRING_INDEX({0}, '/', 1)), 128, 32) - "
+                 "CAST(IF(LOCATE('/', {0}) > 0, SUBSTRING_INDEX({0}, '/', -1), IF(IS_IPV6({0}), 128, 32)) AS SIGNED))")
+SQL_HOST_MASK_BIN = ("UNHEX(CONCAT(REPEAT('0', 32 - CEIL({0} / 4)), "
+                     "IF({0} MOD 4 = 0, '', HEX((1 << ({0} MOD 4)) - 1)), REPEAT('F', FLOOR({0} / 4))))")
+
+def subnet_bounds_sql(column):
+    """SQL for the 16-byte first and last address of a CIDR column (binary-string bit operations)"""
+    address = SQL_ADDRESS_BIN.format(f"SUBSTRING_INDEX({column}, '/', 1)")
+    mask = SQL_HOST_MASK_BIN.format(SQL_HOST_BITS.format(column))
+    return f"({address}) & ~({mask})", f"({address}) | ({mask})"
+
+app.config['SUBNET_PAGE_SIZE'] = 65536    # Default and maximum addresses per page when listing a subnet
+
+def address_key(address):
+    """Position of an address in the shared 128-bit space"""
+    if isinstance(address, str):
+        address = ipaddress.ip_address(address)
+    return int(address) + IPV4_MAPPED_BASE if address.version == 4 else int(address)
+
+def address_to_bin(address):
+    """16-byte value matching ip_inventory.ip_bin"""
+    return address_key(address).to_bytes(16, 'big')
+
+def bin_to_address(value):
+    """Inverse of address_to_bin"""
+    number = int.from_bytes(value, 'big')
+    if number >> 32 == 0xFFFF:
+        return ipaddress.IPv4Address(number - IPV4_MAPPED_BASE)
+    return ipaddress.IPv6Address(number)
+
+ADDRESS_BIN_COLUMNS = ('ip_bin', 'network_bin', 'broadcast_bin')
+
+def decode_address_columns(rows):
+    """Replace 16-byte address columns in rows read with SELECT * by their address text"""
+    for row in rows:
+        for column in ADDRESS_BIN_COLUMNS:
+            if row.get(column) is not None:
+                row[column] = str(bin_to_address(row[column]))
+    return rows
+
+def host_range(network):
+    """First and last assignable address (IPv4 excludes network and broadcast below /31; IPv6 has no broadcast)"""
+    if network.version == 4 and network.prefixlen < 31:
+        return network.network_address + 1, network.broadcast_address - 1
+    return network.network_address, network.broadcast_address
+
+def address_suffix(address):
+    """Short host part for generated names: last octet for IPv4, last hextet for IPv6"""
+    address = ipaddress.ip_address(address)
+    if address.version == 4:
+        return str(address).rsplit('.', 1)[-1]
+    return format(int(address) & 0xFFFF, 'x')
+
+def page_args(total):
+    """offset/limit query arguments for address windows, bounded by SUBNET_PAGE_SIZE"""
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', app.config['SUBNET_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['SUBNET_PAGE_SIZE']))
+    return offset, limit, {
+        'offset': offset,
+        'limit': limit,
+        'total': total,
+        'has_more': offset + limit < total
+    }
+
+def fetch_range_rows(cursor, columns, first, last, conditions='', params=(), limit=None):
+    """Inventory rows with first <= address <= last in address order (uses the ip_bin index)"""
+    query = f"""
+        SELECT {columns}, ip_bin FROM ip_inventory
+        WHERE ip_bin BETWEEN %s AND %s {f'AND {conditions}' if conditions else ''}
+        ORDER BY ip_bin
+        {'LIMIT %s' if limit else ''}
+    """
+    cursor.execute(query, [address_to_bin(first), address_to_bin(last)] + list(params) + ([limit] if limit else []))
+    return cursor.fetchall()
+
+def subnet_address_window(cursor, network, offset, limit, columns):
+    """(address, row or None) for host addresses offset .. offset+limit-1 of a subnet.
+    
+    Only the window is materialised, so a /64 pages exactly like a /24.
+    """
+    first, last = host_range(network)
+    start = int(first) + offset
+    end = min(int(last), start + limit - 1)
+    if start > end:
+        return []
+    address_class = type(first)
+    rows = {}
+    for row in fetch_range_rows(cursor, columns, address_class(start), address_class(end)):
+        rows.setdefault(int(bin_to_address(row.pop('ip_bin'))), row)
+    return [(address_class(number), rows.get(number)) for number in range(start, end + 1)]
+
+def iter_free_addresses(cursor, network, conditions=OCCUPIED_CONDITION, params=(), batch_size=1000):
+    """Yield free host addresses in order by walking the gaps between occupied rows.
+    
+    Occupied rows are read in keyset batches from the ip_bin index, so the cost is
+    proportional to the rows skipped, not to the size of the subnet.
+    """
+    first, last = host_range(network)
+    address_class = type(first)
+    candidate, last = int(first), int(last)
+    while candidate <= last:
+        occupied = fetch_range_rows(cursor, 'id', address_class(candidate), address_class(last),
+                                    conditions, params, limit=batch_size)
+        for row in occupied:
+            taken = int(bin_to_address(row['ip_bin']))
+            while candidate < taken:
+                yield address_class(candidate)
+                candidate += 1
+            candidate = max(candidate, taken + 1)
+        if len(occupied) < batch_size:
+            while candidate <= last:
+                yield address_class(candidate)
+                candidate += 1
+
+def count_range_statuses(cursor, network):
+    """Inventory rows per status inside a subnet's address range"""
+    first, last = host_range(network)
+    cursor.execute("""
+        SELECT derived_status as status, COUNT(*) as count FROM ip_inventory
+        WHERE ip_bin BETWEEN %s AND %s
+        GROUP BY derived_status
+    """, (address_to_bin(first), address_to_bin(last)))
+    return {row['status']: row['count'] for row in cursor.fetchall()}
+
+# ================== CAPACITY & OCCUPANCY ==================
+# Capacity is arithmetic on the subnet bounds and occupancy is a sorted set of [first, last] runs, so
+# statistics over a /8 or an IPv6 aggregate cost O(occupied runs), never O(address space).
+def subnet_capacity(subnet):
+    """Usable addresses in a subnet of either family (see host_range)"""
+    first, last = host_range(ipaddress.ip_network(subnet, strict=False))
+    return int(last) - int(first) + 1
+
+class AddressRangeSet:
+    """Sorted, disjoint, non-adjacent runs of integer addresses (see address_key)"""
+
+    def __init__(self, runs=()):
+        self.starts = []
+        self.ends = []
+        for first, last in sorted(runs):
+            self.add(first, last)
+
+    def add(self, first, last):
+        """Add [first, last], merging with overlapping or adjacent runs"""
+        index = bisect.bisect_left(self.ends, first - 1)
+        stop = index
+        while stop < len(self.starts) and self.starts[stop] <= last + 1:
+            first = min(first, self.starts[stop])
+            last = max(last, self.ends[stop])
+            stop += 1
+        self.starts[index:stop] = [first]
+        self.ends[index:stop] = [last]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def count(self, first=None, last=None):
+        """Addresses covered inside [first, last] (everything when no bounds are given)"""
+        if first is None:
+            return sum(end - start + 1 for start, end in self)
+        total = 0
+        for index in range(bisect.bisect_left(self.ends, first), len(self.starts)):
+            if self.starts[index] > last:
+                break
+            total += min(self.ends[index], last) - max(self.starts[index], first) + 1
+        return total
+
+    def gaps(self, first, last):
+        """Uncovered runs inside [first, last] in order"""
+        candidate = first
+        for index in range(bisect.bisect_left(self.ends, first), len(self.starts)):
+            if self.starts[index] > last:
+                break
+            if self.starts[index] > candidate:
+                yield candidate, self.starts[index] - 1
+            candidate = self.ends[index] + 1
+        if candidate <= last:
+            yield candidate, last
+
+    def largest_gap(self, first, last):
+        """Size of the largest uncovered run inside [first, last]"""
+        return max((end - start + 1 for start, end in self.gaps(first, last)), default=0)
+
+def fetch_occupied_runs(cursor, first=None, last=None, conditions=OCCUPIED_CONDITION, params=(), ranges=None):
+    """Occupied addresses as an AddressRangeSet, with the runs computed in SQL.
+    
+    Gaps-and-islands over ip_bin: within each 64-bit prefix, consecutive addresses share
+    (low 64 bits - row number), so only one row per run leaves the database. Bound the scan
+    with first/last or with ranges, a list of disjoint, non-adjacent (first, last) address keys.
+    """
+    if ranges is None and first is not None:
+        ranges = [(address_key(first), address_key(last))]
+    bounds = ''
+    bound_params = []
+    if ranges:
+        bounds = f"({' OR '.join(['ip_bin BETWEEN %s AND %s'] * len(ranges))}) AND"
+        for range_first, range_last in ranges:
+            bound_params.extend([range_first.to_bytes(16, 'big'), range_last.to_bytes(16, 'big')])
+    cursor.execute(f"""
+        SELECT MIN(ip_bin) as run_start, MAX(ip_bin) as run_end
+        FROM (
+            SELECT ip_bin, LEFT(ip_bin, 8) as prefix,
+                   CAST(CONV(HEX(SUBSTRING(ip_bin, 9, 8)), 16, 10) AS UNSIGNED)
+                       - (ROW_NUMBER() OVER (PARTITION BY LEFT(ip_bin, 8) ORDER BY ip_bin) - 1) as island
+            FROM (
+                SELECT DISTINCT ip_bin FROM ip_inventory
+                WHERE {bounds} ip_bin IS NOT NULL AND {conditions}
+            ) occupied
+        ) numbered
+        GROUP BY prefix, island
+        ORDER BY run_start
+    """, bound_params + list(params))
+    return AddressRangeSet((int.from_bytes(row['run_start'], 'big'), int.from_bytes(row['run_end'], 'big'))
+                           for row in cursor.fetchall())
+
+def fetch_subnet_runs(cursor, subnets, batch_size=500):
+    """Occupied runs inside the given subnets only, as index range scans over their merged host ranges"""
+    spans = AddressRangeSet()
+    for subnet in subnets:
+        try:
+            first, last = host_range(ipaddress.ip_network(subnet, strict=False))
+        except ValueError:
+            continue
+        spans.add(address_key(first), address_key(last))
+    spans = list(spans)
+    runs = AddressRangeSet()
+    for start in range(0, len(spans), batch_size):
+        for first, last in fetch_occupied_runs(cursor, ranges=spans[start:start + batch_size]):
+            runs.add(first, last)
+    return runs
+
+def subnet_occupancy(subnet, runs):
+    """Capacity, occupied count and largest free block of a subnet against an AddressRangeSet"""
+    first, last = host_range(ipaddress.ip_network(subnet, strict=False))
+    first, last = address_key(first), address_key(last)
+    capacity = last - first + 1
+    occupied = runs.count(first, last)
+    return {
+        'capacity': capacity,
+        'occupied': occupied,
+        'free': capacity - occupied,
+        'largest_free_block': runs.largest_gap(first, last)
+    }
+
+# ================== RESPONSE COMPRESSION ==================
+# brotli is optional; without it only gzip is negotiated
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('IPAM_COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('IPAM_COMPRESS_GZIP_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('IPAM_COMPRESS_BROTLI_QUALITY', 5))
+app.config['COMPRESS_MIMETYPES'] = {'application/json', 'text/csv', 'application/x-ndjson', 'text/plain', 'text/html'}
+
+compression_stats = {
+    'compressed_responses': 0,
+    'skipped_small': 0,
+    'bytes_in': 0,
+    'bytes_out': 0,
+    'by_encoding': {}
+}
+compression_stats_lock = threading.Lock()
+
+def record_compression(encoding, bytes_in, bytes_out):
+    """Add one compressed response to the bytes-saved metrics"""
+    with compression_stats_lock:
+        compression_stats['compressed_responses'] += 1
+        compression_stats['bytes_in'] += bytes_in
+        compression_stats['bytes_out'] += bytes_out
+        per_encoding = compression_stats['by_encoding'].setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+        per_encoding['responses'] += 1
+        per_encoding['bytes_in'] += bytes_in
+        per_encoding['bytes_out'] += bytes_out
+
+def negotiate_encoding():
+    """Pick br or gzip from Accept-Encoding, honouring q-values"""
+    accept = request.accept_encodings
+    candidates = []
+    if brotli is not None and accept.quality('br') > 0:
+        candidates.append((accept.quality('br'), 1, 'br'))
+    if accept.quality('gzip') > 0:
+        candidates.append((accept.quality('gzip'), 0, 'gzip'))
+    if not candidates:
+        return None
+    return max(candidates)[2]
+
+def new_compressor(encoding):
+    """Return (compress, flush, finish) callables for a streaming compressor"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=app.config['COMPRESS_BROTLI_QUALITY'])
+        return compressor.process, compressor.flush, compressor.finish
+    # wbits=31 produces a gzip container
+    compressor = zlib.compressobj(app.config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed body chunk by chunk, flushing so clients receive data progressively"""
+    compress, flush, finish = new_compressor(encoding)
+    bytes_in = 0
+    bytes_out = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            bytes_in += len(chunk)
+            data = compress(chunk) + flush()
+            bytes_out += len(data)
+            if data:
+                yield data
+        data = finish()
+        bytes_out += len(data)
+        yield data
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        record_compression(encoding, bytes_in, bytes_out)
+
+@app.after_request
+def compress_response(response):
+    """Negotiated gzip/brotli compression for JSON, CSV and NDJSON responses"""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+    
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            with compression_stats_lock:
+                compression_stats['skipped_small'] += 1
+            return response
+        compress, _, finish = new_compressor(encoding)
+        compressed = compress(data) + finish()
+        record_compression(encoding, len(data), len(compressed))
+        response.set_data(compressed)
+    
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.route('/api/compression-stats')
+def api_compression_stats():
+    """Bytes saved by response compression since the worker started"""
+    with compression_stats_lock:
+        stats = json.loads(json.dumps(compression_stats))
+    stats['bytes_saved'] = stats['bytes_in'] - stats['bytes_out']
+    stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+    stats['brotli_available'] = brotli is not None
+    stats['settings'] = {
+        'min_size': app.config['COMPRESS_MIN_SIZE'],
+        'gzip_level': app.config['COMPRESS_GZIP_LEVEL'],
+        'brotli_quality': app.config['COMPRESS_BROTLI_QUALITY']
+    }
+    return jsonify(stats)
+
 # Database Configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -37,14 +511,690 @@ DB_CONFIG = {
 }
 
 def get_db_connection():
-    """Get database connection"""
+    """Get database connection (a read replica inside @read_only routes when one is fresh enough)"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = None
+        if has_request_context() and g.get('read_only'):
+            connection = replica_pool.connect()
+        if not connection:
+            connection = mysql.connector.connect(**DB_CONFIG)
+        if has_request_context() and g.get('statement_timeout_ms'):
+            # Set by @admission: the server aborts SELECTs that run past the route's budget
+            cursor = connection.cursor()
+            cursor.execute("SET SESSION max_execution_time = %s", (g.statement_timeout_ms,))
+            cursor.close()
         return connection
     except Error as e:
         print(f"❌ Database connection error: {e}")
         return None
 
+# ================== READ REPLICAS ==================
+# Reporting routes marked @read_only read from a replica in IPAM_DB_REPLICAS ("host:port,host:port",
+# same credentials and database as DB_CONFIG). Everything else, and every route when no replica
+# qualifies, uses the primary.
+def parse_replicas(value):
+    replicas = []
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.partition(':')
+        replicas.append(dict(DB_CONFIG, host=host, port=int(port or 3306)))
+    return replicas
+
+app.config['DB_REPLICAS'] = parse_replicas(os.environ.get('IPAM_DB_REPLICAS', ''))
+app.config['REPLICA_MAX_LAG'] = float(os.environ.get('IPAM_REPLICA_MAX_LAG', 5))       # Seconds of lag a replica may have
+app.config['REPLICA_LAG_POLICY'] = os.environ.get('IPAM_REPLICA_LAG_POLICY', 'primary')  # Over the bound: 'primary' or 'stale'
+app.config['REPLICA_LAG_CHECK_INTERVAL'] = 2     # Seconds a lag probe result is reused
+app.config['REPLICA_STICKY_SECONDS'] = 60        # Longest a client's last write keeps pinning its reads
+REPLICA_WRITE_COOKIE = 'ipam_last_write'
+
+def measure_replica_lag(replica):
+    """Seconds behind the primary, or None when the server is not replicating"""
+    connection = mysql.connector.connect(**dict(replica, connection_timeout=2))
+    try:
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except Error:
+            cursor.execute("SHOW SLAVE STATUS")  # Before MySQL 8.0.22
+        row = cursor.fetchone()
+        cursor.close()
+    finally:
+        connection.close()
+    if not row:
+        return None
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return float(lag) if lag is not None else None
+
+def last_write_time():
+    """When this client last wrote, if recent enough to matter for read-your-writes"""
+    try:
+        written_at = float(request.cookies.get(REPLICA_WRITE_COOKIE, ''))
+    except ValueError:
+        return None
+    return written_at if time.time() - written_at < app.config['REPLICA_STICKY_SECONDS'] else None
+
+class ReplicaPool:
+    """Round-robin replica selection with cached lag probes.
+    
+    A replica qualifies when its lag is within REPLICA_MAX_LAG and, for a client that
+    wrote recently, when it has replayed past that write. With the 'stale' policy the
+    freshest over-lagged replica is still used and the response says so.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lags = {}
+        self.next_index = 0
+        self.stats = {'replica_reads': 0, 'stale_reads': 0, 'primary_sticky': 0, 'primary_lagging': 0,
+                      'primary_unavailable': 0, 'probe_errors': 0, 'connect_errors': 0}
+    
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+    
+    def lag(self, index):
+        now = time.monotonic()
+        with self.lock:
+            cached = self.lags.get(index)
+        if cached and now - cached[0] < app.config['REPLICA_LAG_CHECK_INTERVAL']:
+            return cached[1]
+        replica = app.config['DB_REPLICAS'][index]
+        try:
+            lag = measure_replica_lag(replica)
+        except Error as e:
+            print(f"❌ Replica {replica['host']}:{replica['port']} lag probe failed: {e}")
+            self.count('probe_errors')
+            lag = None
+        with self.lock:
+            self.lags[index] = (now, lag)
+        return lag
+    
+    def choose(self, written_at=None):
+        """(index, lag, stale) of the replica to read from, or (None, reason) to use the primary"""
+        replicas = app.config['DB_REPLICAS']
+        if not replicas:
+            return None, None
+        with self.lock:
+            start = self.next_index
+            self.next_index = (start + 1) % len(replicas)
+        
+        lagging = []
+        behind_write = False
+        for index in [(start + offset) % len(replicas) for offset in range(len(replicas))]:
+            lag = self.lag(index)
+            if lag is None:
+                continue
+            # Seconds_Behind_Source has one-second resolution, hence the extra second
+            if written_at is not None and time.time() - lag - 1 < written_at:
+                behind_write = True
+                continue
+            if lag <= app.config['REPLICA_MAX_LAG']:
+                return (index, lag, False), None
+            lagging.append((lag, index))
+        
+        if lagging and app.config['REPLICA_LAG_POLICY'] == 'stale':
+            lag, index = min(lagging)
+            return (index, lag, True), None
+        if behind_write:
+            return None, 'primary_sticky'
+        return None, 'primary_lagging' if lagging else 'primary_unavailable'
+    
+    def select(self):
+        """Replica settings for the current request, or None to use the primary.
+        
+        Chosen once per request and kept on g, so the route's own connection and its
+        fan-out connections read the same server and the stats count the request once.
+        """
+        if 'replica' in g:
+            return g.replica
+        g.replica = None
+        choice, reason = self.choose(last_write_time())
+        if choice is None:
+            if reason:
+                self.count(reason)
+            return None
+        index, lag, stale = choice
+        self.count('stale_reads' if stale else 'replica_reads')
+        g.replica = app.config['DB_REPLICAS'][index]
+        g.replica_lag = lag
+        g.replica_stale = stale
+        return g.replica
+    
+    def connect(self):
+        """Replica connection for the current request, or None to use the primary"""
+        replica = self.select()
+        if replica is None:
+            return None
+        try:
+            return mysql.connector.connect(**replica)
+        except Error as e:
+            print(f"❌ Replica connection failed, using primary: {e}")
+            index = app.config['DB_REPLICAS'].index(replica)
+            with self.lock:
+                self.lags[index] = (time.monotonic(), None)
+            self.count('connect_errors')
+            g.replica = None  # The rest of this request reads the primary too
+            g.replica_lag = None
+            return None
+
+replica_pool = ReplicaPool()
+
+def read_only(view):
+    """Mark a route as safe to serve from a read replica"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.after_request
+def track_replica_reads(response):
+    """Report where a read-only route was served from; pin a client's reads to the primary after it writes"""
+    if not app.config['DB_REPLICAS']:
+        return response
+    if g.get('read_only'):
+        if g.get('replica_lag') is not None:
+            response.headers['X-Served-By'] = 'replica'
+            response.headers['X-Replica-Lag'] = str(int(g.replica_lag))
+            if g.get('replica_stale'):
+                response.headers['Warning'] = '110 - "Response is Stale"'
+        else:
+            response.headers['X-Served-By'] = 'primary'
+    elif request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+        response.set_cookie(REPLICA_WRITE_COOKIE, f"{time.time():.3f}",
+                            max_age=app.config['REPLICA_STICKY_SECONDS'], httponly=True, samesite='Lax')
+    return response
+
+@app.route('/api/replica-stats')
+def api_replica_stats():
+    """Replica routing decisions and last measured lag per replica"""
+    with replica_pool.lock:
+        stats = dict(replica_pool.stats)
+        lags = dict(replica_pool.lags)
+    stats['replicas'] = [{
+        'host': replica['host'],
+        'port': replica['port'],
+        'lag': lags[index][1] if index in lags else None
+    } for index, replica in enumerate(app.config['DB_REPLICAS'])]
+    stats['settings'] = {
+        'max_lag': app.config['REPLICA_MAX_LAG'],
+        'lag_policy': app.config['REPLICA_LAG_POLICY'],
+        'sticky_seconds': app.config['REPLICA_STICKY_SECONDS']
+    }
+    return jsonify(stats)
+
+# ================== QUERY FAN-OUT ==================
+# Independent read queries of one endpoint run concurrently, each on its own pooled
+# connection, so the endpoint takes about as long as its slowest query.
+app.config['FANOUT_WORKERS'] = int(os.environ.get('IPAM_FANOUT_WORKERS', 8))      # Concurrent queries per process (and pool size)
+app.config['FANOUT_TIMEOUT'] = float(os.environ.get('IPAM_FANOUT_TIMEOUT', 10))   # Default time budget per endpoint, seconds
+
+class QueryTimeout(Exception):
+    """A fan-out did not finish within its time budget"""
+
+fanout_lock = threading.Lock()
+fanout_pools = {}
+fanout_executor = None
+
+def read_connection_config():
+    """Connection settings for the current request (a replica inside @read_only routes when one qualifies)"""
+    if has_request_context() and g.get('read_only'):
+        replica = replica_pool.select()
+        if replica:
+            return replica
+    return DB_CONFIG
+
+def fanout_pool(config):
+    """Connection pool for one server, created on first use"""
+    global fanout_executor
+    key = (config['host'], config.get('port', 3306))
+    with fanout_lock:
+        if fanout_executor is None:
+            fanout_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=app.config['FANOUT_WORKERS'], thread_name_prefix='query-fanout')
+        if key not in fanout_pools:
+            # Never more running tasks than workers, so a worker always finds a free connection
+            fanout_pools[key] = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name=f"fanout-{key[0]}-{key[1]}", pool_size=min(app.config['FANOUT_WORKERS'], 32), **config)
+        return fanout_pools[key]
+
+def query_task(query, params=()):
+    """Fan-out task returning all rows of one query"""
+    def run(cursor):
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    return run
+
+def run_fanout_task(pool, task, deadline):
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        # The server stops SELECTs that would outlive the endpoint's budget
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            raise QueryTimeout('Time budget exhausted before the query started')
+        cursor.execute("SET SESSION max_execution_time = %s", (remaining_ms,))
+        result = task(cursor)
+        cursor.close()
+        return result
+    finally:
+        connection.close()
+
+def fan_out(tasks, timeout=None):
+    """Run independent task(cursor) functions concurrently and return {name: result}.
+    
+    Raises QueryTimeout when any task is still running after the budget; a task's own
+    database error is re-raised.
+    """
+    timeout = timeout or app.config['FANOUT_TIMEOUT']
+    if has_request_context() and g.get('statement_timeout_ms'):
+        timeout = min(timeout, g.statement_timeout_ms / 1000)
+    deadline = time.monotonic() + timeout
+    pool = fanout_pool(read_connection_config())
+    futures = {fanout_executor.submit(run_fanout_task, pool, task, deadline): name for name, task in tasks.items()}
+    done, pending = concurrent.futures.wait(futures, timeout=timeout)
+    for future in pending:
+        future.cancel()
+    if pending:
+        raise QueryTimeout(f"Queries exceeded the {timeout:g}s budget: {', '.join(sorted(futures[f] for f in pending))}")
+    
+    results = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Error as e:
+            if e.errno == 3024:  # ER_QUERY_TIMEOUT from max_execution_time
+                raise QueryTimeout(f"Query {futures[future]} exceeded the {timeout:g}s budget")
+            raise
+    return results
+
+# ================== ADMISSION CONTROL ==================
+# Expensive routes declare a class and a cost estimate (roughly: rows they will read).
+# A request is refused with 413 when its estimate exceeds its class's hard limit (only classes
+# whose requests can be narrowed have one), with 429 when its client has spent its per-minute
+# budget, and with 503 when every slot of its class stays busy for ADMISSION_QUEUE_TIMEOUT.
+# Admitted requests run with the class's server-side statement timeout. Routes without
+# @admission (allocation, edits) are never throttled.
+app.config['ADMISSION_MAX_COST'] = int(os.environ.get('IPAM_ADMISSION_MAX_COST', 5000000))          # Estimated rows per request
+app.config['ADMISSION_CLASSES'] = {
+    # Subnet pages: a smaller subnet or page always narrows them, so they are capped by rows
+    'analytics': {'concurrency': int(os.environ.get('IPAM_ANALYTICS_CONCURRENCY', 4)), 'statement_timeout': 15,
+                  'max_cost': app.config['ADMISSION_MAX_COST']},
+    # Fixed-shape dashboard aggregates: coalesced, so bounded by slots and time rather than refused
+    'dashboard': {'concurrency': int(os.environ.get('IPAM_DASHBOARD_CONCURRENCY', 4)), 'statement_timeout': 15,
+                  'max_cost': None},
+    # Whole-inventory reports: no parameter narrows them, few run at once with a longer timeout
+    'heavy': {'concurrency': int(os.environ.get('IPAM_HEAVY_CONCURRENCY', 2)), 'statement_timeout': 60,
+              'max_cost': None},
+    # Streamed exports: few at a time, but neither capped nor timed out (a long stream is expected)
+    'export': {'concurrency': int(os.environ.get('IPAM_EXPORT_CONCURRENCY', 2)), 'statement_timeout': None,
+               'max_cost': None}
+}
+app.config['ADMISSION_CLIENT_BUDGET'] = int(os.environ.get('IPAM_ADMISSION_CLIENT_BUDGET', 20000000))  # Estimated rows per client per minute
+app.config['ADMISSION_DASHBOARD_COST'] = 10000  # Budget charged per dashboard aggregate, whatever the inventory size
+# Behind a reverse proxy every client shares its address: name the header carrying the real client
+# (e.g. X-Forwarded-For or X-Client-Id) and the proxies allowed to set it
+app.config['ADMISSION_CLIENT_HEADER'] = os.environ.get('IPAM_ADMISSION_CLIENT_HEADER', '')
+app.config['ADMISSION_TRUSTED_PROXIES'] = {address.strip() for address in
+                                           os.environ.get('IPAM_TRUSTED_PROXIES', '127.0.0.1').split(',') if address.strip()}
+app.config['ADMISSION_QUEUE_TIMEOUT'] = 2.0   # Seconds to wait for a free slot
+app.config['ADMISSION_RETRY_AFTER'] = 5       # Seconds suggested to clients refused for lack of slots
+app.config['ADMISSION_ROW_ESTIMATE_TTL'] = 60  # Seconds table row estimates are reused
+
+class AdmissionController:
+    """Per-class concurrency slots and per-client cost budgets (token buckets)"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.in_flight = {}
+        self.buckets = {}
+        self.row_estimates = {}
+        self.stats = {'admitted': 0, 'rejected_cost': 0, 'rejected_budget': 0, 'rejected_busy': 0}
+    
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+    
+    def charge(self, client, cost):
+        """Take cost from the client's bucket; returns seconds to wait when it cannot pay yet"""
+        budget = app.config['ADMISSION_CLIENT_BUDGET']
+        rate = budget / 60.0
+        cost = min(cost, budget)
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(client, (budget, now))
+            tokens = min(budget, tokens + (now - updated) * rate)
+            if tokens < cost:
+                self.buckets[client] = (tokens, now)
+                return (cost - tokens) / rate
+            self.buckets[client] = (tokens - cost, now)
+            if len(self.buckets) > 10000:
+                # Forget clients whose bucket has refilled completely
+                self.buckets = {key: value for key, value in self.buckets.items()
+                                if value[0] + (now - value[1]) * rate < budget}
+        return 0
+    
+    def refund(self, client, cost):
+        """Give back a charge for a request that was not served"""
+        budget = app.config['ADMISSION_CLIENT_BUDGET']
+        with self.lock:
+            if client in self.buckets:
+                tokens, updated = self.buckets[client]
+                self.buckets[client] = (min(budget, tokens + min(cost, budget)), updated)
+    
+    def acquire(self, admission_class):
+        with self.lock:
+            if admission_class not in self.slots:
+                self.slots[admission_class] = threading.BoundedSemaphore(
+                    app.config['ADMISSION_CLASSES'][admission_class]['concurrency'])
+            slots = self.slots[admission_class]
+        if not slots.acquire(timeout=app.config['ADMISSION_QUEUE_TIMEOUT']):
+            return False
+        with self.lock:
+            self.in_flight[admission_class] = self.in_flight.get(admission_class, 0) + 1
+        return True
+    
+    def release(self, admission_class):
+        with self.lock:
+            self.in_flight[admission_class] -= 1
+        self.slots[admission_class].release()
+    
+    def estimated_rows(self, table):
+        """InnoDB's row estimate for a table, refreshed every ADMISSION_ROW_ESTIMATE_TTL seconds"""
+        now = time.monotonic()
+        with self.lock:
+            cached = self.row_estimates.get(table)
+        if cached and now - cached[0] < app.config['ADMISSION_ROW_ESTIMATE_TTL']:
+            return cached[1]
+        connection = mysql.connector.connect(**DB_CONFIG)
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT COALESCE(TABLE_ROWS, 0) FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (table,))
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+        rows = int(row[0]) if row else 0
+        with self.lock:
+            self.row_estimates[table] = (now, rows)
+        return rows
+
+admission_controller = AdmissionController()
+
+def admission_client():
+    """Budget key of the current request: the trusted proxy's client header, else the peer address"""
+    header = app.config['ADMISSION_CLIENT_HEADER']
+    if header and request.remote_addr in app.config['ADMISSION_TRUSTED_PROXIES']:
+        value = request.headers.get(header, '')
+        # X-Forwarded-For style lists: the last entry was added by the trusted proxy
+        value = value.rsplit(',', 1)[-1].strip()
+        if value:
+            return value
+    return request.remote_addr or 'unknown'
+
+def refuse(status, message, retry_after=None, **details):
+    """JSON error response, with Retry-After when the client should simply try again later"""
+    response = jsonify(dict(details, error=message))
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+def admission(admission_class, cost):
+    """Admit a route through its class's slots; cost(**view_kwargs) estimates the rows it reads"""
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                estimate = int(cost(**kwargs))
+            except (Error, ValueError) as e:
+                print(f"❌ Cost estimate failed for {request.endpoint}: {e}")
+                estimate = 0
+            
+            settings = app.config['ADMISSION_CLASSES'][admission_class]
+            if settings['max_cost'] is not None and estimate > settings['max_cost']:
+                admission_controller.count('rejected_cost')
+                return refuse(413, 'Request would read too many rows; narrow it down (smaller subnet, page or filter)',
+                              estimated_rows=estimate, max_rows=settings['max_cost'])
+            
+            client = admission_client()
+            wait = admission_controller.charge(client, estimate)
+            if wait:
+                admission_controller.count('rejected_budget')
+                return refuse(429, 'Query budget exhausted for this client', retry_after=wait,
+                              estimated_rows=estimate)
+            
+            if not admission_controller.acquire(admission_class):
+                admission_controller.refund(client, estimate)  # Shed for load, not the client's doing
+                admission_controller.count('rejected_busy')
+                return refuse(503, f'Too many {admission_class} requests in progress',
+                              retry_after=app.config['ADMISSION_RETRY_AFTER'])
+            
+            admission_controller.count('admitted')
+            if settings['statement_timeout']:
+                g.statement_timeout_ms = settings['statement_timeout'] * 1000
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                admission_controller.release(admission_class)
+                raise
+            if response.is_streamed:
+                # Streaming exports keep their slot until the body has been sent
+                response.call_on_close(lambda: admission_controller.release(admission_class))
+            else:
+                admission_controller.release(admission_class)
+            return response
+        return wrapper
+    return decorate
+
+def inventory_scan_cost(**kwargs):
+    """Routes that read the whole inventory"""
+    return admission_controller.estimated_rows('ip_inventory')
+
+def dashboard_cost(**kwargs):
+    """Fixed-shape dashboard aggregates: a flat budget charge, so routine refreshes are not refused"""
+    return app.config['ADMISSION_DASHBOARD_COST']
+
+def subnets_scan_cost(**kwargs):
+    return admission_controller.estimated_rows('subnets')
+
+def subnet_page_cost(subnet=None, subnet_name=None):
+    """Routes listing one window of a subnet: an ip_bin range scan of at most the window"""
+    network = ipaddress.ip_network(subnet or subnet_name, strict=False)
+    offset, limit, _ = page_args(network.num_addresses)
+    return max(0, min(limit, network.num_addresses - offset))
+
+@app.route('/api/admission-stats')
+def api_admission_stats():
+    """Admission decisions and busy slots per class since the worker started"""
+    with admission_controller.lock:
+        stats = dict(admission_controller.stats)
+        in_flight = dict(admission_controller.in_flight)
+    stats['classes'] = {name: dict(settings, in_flight=in_flight.get(name, 0))
+                        for name, settings in app.config['ADMISSION_CLASSES'].items()}
+    stats['client_budget_per_minute'] = app.config['ADMISSION_CLIENT_BUDGET']
+    return jsonify(stats)
+
+# ================== SINGLE-FLIGHT ==================
+# Identical GET requests that arrive while one is being computed wait for it and share its
+# response instead of repeating the work. With IPAM_SINGLE_FLIGHT_DIR set, workers on the
+# same host also coordinate through lock files (POSIX only).
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+app.config['SINGLE_FLIGHT_WAIT'] = float(os.environ.get('IPAM_SINGLE_FLIGHT_WAIT', 30))  # Seconds to wait before computing anyway
+app.config['SINGLE_FLIGHT_DIR'] = os.environ.get('IPAM_SINGLE_FLIGHT_DIR', '')            # Empty disables cross-worker coalescing
+app.config['SINGLE_FLIGHT_SLOTS'] = 256  # Lock/result file pairs keys are hashed into, so the directory stays bounded
+
+last_flight_sweep = 0.0
+
+class SingleFlight:
+    """Share one in-flight computation per key between concurrent callers"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stats = {'computed': 0, 'shared_in_process': 0, 'shared_across_workers': 0, 'bypassed': 0,
+                      'wait_timeouts': 0}
+        self.endpoints = {}
+    
+    def count(self, endpoint, key):
+        with self.lock:
+            self.stats[key] += 1
+            counters = self.endpoints.setdefault(endpoint, {'computed': 0, 'saved': 0, 'bypassed': 0})
+            if key.startswith('shared'):
+                counters['saved'] += 1
+            elif key in counters:
+                counters[key] += 1
+    
+    def do(self, key, endpoint, compute):
+        """compute() once for concurrent callers of key; returns (result, how it was obtained)"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        
+        if not leader:
+            if call['done'].wait(app.config['SINGLE_FLIGHT_WAIT']):
+                if call['error'] is not None:
+                    raise call['error']
+                self.count(endpoint, 'shared_in_process')
+                return call['result'], 'thread'
+            self.count(endpoint, 'wait_timeouts')
+            result, source = compute_across_workers(key, compute)
+            self.count(endpoint, 'computed' if source == 'computed' else 'shared_across_workers')
+            return result, source
+        
+        try:
+            call['result'], source = compute_across_workers(key, compute)
+            self.count(endpoint, 'computed' if source == 'computed' else 'shared_across_workers')
+            return call['result'], source
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call['done'].set()
+
+single_flight = SingleFlight()
+
+def compute_across_workers(key, compute):
+    """Hold a per-key lock file while computing; a worker that had to wait reuses the result written meanwhile"""
+    directory = app.config['SINGLE_FLIGHT_DIR']
+    if not directory or fcntl is None:
+        return compute(), 'computed'
+    
+    os.makedirs(directory, exist_ok=True)
+    sweep_flight_results(directory)
+    slot = int(hashlib.sha1(key.encode('utf-8')).hexdigest(), 16) % app.config['SINGLE_FLIGHT_SLOTS']
+    name = os.path.join(directory, f"slot-{slot:04d}")
+    waiting_since = time.time()
+    deadline = time.monotonic() + app.config['SINGLE_FLIGHT_WAIT']
+    with open(name + '.lock', 'a') as lock_file:
+        waited = False
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    return compute(), 'computed'
+                waited = True
+                time.sleep(0.02)
+        try:
+            if waited:
+                result = read_flight_result(name + '.result', key, waiting_since)
+                if result is not None:
+                    return result, 'worker'
+            result = compute()
+            write_flight_result(name + '.result', key, result)
+            return result, 'computed'
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def write_flight_result(path, key, result):
+    status, headers, body, replica = result
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(temporary, 'wb') as handle:
+        header = {'key': key, 'finished_at': time.time(), 'status': status, 'headers': headers, 'replica': replica}
+        handle.write(json.dumps(header).encode('utf-8') + b'\n' + body)
+    os.replace(temporary, path)
+
+def read_flight_result(path, key, not_before):
+    """Result for key written by another worker after not_before, or None (the slot may hold another key)"""
+    try:
+        with open(path, 'rb') as handle:
+            header, _, body = handle.read().partition(b'\n')
+    except OSError:
+        return None
+    header = json.loads(header)
+    if header['key'] != key or header['finished_at'] < not_before:
+        return None
+    return header['status'], [tuple(item) for item in header['headers']], body, header['replica']
+
+def sweep_flight_results(directory):
+    """Every SINGLE_FLIGHT_WAIT seconds, delete result files no waiter can still accept, plus leftovers"""
+    global last_flight_sweep
+    now = time.time()
+    if now - last_flight_sweep < app.config['SINGLE_FLIGHT_WAIT']:
+        return
+    last_flight_sweep = now
+    for entry in os.scandir(directory):
+        if entry.name.startswith('slot-') and entry.name.endswith('.lock'):
+            continue
+        try:
+            if entry.stat().st_mtime < now - app.config['SINGLE_FLIGHT_WAIT']:
+                os.remove(entry.path)
+        except OSError:
+            pass  # Swept by another worker, or replaced meanwhile
+
+def coalesce(view):
+    """Let concurrent identical GET requests share one computation of this route"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        endpoint = request.endpoint
+        # Clients pinned to the primary after a write must not receive a replica-served result
+        if request.method != 'GET' or (g.get('read_only') and last_write_time() is not None):
+            single_flight.count(endpoint, 'bypassed')
+            return view(*args, **kwargs)
+        
+        def compute():
+            response = make_response(view(*args, **kwargs))
+            replica = [g.get('replica_lag'), g.get('replica_stale')]
+            return response.status_code, list(response.headers.items()), response.get_data(), replica
+        
+        key = f"{request.path}?{'&'.join(sorted(f'{k}={v}' for k, v in request.args.items(multi=True)))}"
+        (status, headers, body, replica), source = single_flight.do(key, endpoint, compute)
+        if status == 429 and source != 'computed':
+            return view(*args, **kwargs)  # The leader's client was over its budget; this one may not be
+        if source != 'computed':
+            g.replica_lag, g.replica_stale = replica
+        response = Response(body, status=status, headers=headers)
+        response.headers['X-Single-Flight'] = 'leader' if source == 'computed' else 'shared'
+        return response
+    return wrapper
+
+@app.route('/api/single-flight-stats')
+def api_single_flight_stats():
+    """Computations done and saved by request coalescing since the worker started"""
+    with single_flight.lock:
+        stats = dict(single_flight.stats)
+        stats['endpoints'] = {name: dict(counters) for name, counters in single_flight.endpoints.items()}
+        stats['in_flight'] = len(single_flight.calls)
+    stats['saved'] = stats['shared_in_process'] + stats['shared_across_workers']
+    stats['cross_worker'] = bool(app.config['SINGLE_FLIGHT_DIR']) and fcntl is not None
+    return jsonify(stats)
+
 def init_database():
     """Initialize database and tables"""
     try:
@@ -81,8 +1231,8 @@ def init_database():
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS ip_inventory (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    ip_address VARCHAR(15) NOT NULL,
-                    subnet VARCHAR(18) NOT NULL,
+                    ip_address VARCHAR(45) NOT NULL,
+                    subnet VARCHAR(49) NOT NULL,
                     section_id INT,
                     status ENUM('used', 'available', 'reserved') DEFAULT 'available',
                     vrf_vpn VARCHAR(50),
@@ -90,11 +1240,18 @@ def init_database():
                     description TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    ip_family TINYINT AS (IF(IS_IPV6(ip_address), 6, 4)) VIRTUAL,
+                    ip_bin VARBINARY(16) AS (''' + SQL_ADDRESS_BIN.format('ip_address') + ''') VIRTUAL,
+                    derived_status ENUM('used', 'available', 'reserved') AS (''' + SQL_DERIVED_STATUS + ''') VIRTUAL,
                     FOREIGN KEY (section_id) REFERENCES network_sections(id) ON DELETE SET NULL,
                     INDEX idx_ip_address (ip_address),
+                    INDEX idx_ip_bin (ip_bin),
+                    FULLTEXT INDEX ft_search (hostname, description, vrf_vpn) WITH PARSER ngram,
                     INDEX idx_subnet (subnet),
                     INDEX idx_status (status),
+                    INDEX idx_subnet_derived_status (subnet, derived_status),
                     INDEX idx_section_id (section_id),
+                    INDEX idx_section_subnet_status (section_id, subnet, derived_status),
                     UNIQUE KEY unique_ip_section (ip_address, section_id)
                 )
             ''')
@@ -103,14 +1260,14 @@ def init_database():
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS subnets (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    subnet VARCHAR(18) NOT NULL,
+                    subnet VARCHAR(49) NOT NULL,
                     description TEXT,
                     section_id INT,
                     section VARCHAR(50),
                     vlan VARCHAR(50),
                     device VARCHAR(100),
                     nameservers TEXT,
-                    master_subnet VARCHAR(18),
+                    master_subnet VARCHAR(49),
                     vrf VARCHAR(50),
                     customer VARCHAR(100),
                     location VARCHAR(100),
@@ -122,17 +1279,128 @@ def init_database():
                     resolve_dns_names BOOLEAN DEFAULT FALSE,
                     show_as_name BOOLEAN DEFAULT FALSE,
                     irr VARCHAR(50),
+                    used_count INT NOT NULL DEFAULT 0,
+                    reserved_count INT NOT NULL DEFAULT 0,
+                    capacity DECIMAL(39,0),
+                    utilization DECIMAL(5,2),
+                    counters_updated_at DATETIME,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    ip_family TINYINT AS (IF(IS_IPV6(SUBSTRING_INDEX(subnet, '/', 1)), 6, 4)) VIRTUAL,
+                    network_bin VARBINARY(16) AS (''' + subnet_bounds_sql('subnet')[0] + ''') VIRTUAL,
+                    broadcast_bin VARBINARY(16) AS (''' + subnet_bounds_sql('subnet')[1] + ''') VIRTUAL,
                     FOREIGN KEY (section_id) REFERENCES network_sections(id) ON DELETE SET NULL,
                     INDEX idx_subnet (subnet),
+                    INDEX idx_network_range (network_bin, broadcast_bin),
                     INDEX idx_section (section),
                     INDEX idx_section_id (section_id),
+                    INDEX idx_section_utilization (section_id, utilization),
                     INDEX idx_vrf (vrf),
                     UNIQUE KEY unique_subnet_section (subnet, section_id)
                 )
             ''')
             
+            # Create append-only change log (written in the same transaction as each mutation)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_log (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    changed_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+                    action VARCHAR(20) NOT NULL,
+                    entity_type ENUM('ip', 'subnet', 'section') NOT NULL DEFAULT 'ip',
+                    entity_id INT,
+                    ip_address VARCHAR(45),
+                    subnet VARCHAR(49),
+                    section_id INT,
+                    status VARCHAR(20),
+                    vrf_vpn VARCHAR(50),
+                    hostname VARCHAR(100),
+                    description TEXT,
+                    source VARCHAR(20) NOT NULL DEFAULT 'api',
+                    INDEX idx_changed_at (changed_at),
+                    INDEX idx_section_time (section_id, changed_at),
+                    INDEX idx_subnet_time (subnet, changed_at),
+                    INDEX idx_source_time (source, changed_at),
+                    INDEX idx_section_seq (section_id, id),
+                    INDEX idx_subnet_seq (subnet, id),
+                    INDEX idx_vrf_seq (vrf_vpn, id)
+                )
+            ''')
+            cursor.execute(CHANGE_LOG_SEQUENCE_DDL)
+            cursor.execute(CHANGE_LOG_SEQUENCE_SEED)
+            
+            # Create utilization time-series (5m samples rolled up to hourly and daily points)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS utilization_history (
+                    resolution ENUM('5m', '1h', '1d') NOT NULL,
+                    scope ENUM('global', 'section', 'vrf', 'subnet') NOT NULL,
+                    scope_key VARCHAR(100) NOT NULL,
+                    bucket_start DATETIME NOT NULL,
+                    capacity DECIMAL(39,0) NOT NULL DEFAULT 0,
+                    used_avg DECIMAL(16,2) NOT NULL DEFAULT 0,
+                    used_max BIGINT NOT NULL DEFAULT 0,
+                    reserved_avg DECIMAL(16,2) NOT NULL DEFAULT 0,
+                    utilization_avg DECIMAL(5,2) NOT NULL DEFAULT 0,
+                    utilization_max DECIMAL(5,2) NOT NULL DEFAULT 0,
+                    samples INT NOT NULL DEFAULT 1,
+                    PRIMARY KEY (resolution, scope, scope_key, bucket_start),
+                    INDEX idx_resolution_bucket (resolution, bucket_start)
+                )
+            ''')
+            
+            # Create capacity forecasts (refreshed in batch from utilization_history)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS capacity_forecasts (
+                    scope ENUM('global', 'section', 'vrf', 'subnet') NOT NULL,
+                    scope_key VARCHAR(100) NOT NULL,
+                    computed_at DATETIME NOT NULL,
+                    capacity DECIMAL(39,0) NOT NULL DEFAULT 0,
+                    used BIGINT NOT NULL DEFAULT 0,
+                    utilization DECIMAL(5,2) NOT NULL DEFAULT 0,
+                    threshold_percentage INT NOT NULL DEFAULT 80,
+                    mark_as_full BOOLEAN NOT NULL DEFAULT FALSE,
+                    growth_per_day DECIMAL(14,4),
+                    r_squared DECIMAL(5,4),
+                    days_to_threshold DECIMAL(10,1),
+                    days_to_full DECIMAL(10,1),
+                    sample_points INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (scope, scope_key),
+                    INDEX idx_scope_threshold (scope, days_to_threshold),
+                    INDEX idx_scope_full (scope, days_to_full)
+                )
+            ''')
+            
+            # Create subnet alert state (one row per subnet and alert type)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS subnet_alerts (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    subnet VARCHAR(49) NOT NULL,
+                    alert_type ENUM('threshold', 'full', 'marked_full') NOT NULL,
+                    state ENUM('active', 'resolved') NOT NULL DEFAULT 'active',
+                    utilization DECIMAL(5,2) NOT NULL DEFAULT 0,
+                    threshold_percentage INT,
+                    used INT NOT NULL DEFAULT 0,
+                    reserved INT NOT NULL DEFAULT 0,
+                    capacity DECIMAL(39,0) NOT NULL DEFAULT 0,
+                    first_triggered_at DATETIME NOT NULL,
+                    last_evaluated_at DATETIME NOT NULL,
+                    last_notified_at DATETIME,
+                    resolved_at DATETIME,
+                    notify_count INT NOT NULL DEFAULT 0,
+                    pending_event ENUM('triggered', 'reminder', 'resolved'),
+                    pending_at DATETIME,
+                    UNIQUE KEY unique_subnet_alert (subnet, alert_type),
+                    INDEX idx_state (state, last_evaluated_at),
+                    INDEX idx_pending (pending_event, pending_at)
+                )
+            ''')
+            
+            # Create transactional outbox for webhook deliveries
+            cursor.execute(WEBHOOK_OUTBOX_DDL)
+            
+            # Create partitioned archive tables for retired sections
+            for ddl in ARCHIVE_TABLE_DDL.values():
+                cursor.execute(ddl)
+            
             # Insert default network sections
             cursor.execute('''
                 INSERT IGNORE INTO network_sections (name, description, color) VALUES
@@ -146,6 +1414,12 @@ def init_database():
                 ('Delete_True', 'Archived True networks', '#6c757d')
             ''')
             
+            connection.commit()
+            cursor.close()
+            
+            # Fill per-subnet counters for subnets that have never been counted
+            cursor = connection.cursor(dictionary=True)
+            refresh_stale_subnet_counters(cursor, app.config['ALERT_BATCH_SIZE'])
             connection.commit()
             cursor.close()
             connection.close()
@@ -154,46 +1428,269 @@ def init_database():
     except Error as e:
         print(f"❌ Database initialization error: {e}")
 
+# ================== SECTION CACHE ==================
+# network_sections is a handful of rows read on almost every request; keep it in process.
+# Section writes in this process invalidate it; the TTL bounds staleness from other processes.
+app.config['SECTION_CACHE_TTL'] = int(os.environ.get('IPAM_SECTION_CACHE_TTL', 300))
+
+class SectionCache:
+    """In-process copy of network_sections, looked up by id or name"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = None
+        self.loaded_at = 0
+
+    def _rows(self):
+        with self.lock:
+            if self.rows is None or time.monotonic() - self.loaded_at > app.config['SECTION_CACHE_TTL']:
+                connection = get_db_connection()
+                if not connection:
+                    return self.rows or []
+                try:
+                    cursor = connection.cursor(dictionary=True)
+                    cursor.execute("SELECT * FROM network_sections ORDER BY name")
+                    self.rows = cursor.fetchall()
+                    self.loaded_at = time.monotonic()
+                    cursor.close()
+                finally:
+                    connection.close()
+            return self.rows
+
+    def all(self):
+        return [dict(row) for row in self._rows()]
+
+    def by_id(self, section_id):
+        return next((dict(row) for row in self._rows() if row['id'] == section_id), None)
+
+    def by_name(self, name):
+        return next((dict(row) for row in self._rows() if row['name'] == name), None)
+
+    def invalidate(self):
+        with self.lock:
+            self.rows = None
+
+section_cache = SectionCache()
+
 def get_network_sections():
     """Get all network sections"""
     try:
-        connection = get_db_connection()
-        if not connection:
-            return []
-            
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM network_sections ORDER BY name")
-        results = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
-        return results
-        
+        return section_cache.all()
     except Error as e:
         print(f"❌ Error getting network sections: {e}")
         return []
 
 def get_section_by_name(section_name):
     """Get section ID by name"""
+    try:
+        section = section_cache.by_name(section_name)
+        return section['id'] if section else None
+    except Error as e:
+        print(f"❌ Error getting section: {e}")
+        return None
+
+# ================== SECTION ARCHIVE ==================
+# Dead sections (e.g. Delete_True) are moved out of the live tables by
+# `python migrate_database.py --archive-section NAME` into compressed archive tables
+# with one LIST partition per section, so live scans never read them and a section
+# can be restored or dropped as a whole partition.
+ARCHIVE_TABLES = {
+    'ip_inventory': ('ip_inventory_archive', [
+        'id', 'ip_address', 'subnet', 'section_id', 'status', 'vrf_vpn', 'hostname', 'description',
+        'created_at', 'updated_at'
+    ]),
+    'subnets': ('subnets_archive', [
+        'id', 'subnet', 'description', 'section_id', 'section', 'vlan', 'device', 'nameservers',
+        'master_subnet', 'vrf', 'customer', 'location', 'mark_as_pool', 'mark_as_full', 'threshold_percentage',
+        'check_hosts_status', 'discover_new_hosts', 'resolve_dns_names', 'show_as_name', 'irr',
+        'created_at', 'updated_at'
+    ])
+}
+
+# Partitioned tables need the partitioning column in every unique key and cannot carry
+# foreign keys; p_none only exists because a LIST table needs at least one partition.
+ARCHIVE_TABLE_DDL = {
+    'ip_inventory_archive': '''
+        CREATE TABLE IF NOT EXISTS ip_inventory_archive (
+            id INT NOT NULL,
+            ip_address VARCHAR(45) NOT NULL,
+            subnet VARCHAR(49) NOT NULL,
+            section_id INT NOT NULL,
+            status ENUM('used', 'available', 'reserved') DEFAULT 'available',
+            vrf_vpn VARCHAR(50),
+            hostname VARCHAR(100),
+            description TEXT,
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ip_bin VARBINARY(16) AS (''' + SQL_ADDRESS_BIN.format('ip_address') + ''') STORED,
+            PRIMARY KEY (section_id, id),
+            INDEX idx_section_ip_bin (section_id, ip_bin)
+        ) ROW_FORMAT=COMPRESSED
+        PARTITION BY LIST (section_id) (PARTITION p_none VALUES IN (0))
+    ''',
+    'subnets_archive': '''
+        CREATE TABLE IF NOT EXISTS subnets_archive (
+            id INT NOT NULL,
+            subnet VARCHAR(49) NOT NULL,
+            description TEXT,
+            section_id INT NOT NULL,
+            section VARCHAR(50),
+            vlan VARCHAR(50),
+            device VARCHAR(100),
+            nameservers TEXT,
+            master_subnet VARCHAR(49),
+            vrf VARCHAR(50),
+            customer VARCHAR(100),
+            location VARCHAR(100),
+            mark_as_pool BOOLEAN DEFAULT FALSE,
+            mark_as_full BOOLEAN DEFAULT FALSE,
+            threshold_percentage INT DEFAULT 80,
+            check_hosts_status BOOLEAN DEFAULT FALSE,
+            discover_new_hosts BOOLEAN DEFAULT FALSE,
+            resolve_dns_names BOOLEAN DEFAULT FALSE,
+            show_as_name BOOLEAN DEFAULT FALSE,
+            irr VARCHAR(50),
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (section_id, id)
+        ) ROW_FORMAT=COMPRESSED
+        PARTITION BY LIST (section_id) (PARTITION p_none VALUES IN (0))
+    '''
+}
+
+def archive_partition_name(section_id):
+    return f's{int(section_id)}'
+
+def archived_sections(cursor):
+    """Archived section ids with approximate row counts, from the partition metadata"""
+    cursor.execute("""
+        SELECT TABLE_NAME as table_name, PARTITION_NAME as partition_name, TABLE_ROWS as table_rows
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ('ip_inventory_archive', 'subnets_archive')
+          AND PARTITION_NAME != 'p_none'
+    """)
+    sections = {}
+    for row in cursor.fetchall():
+        section_id = int(row['partition_name'][1:])
+        entry = sections.setdefault(section_id, {'section_id': section_id, 'ips': 0, 'subnets': 0})
+        entry['ips' if row['table_name'] == 'ip_inventory_archive' else 'subnets'] = row['table_rows'] or 0
+    return [sections[section_id] for section_id in sorted(sections)]
+
+@app.route('/api/archive/sections')
+def api_archived_sections():
+    """Sections moved to the archive tables"""
     try:
         connection = get_db_connection()
         if not connection:
-            return None
-            
+            return jsonify({'error': 'Database connection failed'}), 500
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT id FROM network_sections WHERE name = %s", (section_name,))
-        result = cursor.fetchone()
-        
+        sections = archived_sections(cursor)
         cursor.close()
         connection.close()
-        return result['id'] if result else None
-        
+
+        for entry in sections:
+            section = section_cache.by_id(entry['section_id'])
+            entry['section_name'] = section['name'] if section else None
+        return jsonify({'sections': sections})
+
     except Error as e:
-        print(f"❌ Error getting section: {e}")
-        return None
+        print(f"❌ Error listing archived sections: {e}")
+        return jsonify({'error': str(e)}), 500
 
-def get_ip_data(limit=100, section_id=None):
-    """Get IP data from database with optional section filter"""
+@app.route('/api/archive/section/<int:section_id>/ips')
+def api_archived_section_ips(section_id):
+    """Page through an archived section's addresses (reads only that section's partition)"""
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+        cursor = connection.cursor(dictionary=True)
+
+        # section_id equality lets the optimizer prune to partition s<section_id>
+        cursor.execute("SELECT COUNT(*) as total FROM ip_inventory_archive WHERE section_id = %s", (section_id,))
+        offset, limit, pagination = page_args(cursor.fetchone()['total'])
+        cursor.execute("""
+            SELECT id, ip_address, subnet, status, vrf_vpn, hostname, description, created_at, updated_at, archived_at
+            FROM ip_inventory_archive
+            WHERE section_id = %s
+            ORDER BY ip_bin
+            LIMIT %s OFFSET %s
+        """, (section_id, limit, offset))
+        ips = cursor.fetchall()
+        cursor.close()
+        connection.close()
+
+        return jsonify({'section_id': section_id, 'ips': ips, 'pagination': pagination})
+
+    except Error as e:
+        print(f"❌ Error loading archived section IPs: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ================== CHANGE LOG ==================
+CHANGE_LOG_FIELDS = ['action', 'entity_type', 'entity_id', 'ip_address', 'subnet', 'section_id',
+                     'status', 'vrf_vpn', 'hostname', 'description', 'source']
+
+# Display labels for activity feeds
+CHANGE_ACTION_LABELS = {
+    'add': 'Added',
+    'update': 'Updated',
+    'delete': 'Deleted',
+    'reserve': 'Reserved',
+    'release': 'Released',
+    'import': 'Imported',
+    'archive': 'Archived',
+    'restore': 'Restored'
+}
+
+# Change feed: consumers page through change_log by id, so ids must become visible in id order.
+# AUTO_INCREMENT hands them out at insert, and a slow transaction could commit an id below one
+# already served. record_changes() instead takes ids from a counter row that stays locked until
+# the transaction ends, so ids are assigned in commit order (writers queue on it from their
+# first logged change to commit).
+app.config['CHANGES_PAGE_SIZE'] = 1000      # Default changes per page (maximum 10x)
+
+CHANGE_LOG_SEQUENCE_DDL = """
+    CREATE TABLE IF NOT EXISTS change_log_sequence (
+        id TINYINT PRIMARY KEY,
+        next_id BIGINT NOT NULL
+    )
+"""
+CHANGE_LOG_SEQUENCE_SEED = """
+    INSERT IGNORE INTO change_log_sequence (id, next_id)
+    SELECT 1, COALESCE(MAX(id), 0) + 1 FROM change_log
+"""
+
+def record_changes(cursor, changes):
+    """Append change log rows using the caller's cursor, so they commit or roll back with the mutation"""
+    if not changes:
+        return
+    # Reserve ids on the counter row; its lock is held until commit (see CHANGE_LOG_SEQUENCE_DDL)
+    cursor.execute("UPDATE change_log_sequence SET next_id = LAST_INSERT_ID(next_id) + %s WHERE id = 1",
+                   (len(changes),))
+    first_id = cursor.lastrowid
+    rows = []
+    for offset, change in enumerate(changes):
+        change.setdefault('entity_type', 'ip')
+        change.setdefault('source', 'api')
+        rows.append((first_id + offset,) + tuple(change.get(field) for field in CHANGE_LOG_FIELDS))
+    cursor.executemany(f"""
+        INSERT INTO change_log (id, {', '.join(CHANGE_LOG_FIELDS)})
+        VALUES (%s, {', '.join(['%s'] * len(CHANGE_LOG_FIELDS))})
+    """, rows)
+    enqueue_webhook_events(cursor, changes)
+    
+    # Remember touched subnets; notify_dashboard_change() hands them to the alert engine after commit
+    if has_request_context():
+        g.setdefault('touched_subnets', set()).update(change['subnet'] for change in changes if change.get('subnet'))
+
+def record_change(cursor, action, **fields):
+    """Append a single change log row (see record_changes)"""
+    record_changes(cursor, [dict(fields, action=action)])
+
+def get_ip_data(limit=100, section_id=None):
+    """Get IP data from database with optional section filter"""
     try:
         connection = get_db_connection()
         if not connection:
@@ -210,7 +1707,7 @@ def get_ip_data(limit=100, section_id=None):
                 FROM ip_inventory i
                 LEFT JOIN network_sections s ON i.section_id = s.id
                 WHERE i.section_id = %s OR i.section_id IS NULL
-                ORDER BY INET_ATON(i.ip_address)
+                ORDER BY i.ip_bin
                 LIMIT %s
             """
             cursor.execute(query, (section_id, limit))
@@ -222,20 +1719,13 @@ def get_ip_data(limit=100, section_id=None):
                     s.name as section_name, s.color as section_color
                 FROM ip_inventory i
                 LEFT JOIN network_sections s ON i.section_id = s.id
-                ORDER BY INET_ATON(i.ip_address)
+                ORDER BY i.ip_bin
                 LIMIT %s
             """
             cursor.execute(query, (limit,))
         
         results = cursor.fetchall()
         
-        # Convert datetime objects to strings
-        for row in results:
-            if row['created_at']:
-                row['created_at'] = row['created_at'].isoformat()
-            if row['updated_at']:
-                row['updated_at'] = row['updated_at'].isoformat()
-        
         cursor.close()
         connection.close()
         
@@ -259,8 +1749,8 @@ def get_real_statistics():
             SELECT 
                 subnet,
                 COUNT(*) as total_records,
-                SUM(CASE WHEN status = 'used' THEN 1 ELSE 0 END) as used_count,
-                SUM(CASE WHEN status = 'reserved' THEN 1 ELSE 0 END) as reserved_count
+                SUM(CASE WHEN derived_status = 'used' THEN 1 ELSE 0 END) as used_count,
+                SUM(CASE WHEN derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_count
             FROM ip_inventory 
             WHERE subnet IS NOT NULL AND subnet != ''
             GROUP BY subnet
@@ -280,13 +1770,7 @@ def get_real_statistics():
             
             try:
                 # Calculate actual subnet size
-                network = ipaddress.ip_network(subnet, strict=False)
-                
-                # For /31 and /32, use special handling
-                if network.prefixlen >= 31:
-                    subnet_size = network.num_addresses
-                else:
-                    subnet_size = network.num_addresses - 2  # Exclude network and broadcast
+                subnet_size = subnet_capacity(subnet)
                 
                 if subnet_size <= 0:
                     continue
@@ -340,10 +1824,10 @@ def get_statistics():
         # Status counts
         cursor.execute("""
             SELECT 
-                status,
+                derived_status as status,
                 COUNT(*) as count
             FROM ip_inventory 
-            GROUP BY status
+            GROUP BY derived_status
         """)
         
         status_counts = cursor.fetchall()
@@ -376,6 +1860,235 @@ def get_statistics():
         print(f"❌ Error getting statistics: {e}")
         return {}
 
+# ================== LIVE DASHBOARD EVENTS (SSE) ==================
+app.config['DASHBOARD_EVENT_DEBOUNCE'] = 1.0     # Seconds to coalesce bursts of writes into one recompute
+app.config['DASHBOARD_EVENT_KEEPALIVE'] = 20      # Seconds between keepalive comments on idle streams
+app.config['DASHBOARD_EVENT_QUEUE_SIZE'] = 50     # Pending events per subscriber before it is dropped
+app.config['DASHBOARD_EVENT_POLL_INTERVAL'] = float(os.environ.get('IPAM_DASHBOARD_EVENT_POLL_INTERVAL', 5))  # Seconds between change_log head checks (picks up other workers' writes)
+
+def compute_dashboard_snapshot():
+    """Compute the dashboard datasets pushed to live subscribers"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        stats, subnet_utilization = compute_real_statistics(cursor)
+        activities = fetch_recent_activity(cursor)
+        cursor.close()
+        return {
+            'statistics': stats,
+            'subnet_utilization': subnet_utilization,
+            'recent_activity': activities
+        }
+    finally:
+        connection.close()
+
+def diff_dashboard_snapshot(previous, current):
+    """Return only the parts of current that differ from previous"""
+    delta = {}
+    if previous.get('statistics') != current['statistics']:
+        delta['statistics'] = current['statistics']
+    
+    previous_subnets = previous.get('subnet_utilization', {})
+    changed_subnets = {subnet: usage for subnet, usage in current['subnet_utilization'].items()
+                       if previous_subnets.get(subnet) != usage}
+    removed_subnets = [subnet for subnet in previous_subnets if subnet not in current['subnet_utilization']]
+    if changed_subnets:
+        delta['subnet_utilization'] = changed_subnets
+    if removed_subnets:
+        delta['removed_subnets'] = removed_subnets
+    
+    if previous.get('recent_activity') != current['recent_activity']:
+        delta['recent_activity'] = current['recent_activity']
+    return delta
+
+class DashboardEventHub:
+    """Fan out dashboard deltas to SSE subscribers.
+    
+    Write routes call notify_change(); a single background thread coalesces
+    bursts, recomputes the snapshot once and pushes the delta to every
+    subscriber queue. Each worker process has its own hub, so while it has
+    subscribers it also polls MAX(change_log.id) to pick up writes committed
+    by other workers. Versions are only bumped for published deltas, so a
+    client that sees a gap knows it missed one and must re-fetch.
+    """
+    
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.snapshot = None
+        self.version = 0
+        self.change_head = None
+        self.recomputes = 0
+        self.polls = 0
+        self.worker = None
+    
+    def _ensure_worker(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name='dashboard-events', daemon=True)
+                self.worker.start()
+    
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=app.config['DASHBOARD_EVENT_QUEUE_SIZE'])
+        with self.lock:
+            self.subscribers.add(subscriber)
+            needs_snapshot = self.snapshot is None
+        if needs_snapshot:
+            self.notify_change()
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+    
+    def current(self):
+        with self.lock:
+            return self.version, self.snapshot
+    
+    def is_subscribed(self, subscriber):
+        with self.lock:
+            return subscriber in self.subscribers
+    
+    def notify_change(self):
+        """Mark dashboard data dirty; safe to call from any request thread"""
+        self.changed.set()
+        self._ensure_worker()
+    
+    def publish(self, event, data):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                # Slow consumer: drop it, the browser reconnects and gets a fresh snapshot
+                self.unsubscribe(subscriber)
+    
+    def read_change_head(self):
+        """Latest change_log id, shared by every worker process"""
+        connection = get_db_connection()
+        if not connection:
+            return None
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT MAX(id) FROM change_log")
+            head = cursor.fetchone()[0]
+            cursor.close()
+            return head
+        except Error as e:
+            print(f"❌ Error reading change log head: {e}")
+            return None
+        finally:
+            connection.close()
+    
+    def _head_moved(self):
+        """Poll the change log for writes made through other workers"""
+        with self.lock:
+            if not self.subscribers or self.snapshot is None:
+                return False
+            self.polls += 1
+        head = self.read_change_head()
+        return head is not None and head != self.change_head
+    
+    def _run(self):
+        while True:
+            if not self.changed.wait(app.config['DASHBOARD_EVENT_POLL_INTERVAL']) and not self._head_moved():
+                continue
+            time.sleep(app.config['DASHBOARD_EVENT_DEBOUNCE'])
+            self.changed.clear()
+            
+            with self.lock:
+                has_subscribers = bool(self.subscribers)
+                if not has_subscribers:
+                    self.snapshot = None  # Recompute lazily for the next subscriber
+                    self.change_head = None
+            if not has_subscribers:
+                continue
+            
+            # Read the head before the snapshot so a write landing in between triggers another pass
+            head = self.read_change_head()
+            try:
+                current = compute_dashboard_snapshot()
+            except Exception as e:
+                print(f"❌ Error computing dashboard snapshot: {e}")
+                continue
+            if current is None:
+                continue
+            
+            with self.lock:
+                previous = self.snapshot or {}
+                self.snapshot = current
+                self.change_head = head
+                self.recomputes += 1
+                delta = diff_dashboard_snapshot(previous, current)
+                if delta:
+                    self.version += 1
+                    delta['version'] = self.version
+            
+            if delta:
+                self.publish('dashboard-delta', delta)
+
+dashboard_events = DashboardEventHub()
+
+def notify_dashboard_change():
+    """Called by write routes after commit: live dashboards get a delta, touched subnets are re-checked
+    and queued webhook events are dispatched"""
+    dashboard_events.notify_change()
+    if has_request_context() and g.get('touched_subnets'):
+        alert_engine.touch(g.pop('touched_subnets'))
+    if has_request_context() and g.pop('webhooks_pending', False):
+        webhook_dispatcher.wake()
+
+def format_sse(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+@app.route('/api/events/dashboard')
+def api_dashboard_events():
+    """Server-Sent Events stream of statistics, subnet utilization and recent activity deltas"""
+    subscriber = dashboard_events.subscribe()
+    
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            seen_version, snapshot = dashboard_events.current()
+            if snapshot is not None:
+                yield format_sse('dashboard-snapshot', dict(snapshot, version=seen_version))
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=app.config['DASHBOARD_EVENT_KEEPALIVE'])
+                except queue.Empty:
+                    if not dashboard_events.is_subscribed(subscriber):
+                        break  # Dropped as a slow consumer; the browser will reconnect
+                    yield ": keepalive\n\n"
+                    continue
+                if data.get('version', 0) <= seen_version:
+                    continue  # Already covered by the snapshot sent on connect
+                seen_version = data['version']
+                yield format_sse(event, data)
+        finally:
+            dashboard_events.unsubscribe(subscriber)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/events/stats')
+def api_dashboard_event_stats():
+    """Subscriber and recompute counters for the live dashboard channel"""
+    version, _ = dashboard_events.current()
+    return jsonify({
+        'subscribers': len(dashboard_events.subscribers),
+        'recomputes': dashboard_events.recomputes,
+        'head_polls': dashboard_events.polls,
+        'version': version
+    })
+
 # Routes
 @app.route('/')
 def index():
@@ -462,9 +2175,9 @@ def api_ip_data():
         params = []
         
         if search:
-            where_conditions.append("(ip_address LIKE %s OR hostname LIKE %s OR description LIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
+            search_condition, search_params = search_conditions(search)
+            where_conditions.append(search_condition)
+            params.extend(search_params)
             
         if status_filter:
             where_conditions.append("status = %s")
@@ -479,7 +2192,7 @@ def api_ip_data():
                 description, created_at, updated_at
             FROM ip_inventory 
             {where_clause}
-            ORDER BY INET_ATON(ip_address)
+            ORDER BY ip_bin
             LIMIT %s OFFSET %s
         """
         
@@ -493,13 +2206,6 @@ def api_ip_data():
         total_result = cursor.fetchone()
         total_count = total_result['total'] if total_result else 0
         
-        # Convert datetime objects to strings
-        for row in results:
-            if row['created_at']:
-                row['created_at'] = row['created_at'].isoformat()
-            if row['updated_at']:
-                row['updated_at'] = row['updated_at'].isoformat()
-        
         cursor.close()
         connection.close()
         
@@ -515,10 +2221,107 @@ def api_ip_data():
         print(f"❌ Error in API: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics')
-def api_statistics():
-    """API to get statistics with REAL calculation from actual subnet data"""
-    print("📊 Getting REAL statistics from subnet data...")
+# ================== SEARCH ==================
+# Text terms use the ngram FULLTEXT index over hostname/description/vrf_vpn; IP-like terms
+# ("10.20.", "10.20.3.0/24", "2001:db8:") become an ip_bin range. Neither needs a table scan.
+app.config['SEARCH_MAX_RESULTS'] = 200
+SEARCH_TEXT_MATCH = "MATCH(hostname, description, vrf_vpn) AGAINST (%s IN BOOLEAN MODE)"
+SEARCH_MIN_TEXT_LENGTH = 2    # ngram_token_size default; shorter terms cannot hit the index
+SEARCH_COLUMNS = 'id, ip_address, subnet, section_id, status, vrf_vpn, hostname, description, updated_at'
+SEARCH_RESULT_COLUMNS = [column.strip() for column in SEARCH_COLUMNS.split(',')] + ['match', 'score']
+
+def parse_ip_query(term):
+    """Address range for an IP-like search term, or None.
+    
+    Accepts full addresses, CIDRs and dotted/colon prefixes: "10.20." and "10.20" both mean
+    10.20.0.0 - 10.20.255.255, "2001:db8:" means 2001:db8::/32.
+    """
+    term = term.strip()
+    try:
+        network = ipaddress.ip_network(term, strict=False)
+        return network.network_address, network.broadcast_address
+    except ValueError:
+        pass
+    
+    if ':' not in term:
+        octets = term.rstrip('.').split('.')
+        if not 1 <= len(octets) <= 3 or not all(octet.isdigit() and int(octet) <= 255 for octet in octets):
+            return None
+        if len(octets) == 1 and not term.endswith('.'):
+            return None  # a bare number is more likely a hostname fragment
+        return (ipaddress.IPv4Address('.'.join(octets + ['0'] * (4 - len(octets)))),
+                ipaddress.IPv4Address('.'.join(octets + ['255'] * (4 - len(octets)))))
+    
+    hextets = term.rstrip(':').split(':')
+    if '::' in term or not 1 <= len(hextets) <= 7:
+        return None
+    try:
+        values = [int(hextet, 16) for hextet in hextets if len(hextet) <= 4]
+    except ValueError:
+        return None
+    if len(values) != len(hextets):
+        return None
+    first = sum(value << (16 * (7 - index)) for index, value in enumerate(values))
+    return ipaddress.IPv6Address(first), ipaddress.IPv6Address(first | ((1 << (16 * (8 - len(values)))) - 1))
+
+def fulltext_phrase(term):
+    """Boolean-mode phrase for the ngram index (the parser matches it as a substring)"""
+    return '"' + term.replace('"', ' ').strip() + '"'
+
+def search_conditions(term):
+    """(SQL condition, params) for a free-text or IP search term using an index"""
+    ip_range = parse_ip_query(term)
+    if ip_range:
+        return "ip_bin BETWEEN %s AND %s", [address_to_bin(ip_range[0]), address_to_bin(ip_range[1])]
+    if len(term.strip()) >= SEARCH_MIN_TEXT_LENGTH:
+        return SEARCH_TEXT_MATCH, [fulltext_phrase(term)]
+    # Single character: prefix match on the indexed columns only
+    return "(ip_address LIKE %s OR hostname LIKE %s)", [f"{term.strip()}%"] * 2
+
+def search_inventory(cursor, term, limit, filters=(), filter_params=()):
+    """Ranked matches: address range hits first (in address order), then text hits by relevance"""
+    results = []
+    seen = set()
+    conditions = ' AND '.join(filters)
+    ip_range = parse_ip_query(term)
+    if ip_range:
+        for row in fetch_range_rows(cursor, SEARCH_COLUMNS, ip_range[0], ip_range[1],
+                                    conditions, filter_params, limit=limit):
+            row.pop('ip_bin', None)
+            row.update(match='address', score=None)
+            results.append(row)
+            seen.add(row['id'])
+    
+    if len(results) < limit and len(term.strip()) >= SEARCH_MIN_TEXT_LENGTH:
+        cursor.execute(f"""
+            SELECT {SEARCH_COLUMNS}, {SEARCH_TEXT_MATCH} as score
+            FROM ip_inventory
+            WHERE {SEARCH_TEXT_MATCH} {f'AND {conditions}' if conditions else ''}
+            ORDER BY score DESC, id
+            LIMIT %s
+        """, [fulltext_phrase(term)] * 2 + list(filter_params) + [limit])
+        for row in cursor.fetchall():
+            if row['id'] not in seen and len(results) < limit:
+                row.update(match='text', score=round(float(row['score']), 4))
+                results.append(row)
+    return results
+
+@app.route('/api/search')
+def api_search():
+    """Unified indexed search over addresses, hostnames, descriptions and VRFs"""
+    term = request.args.get('q', '').strip()
+    if not term:
+        return jsonify({'error': 'q is required'}), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), app.config['SEARCH_MAX_RESULTS']))
+    
+    filters = []
+    filter_params = []
+    if request.args.get('status'):
+        filters.append("status = %s")
+        filter_params.append(request.args.get('status'))
+    if request.args.get('section_id', type=int) is not None:
+        filters.append("section_id = %s")
+        filter_params.append(request.args.get('section_id', type=int))
     
     try:
         connection = get_db_connection()
@@ -526,97 +2329,134 @@ def api_statistics():
             return jsonify({'error': 'Database connection failed'}), 500
             
         cursor = connection.cursor(dictionary=True)
+        started = time.perf_counter()
+        results = search_inventory(cursor, term, limit, filters, filter_params)
+        took_ms = round((time.perf_counter() - started) * 1000, 1)
+        cursor.close()
+        connection.close()
         
-        # Get REAL usage data from each subnet
-        cursor.execute("""
-            SELECT 
-                subnet,
-                COUNT(*) as total_records,
-                COUNT(CASE WHEN hostname != '' AND hostname IS NOT NULL THEN 1 END) as actual_used_count,
-                COUNT(CASE WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 1 END) as actual_reserved_count,
-                COUNT(CASE WHEN (hostname = '' OR hostname IS NULL) AND (description NOT LIKE '%reserved%' OR description IS NULL) THEN 1 END) as actual_available_count
-            FROM ip_inventory 
-            WHERE subnet IS NOT NULL AND subnet != ''
-            GROUP BY subnet
-        """)
-        
-        subnet_data = cursor.fetchall()
+        ip_range = parse_ip_query(term)
+        return jsonify({
+            'query': term,
+            'ip_range': [str(ip_range[0]), str(ip_range[1])] if ip_range else None,
+            'results': to_columnar(results, SEARCH_RESULT_COLUMNS) if wants_columnar() else results,
+            'count': len(results),
+            'took_ms': took_ms
+        })
         
-        # Calculate REAL totals from subnet sizes and actual usage
-        total_possible_ips = 0
-        total_used_ips = 0
-        total_reserved_ips = 0
-        total_available_ips = 0
+    except Error as e:
+        print(f"❌ Error in search: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# The three statistics queries are independent: /api/statistics runs them concurrently
+STATISTICS_QUERIES = {
+    # Get REAL usage data from each subnet
+    'subnets': """
+        SELECT 
+            subnet,
+            MAX(section_id) as section_id,
+            COUNT(*) as total_records,
+            COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as actual_used_count,
+            COUNT(CASE WHEN derived_status = 'reserved' THEN 1 END) as actual_reserved_count,
+            COUNT(CASE WHEN derived_status = 'available' THEN 1 END) as actual_available_count
+        FROM ip_inventory 
+        WHERE subnet IS NOT NULL AND subnet != ''
+        GROUP BY subnet
+    """,
+    # Get VRF counts
+    'vrfs': "SELECT COUNT(DISTINCT vrf_vpn) as count FROM ip_inventory WHERE vrf_vpn IS NOT NULL AND vrf_vpn != ''",
+    # Get total records in database
+    'records': "SELECT COUNT(*) as total FROM ip_inventory"
+}
+
+def compute_real_statistics(cursor):
+    """Real subnet-based statistics plus per-subnet utilization, on one cursor"""
+    results = {}
+    for name, query in STATISTICS_QUERIES.items():
+        cursor.execute(query)
+        results[name] = cursor.fetchall()
+    return build_real_statistics(results)
+
+def build_real_statistics(results):
+    """Statistics and per-subnet utilization from the STATISTICS_QUERIES results"""
+    subnet_data = results['subnets']
+    
+    # Calculate REAL totals from subnet sizes and actual usage
+    total_possible_ips = 0
+    total_used_ips = 0
+    total_reserved_ips = 0
+    total_available_ips = 0
+    subnet_utilization = {}
+    
+    for row in subnet_data:
+        subnet = row['subnet']
+        actual_used = row['actual_used_count'] or 0
+        actual_reserved = row['actual_reserved_count'] or 0
         
-        for row in subnet_data:
-            subnet = row['subnet']
-            actual_used = row['actual_used_count'] or 0
-            actual_reserved = row['actual_reserved_count'] or 0
+        try:
+            # Calculate actual subnet capacity
+            capacity = subnet_capacity(subnet)
+            if capacity <= 0:
+                continue
             
-            try:
-                # Calculate actual subnet capacity
-                network = ipaddress.IPv4Network(subnet, strict=False)
-                
-                # Handle different subnet sizes
-                if network.prefixlen >= 31:
-                    subnet_capacity = network.num_addresses  # /31 and /32 can use all IPs
-                else:
-                    subnet_capacity = network.num_addresses - 2  # Exclude network and broadcast
-                
-                if subnet_capacity <= 0:
-                    continue
-                
-                # Calculate real available IPs for this subnet
-                used_ips_in_subnet = actual_used
-                reserved_ips_in_subnet = actual_reserved
-                available_ips_in_subnet = subnet_capacity - used_ips_in_subnet - reserved_ips_in_subnet
-                
-                # Ensure no negative values
-                if available_ips_in_subnet < 0:
-                    available_ips_in_subnet = 0
-                
-                # Add to totals
-                total_possible_ips += subnet_capacity
-                total_used_ips += used_ips_in_subnet
-                total_reserved_ips += reserved_ips_in_subnet
-                total_available_ips += available_ips_in_subnet
+            # Calculate real available IPs for this subnet (never negative)
+            available_ips_in_subnet = max(0, capacity - actual_used - actual_reserved)
+            
+            # Add to totals
+            total_possible_ips += capacity
+            total_used_ips += actual_used
+            total_reserved_ips += actual_reserved
+            total_available_ips += available_ips_in_subnet
+            
+            subnet_utilization[subnet] = {
+                'section_id': row['section_id'],
+                'records': row['total_records'] or 0,
+                'capacity': capacity,
+                'used': actual_used,
+                'reserved': actual_reserved,
+                'available': available_ips_in_subnet,
+                'utilization': round(actual_used / capacity * 100, 2)
+            }
                 
-                print(f"📋 Subnet {subnet}: Capacity={subnet_capacity}, Used={used_ips_in_subnet}, Available={available_ips_in_subnet}")
-                    
-            except Exception as e:
-                print(f"❌ Error processing subnet {subnet}: {e}")
-                continue
-        
-        # Get total subnets count
-        total_subnets = len(subnet_data)
-        
-        # Get VRF counts
-        cursor.execute("SELECT COUNT(DISTINCT vrf_vpn) as count FROM ip_inventory WHERE vrf_vpn IS NOT NULL AND vrf_vpn != ''")
-        total_vrfs = cursor.fetchone()['count']
-        
-        # Get total records in database
-        cursor.execute("SELECT COUNT(*) as total FROM ip_inventory")
-        total_records = cursor.fetchone()['total']
-        
-        cursor.close()
-        connection.close()
-        
-        stats = {
-            'total_possible_ips': total_possible_ips,
-            'used_ips': total_used_ips,
-            'available_ips': total_available_ips,
-            'reserved_ips': total_reserved_ips,
-            'total_ips_in_db': total_records,
-            'total_subnets': total_subnets,
-            'total_vrfs': total_vrfs,
-            'utilization_percentage': round((total_used_ips / total_possible_ips * 100), 2) if total_possible_ips > 0 else 0,
-            'calculation_method': 'Real subnet-based calculation'
-        }
+        except Exception as e:
+            print(f"❌ Error processing subnet {subnet}: {e}")
+            continue
+    
+    total_vrfs = results['vrfs'][0]['count']
+    total_records = results['records'][0]['total']
+    
+    stats = {
+        'total_possible_ips': total_possible_ips,
+        'used_ips': total_used_ips,
+        'available_ips': total_available_ips,
+        'reserved_ips': total_reserved_ips,
+        'total_ips_in_db': total_records,
+        'total_subnets': len(subnet_data),
+        'total_vrfs': total_vrfs,
+        'utilization_percentage': round((total_used_ips / total_possible_ips * 100), 2) if total_possible_ips > 0 else 0,
+        'calculation_method': 'Real subnet-based calculation'
+    }
+    return stats, subnet_utilization
+
+@app.route('/api/statistics')
+@read_only
+@coalesce
+@admission('dashboard', dashboard_cost)
+def api_statistics():
+    """API to get statistics with REAL calculation from actual subnet data"""
+    print("📊 Getting REAL statistics from subnet data...")
+    
+    try:
+        results = fan_out({name: query_task(query) for name, query in STATISTICS_QUERIES.items()})
+        stats, _ = build_real_statistics(results)
         
-        print(f"📊 REAL Stats: Possible={total_possible_ips}, Used={total_used_ips}, Available={total_available_ips}, Reserved={total_reserved_ips}")
+        print(f"📊 REAL Stats: Possible={stats['total_possible_ips']}, Used={stats['used_ips']}, Available={stats['available_ips']}, Reserved={stats['reserved_ips']}")
         print(f"📊 Utilization: {stats['utilization_percentage']}%")
         return jsonify(stats)
         
+    except QueryTimeout as e:
+        print(f"❌ Statistics timed out: {e}")
+        return jsonify({'error': str(e)}), 504
     except Error as e:
         print(f"❌ Error getting statistics: {e}")
         return jsonify({'error': str(e)}), 500
@@ -641,30 +2481,20 @@ def api_subnet_analysis():
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get all IPs in this subnet from database
-        cursor.execute("""
-            SELECT ip_address, hostname, description, status, vrf_vpn, created_at, updated_at
-            FROM ip_inventory 
-            WHERE subnet = %s OR ip_address LIKE %s
-            ORDER BY INET_ATON(ip_address)
-        """, (subnet, f"{str(network.network_address).rsplit('.', 1)[0]}%"))
-        
-        used_ips = cursor.fetchall()
+        # Page through the subnet's address range; only the requested window is listed
+        total_ips = subnet_capacity(subnet)
+        offset, limit, pagination = page_args(total_ips)
+        window = subnet_address_window(cursor, network, offset, limit,
+                                       'ip_address, hostname, description, status, vrf_vpn, created_at, updated_at')
+        status_counts = count_range_statuses(cursor, network)
         cursor.close()
         connection.close()
         
-        # Convert used IPs to dict for quick lookup
-        used_ip_dict = {}
-        for ip_data in used_ips:
-            used_ip_dict[ip_data['ip_address']] = ip_data
-        
-        # Generate all possible IPs in subnet
         all_ips = []
-        for ip in network.hosts():
-            ip_str = str(ip)
-            if ip_str in used_ip_dict:
+        for address, ip_info in window:
+            ip_str = str(address)
+            if ip_info:
                 # IP is used
-                ip_info = used_ip_dict[ip_str]
                 all_ips.append({
                     'ip_address': ip_str,
                     'status': ip_info['status'],
@@ -687,8 +2517,7 @@ def api_subnet_analysis():
                 })
         
         # Calculate statistics
-        total_ips = len(list(network.hosts()))
-        used_count = len([ip for ip in all_ips if ip['status'] in ['used', 'reserved']])
+        used_count = status_counts.get('used', 0) + status_counts.get('reserved', 0)
         available_count = total_ips - used_count
         utilization = (used_count / total_ips * 100) if total_ips > 0 else 0
         
@@ -701,7 +2530,8 @@ def api_subnet_analysis():
             'used_ips': used_count,
             'available_ips': available_count,
             'utilization_percent': round(utilization, 2),
-            'ip_list': all_ips
+            'ip_list': all_ips,
+            'pagination': pagination
         }
         
         return jsonify(result)
@@ -758,7 +2588,7 @@ def api_ip_list():
                    created_at, updated_at 
             FROM ip_inventory 
             WHERE {where_clause}
-            ORDER BY INET_ATON(ip_address)
+            ORDER BY ip_bin
             LIMIT %s OFFSET %s
         """
         cursor.execute(data_query, params + [per_page, offset])
@@ -868,9 +2698,13 @@ def api_add_ip():
         )
         
         cursor.execute(insert_query, values)
+        new_id = cursor.lastrowid
+        record_change(cursor, 'add', entity_id=new_id, ip_address=data['ip_address'], subnet=data['subnet'],
+                      section_id=section_id, status=data['status'], vrf_vpn=data.get('vrf_vpn', ''),
+                      hostname=data.get('hostname', ''), description=data.get('description', ''))
         connection.commit()
+        notify_dashboard_change()
         
-        new_id = cursor.lastrowid
         cursor.close()
         connection.close()
         
@@ -892,58 +2726,44 @@ def api_get_sections():
         return jsonify({'error': str(e)}), 500
 
 def get_network_sections_with_stats():
-    """Get all network sections with statistics"""
+    """Get all network sections with statistics (one grouped query for every section)"""
     try:
         connection = get_db_connection()
         if not connection:
             return []
             
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM network_sections ORDER BY name")
+        cursor.execute("""
+            SELECT s.*,
+                   COALESCE(sub.subnet_count, 0) as subnet_count,
+                   COALESCE(ip.ip_count, 0) as ip_count,
+                   COALESCE(ip.used_count, 0) as used_ips,
+                   COALESCE(ip.available_count, 0) as available_ips,
+                   COALESCE(ip.reserved_count, 0) as reserved_ips
+            FROM network_sections s
+            LEFT JOIN (
+                SELECT section_id, COUNT(*) as subnet_count
+                FROM subnets
+                WHERE section_id IS NOT NULL
+                GROUP BY section_id
+            ) sub ON sub.section_id = s.id
+            LEFT JOIN (
+                SELECT section_id,
+                       COUNT(*) as ip_count,
+                       SUM(CASE WHEN derived_status = 'used' THEN 1 ELSE 0 END) as used_count,
+                       SUM(CASE WHEN derived_status = 'available' THEN 1 ELSE 0 END) as available_count,
+                       SUM(CASE WHEN derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_count
+                FROM ip_inventory
+                WHERE section_id IS NOT NULL
+                GROUP BY section_id
+            ) ip ON ip.section_id = s.id
+            ORDER BY s.name
+        """)
         sections = cursor.fetchall()
         
-        # Add statistics for each section
         for section in sections:
-            section_id = section['id']
-            
-            # Count subnets for this section (using correct table name)
-            try:
-                cursor.execute("""
-                    SELECT COUNT(*) as subnet_count 
-                    FROM subnets 
-                    WHERE section_id = %s
-                """, (section_id,))
-                subnet_result = cursor.fetchone()
-                section['subnet_count'] = subnet_result['subnet_count'] if subnet_result else 0
-            except Error:
-                section['subnet_count'] = 0
-            
-            # Count IPs for this section (using correct table name)
-            try:
-                cursor.execute("""
-                    SELECT COUNT(*) as ip_count,
-                           SUM(CASE WHEN status = 'Used' THEN 1 ELSE 0 END) as used_count,
-                           SUM(CASE WHEN status = 'Available' THEN 1 ELSE 0 END) as available_count,
-                           SUM(CASE WHEN status = 'Reserved' THEN 1 ELSE 0 END) as reserved_count
-                    FROM ip_inventory 
-                    WHERE section_id = %s
-                """, (section_id,))
-                ip_result = cursor.fetchone()
-                
-                total_ips = ip_result['ip_count'] if ip_result else 0
-                used_ips = ip_result['used_count'] if ip_result else 0
-                
-                section['ip_count'] = total_ips
-                section['used_ips'] = used_ips
-                section['available_ips'] = ip_result['available_count'] if ip_result else 0
-                section['reserved_ips'] = ip_result['reserved_count'] if ip_result else 0
-                section['utilization'] = round((used_ips / total_ips * 100)) if total_ips > 0 else 0
-            except Error:
-                section['ip_count'] = 0
-                section['used_ips'] = 0
-                section['available_ips'] = 0
-                section['reserved_ips'] = 0
-                section['utilization'] = 0
+            total_ips = section['ip_count']
+            section['utilization'] = round((section['used_ips'] / total_ips * 100)) if total_ips > 0 else 0
         
         cursor.close()
         connection.close()
@@ -988,9 +2808,13 @@ def api_add_section():
         )
         
         cursor.execute(insert_query, values)
+        new_id = cursor.lastrowid
+        record_change(cursor, 'add', entity_type='section', entity_id=new_id, section_id=new_id,
+                      description=data['name'])
         connection.commit()
+        notify_dashboard_change()
+        section_cache.invalidate()
         
-        new_id = cursor.lastrowid
         cursor.close()
         connection.close()
         
@@ -1015,8 +2839,8 @@ def api_get_section_subnets(section_id):
                 s.id, s.subnet, s.description, s.vlan, s.device, s.vrf,
                 s.customer, s.location, s.created_at,
                 COUNT(i.id) as ip_count,
-                COUNT(CASE WHEN i.status = 'used' THEN 1 END) as used_count,
-                COUNT(CASE WHEN i.status = 'reserved' THEN 1 END) as reserved_count
+                COUNT(CASE WHEN i.derived_status = 'used' THEN 1 END) as used_count,
+                COUNT(CASE WHEN i.derived_status = 'reserved' THEN 1 END) as reserved_count
             FROM subnets s
             LEFT JOIN ip_inventory i ON s.subnet = i.subnet AND i.section_id = %s
             WHERE s.section_id = %s
@@ -1027,11 +2851,6 @@ def api_get_section_subnets(section_id):
         cursor.execute(query, (section_id, section_id))
         results = cursor.fetchall()
         
-        # Convert datetime objects to strings
-        for row in results:
-            if row['created_at']:
-                row['created_at'] = row['created_at'].isoformat()
-        
         cursor.close()
         connection.close()
         
@@ -1126,9 +2945,12 @@ def api_add_subnet():
         )
         
         cursor.execute(insert_query, values)
+        new_id = cursor.lastrowid
+        record_change(cursor, 'add', entity_type='subnet', entity_id=new_id, subnet=data['subnet'],
+                      section_id=section_id, vrf_vpn=data.get('vrf', ''), description=data.get('description', ''))
         connection.commit()
+        notify_dashboard_change()
         
-        new_id = cursor.lastrowid
         cursor.close()
         connection.close()
         
@@ -1157,10 +2979,10 @@ def api_subnets_overview():
             SELECT 
                 subnet,
                 COUNT(*) as used_ips,
-                SUM(CASE WHEN status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
+                SUM(CASE WHEN derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
                 GROUP_CONCAT(DISTINCT vrf_vpn) as vrfs
             FROM ip_inventory 
-            WHERE subnet IS NOT NULL AND subnet != '' AND status IN ('used', 'reserved')
+            WHERE subnet IS NOT NULL AND subnet != '' AND derived_status IN ('used', 'reserved')
         """
         
         if cidr_filter:
@@ -1183,16 +3005,9 @@ def api_subnets_overview():
             subnet = subnet_info['subnet']
             
             try:
-                # Calculate total possible IPs in subnet
-                network = ipaddress.IPv4Network(subnet, strict=False)
-                total_possible_ips = network.num_addresses
-                
-                # For /30 and smaller subnets, subtract network and broadcast
-                if network.prefixlen >= 30:
-                    usable_ips = total_possible_ips - 2 if total_possible_ips > 2 else total_possible_ips
-                else:
-                    # For larger subnets, subtract network and broadcast addresses
-                    usable_ips = total_possible_ips - 2
+                # Calculate usable IPs in subnet
+                network = ipaddress.ip_network(subnet, strict=False)
+                usable_ips = subnet_capacity(subnet)
                 
                 used_ips = subnet_info['used_ips'] - (subnet_info['reserved_ips'] or 0)  # Don't double count reserved
                 reserved_ips = subnet_info['reserved_ips'] or 0
@@ -1204,13 +3019,8 @@ def api_subnets_overview():
                 else:
                     utilization = 100.0
                 
-                # Determine IP type
-                subnet_ip = subnet.split('/')[0]
-                if subnet_ip.startswith('10.') or subnet_ip.startswith('192.168.') or \
-                   (subnet_ip.startswith('172.') and 16 <= int(subnet_ip.split('.')[1]) <= 31):
-                    ip_type = 'private'
-                else:
-                    ip_type = 'public'
+                # Determine IP type (RFC 1918 / unique local and other non-global ranges count as private)
+                ip_type = 'private' if network.is_private else 'public'
                 
                 subnets.append({
                     'subnet': subnet,
@@ -1220,6 +3030,7 @@ def api_subnets_overview():
                     'reserved_ips': reserved_ips,
                     'utilization': utilization,
                     'ip_type': ip_type,
+                    'ip_version': network.version,
                     'vrfs': subnet_info['vrfs']
                 })
                 
@@ -1241,6 +3052,7 @@ def api_subnets_overview():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/subnet-detail/<path:subnet>')
+@admission('analytics', subnet_page_cost)
 def api_subnet_detail(subnet):
     """API to get detailed IP information for a specific subnet"""
     try:
@@ -1250,29 +3062,20 @@ def api_subnet_detail(subnet):
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get all IPs in the subnet from database
-        cursor.execute("""
-            SELECT ip_address, status, hostname, description, vrf_vpn, 
-                   created_at, updated_at
-            FROM ip_inventory 
-            WHERE subnet = %s
-            ORDER BY INET_ATON(ip_address)
-        """, (subnet,))
-        
-        existing_ips = {row['ip_address']: row for row in cursor.fetchall()}
-        
-        # Calculate subnet capacity using ipaddress library
-        import ipaddress
         try:
-            network = ipaddress.IPv4Network(subnet, strict=False)
+            network = ipaddress.ip_network(subnet, strict=False)
+            
+            # List one window of the subnet's address range
+            total_ips = subnet_capacity(subnet)
+            offset, limit, pagination = page_args(total_ips)
+            window = subnet_address_window(cursor, network, offset, limit,
+                                           'ip_address, status, hostname, description, vrf_vpn, created_at, updated_at')
             all_ips = []
             
-            # Generate all possible IPs in subnet
-            for ip in network.hosts():
-                ip_str = str(ip)
-                if ip_str in existing_ips:
+            for address, ip_data in window:
+                ip_str = str(address)
+                if ip_data:
                     # IP exists in database
-                    ip_data = existing_ips[ip_str]
                     
                     # Parse interface and device from description
                     description = ip_data['description'] or ''
@@ -1289,8 +3092,6 @@ def api_subnet_detail(subnet):
                     
                     ip_data['interface_name'] = interface_name
                     ip_data['device_name'] = device_name
-                    ip_data['created_at'] = ip_data['created_at'].strftime('%Y-%m-%d %H:%M:%S') if ip_data['created_at'] else ''
-                    ip_data['updated_at'] = ip_data['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if ip_data['updated_at'] else ''
                     all_ips.append(ip_data)
                 else:
                     # IP is available
@@ -1306,20 +3107,26 @@ def api_subnet_detail(subnet):
                         'updated_at': ''
                     })
             
-            # Calculate statistics
-            total_ips = len(list(network.hosts()))
-            used_count = len([ip for ip in all_ips if ip['status'] in ['used', 'reserved']])
+            # Calculate statistics over the whole subnet, not just this page
+            first, last = host_range(network)
+            cursor.execute("""
+                SELECT vrf_vpn, derived_status as status, COUNT(*) as count
+                FROM ip_inventory
+                WHERE ip_bin BETWEEN %s AND %s AND derived_status IN ('used', 'reserved')
+                GROUP BY vrf_vpn, derived_status
+            """, (address_to_bin(first), address_to_bin(last)))
+            status_rows = cursor.fetchall()
+            used_ips = sum(row['count'] for row in status_rows if row['status'] == 'used')
+            reserved_ips = sum(row['count'] for row in status_rows if row['status'] == 'reserved')
+            used_count = used_ips + reserved_ips
             available_count = total_ips - used_count
             utilization = (used_count / total_ips * 100) if total_ips > 0 else 0
             
             # Get VRF summary
             vrf_summary = {}
-            for ip in all_ips:
-                if ip['vrf_vpn'] and ip['status'] in ['used', 'reserved']:
-                    vrf = ip['vrf_vpn']
-                    if vrf not in vrf_summary:
-                        vrf_summary[vrf] = {'used': 0, 'reserved': 0}
-                    vrf_summary[vrf][ip['status']] += 1
+            for row in status_rows:
+                if row['vrf_vpn']:
+                    vrf_summary.setdefault(row['vrf_vpn'], {'used': 0, 'reserved': 0})[row['status']] += row['count']
             
             result = {
                 'subnet': subnet,
@@ -1328,11 +3135,12 @@ def api_subnet_detail(subnet):
                 'subnet_mask': str(network.netmask),
                 'prefix_length': network.prefixlen,
                 'total_ips': total_ips,
-                'used_ips': len([ip for ip in all_ips if ip['status'] == 'used']),
-                'reserved_ips': len([ip for ip in all_ips if ip['status'] == 'reserved']),
+                'used_ips': used_ips,
+                'reserved_ips': reserved_ips,
                 'available_ips': available_count,
                 'utilization_percent': round(utilization, 2),
-                'ip_list': all_ips,
+                'ip_list': to_columnar(all_ips, SUBNET_DETAIL_IP_COLUMNS) if wants_columnar() else all_ips,
+                'pagination': pagination,
                 'vrf_summary': vrf_summary
             }
             
@@ -1348,6 +3156,9 @@ def api_subnet_detail(subnet):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/vrf-monitoring')
+@read_only
+@coalesce
+@admission('dashboard', dashboard_cost)
 def api_vrf_monitoring():
     """API to get VRF monitoring data with IP statistics"""
     try:
@@ -1365,9 +3176,9 @@ def api_vrf_monitoring():
                     ELSE vrf_vpn 
                 END as vrf_name,
                 COUNT(*) as total_ips,
-                SUM(CASE WHEN status = 'used' THEN 1 ELSE 0 END) as used_ips,
-                SUM(CASE WHEN status = 'available' THEN 1 ELSE 0 END) as available_ips,
-                SUM(CASE WHEN status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
+                SUM(CASE WHEN derived_status = 'used' THEN 1 ELSE 0 END) as used_ips,
+                SUM(CASE WHEN derived_status = 'available' THEN 1 ELSE 0 END) as available_ips,
+                SUM(CASE WHEN derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
                 COUNT(DISTINCT subnet) as subnet_count,
                 COUNT(DISTINCT hostname) as device_count,
                 GROUP_CONCAT(DISTINCT subnet ORDER BY subnet) as subnets,
@@ -1424,11 +3235,12 @@ def api_update_ip(ip_id):
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = connection.cursor()
+        cursor = connection.cursor(dictionary=True)
         
         # Check if IP exists
-        cursor.execute("SELECT id FROM ip_inventory WHERE id = %s", (ip_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT * FROM ip_inventory WHERE id = %s", (ip_id,))
+        existing_ip = cursor.fetchone()
+        if not existing_ip:
             cursor.close()
             connection.close()
             return jsonify({'error': 'IP not found'}), 404
@@ -1469,216 +3281,1599 @@ def api_update_ip(ip_id):
         values.append(ip_id)
         update_query = f"UPDATE ip_inventory SET {', '.join(update_fields)} WHERE id = %s"
         
-        cursor.execute(update_query, values)
+        cursor.execute(update_query, values)
+        updated_ip = dict(existing_ip, **{field: data[field] for field in updatable_fields if field in data})
+        record_change(cursor, 'update', entity_id=ip_id, ip_address=updated_ip['ip_address'], subnet=updated_ip['subnet'],
+                      section_id=updated_ip['section_id'], status=updated_ip['status'], vrf_vpn=updated_ip['vrf_vpn'],
+                      hostname=updated_ip['hostname'], description=updated_ip['description'])
+        if existing_ip['subnet'] and existing_ip['subnet'] != updated_ip['subnet']:
+            # Moved out of its old subnet: re-check that subnet's alerts and counters too
+            g.setdefault('touched_subnets', set()).add(existing_ip['subnet'])
+        connection.commit()
+        notify_dashboard_change()
+        
+        cursor.close()
+        connection.close()
+        
+        return jsonify({'success': True, 'message': 'IP updated successfully'})
+        
+    except Error as e:
+        print(f"❌ Error updating IP: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/delete-ip/<int:ip_id>', methods=['DELETE'])
+def api_delete_ip(ip_id):
+    """API to delete IP"""
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+            
+        cursor = connection.cursor(dictionary=True)
+        
+        # Check if IP exists
+        cursor.execute("SELECT * FROM ip_inventory WHERE id = %s", (ip_id,))
+        existing_ip = cursor.fetchone()
+        if not existing_ip:
+            cursor.close()
+            connection.close()
+            return jsonify({'error': 'IP not found'}), 404
+        
+        # Delete IP
+        cursor.execute("DELETE FROM ip_inventory WHERE id = %s", (ip_id,))
+        record_change(cursor, 'delete', entity_id=ip_id, ip_address=existing_ip['ip_address'], subnet=existing_ip['subnet'],
+                      section_id=existing_ip['section_id'], status=existing_ip['status'], vrf_vpn=existing_ip['vrf_vpn'],
+                      hostname=existing_ip['hostname'], description=existing_ip['description'])
+        connection.commit()
+        notify_dashboard_change()
+        
+        cursor.close()
+        connection.close()
+        
+        return jsonify({'success': True, 'message': 'IP deleted successfully'})
+        
+    except Error as e:
+        print(f"❌ Error deleting IP: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ================== ADVANCED DASHBOARD API ROUTES ==================
+@app.route('/api/charts-data')
+@read_only
+@coalesce
+@admission('dashboard', dashboard_cost)
+def get_charts_data():
+    """Get data for charts in advanced dashboard"""
+    try:
+        # Overall utilization trend (last 7 days, hourly points from the history table)
+        trend_end = datetime.now()
+        
+        def utilization_trend(cursor):
+            return fetch_utilization_series(
+                cursor, 'global', ['all'], trend_end - timedelta(days=7), trend_end, '1h'
+            )['all']
+        
+        # Independent aggregates, run concurrently
+        results = fan_out({
+            # Get status distribution
+            'status_distribution': query_task("""
+                SELECT derived_status as status, COUNT(*) as count 
+                FROM ip_inventory 
+                GROUP BY derived_status
+            """),
+            # Get Service Domain distribution
+            'vrf_distribution': query_task("""
+                SELECT 
+                    CASE 
+                        WHEN vrf_vpn IS NULL OR vrf_vpn = '' THEN 'No Service Domain'
+                        ELSE vrf_vpn 
+                    END as vrf_name,
+                    COUNT(*) as count 
+                FROM ip_inventory 
+                GROUP BY vrf_name
+                ORDER BY count DESC
+                LIMIT 10
+            """),
+            # Get subnet distribution
+            'subnet_distribution': query_task("""
+                SELECT subnet, COUNT(*) as count 
+                FROM ip_inventory 
+                GROUP BY subnet
+                ORDER BY count DESC
+                LIMIT 10
+            """),
+            # Get recent activity (last 7 days)
+            'recent_activity': query_task("""
+                SELECT 
+                    DATE(created_at) as date,
+                    COUNT(*) as count
+                FROM ip_inventory 
+                WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+                GROUP BY DATE(created_at)
+                ORDER BY date
+            """),
+            'utilization_trend': utilization_trend
+        })
+        
+        return jsonify(results)
+        
+    except QueryTimeout as e:
+        print(f"❌ Charts data timed out: {e}")
+        return jsonify({'error': str(e)}), 504
+    except Error as e:
+        print(f"❌ Error getting charts data: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/network-tree')
+@read_only
+@coalesce
+@admission('dashboard', dashboard_cost)
+def get_network_tree():
+    """Get network tree data organized by Service Domain"""
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+            
+        cursor = connection.cursor(dictionary=True)
+        
+        # Get tree structure grouped by VRF and subnet
+        cursor.execute("""
+            SELECT 
+                CASE 
+                    WHEN vrf_vpn IS NULL OR vrf_vpn = '' THEN 'Default'
+                    ELSE vrf_vpn 
+                END as vrf_name,
+                subnet,
+                derived_status,
+                COUNT(*) as count
+            FROM ip_inventory 
+            GROUP BY vrf_name, subnet, derived_status
+            ORDER BY vrf_name, subnet, derived_status
+        """)
+        
+        raw_data = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        
+        # Organize data into tree structure
+        tree_data = {}
+        
+        for row in raw_data:
+            vrf_name = row['vrf_name']
+            subnet = row['subnet']
+            status = row['derived_status']
+            count = row['count']
+            
+            if vrf_name not in tree_data:
+                tree_data[vrf_name] = {}
+            
+            if subnet not in tree_data[vrf_name]:
+                tree_data[vrf_name][subnet] = {}
+            
+            tree_data[vrf_name][subnet][status] = count
+        
+        return jsonify(tree_data)
+        
+    except Error as e:
+        print(f"❌ Error getting network tree: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/vrf-vpn-analysis')
+def get_vrf_vpn_analysis():
+    """Get Service Domain analysis data"""
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+            
+        cursor = connection.cursor(dictionary=True)
+        
+        # Get detailed Service Domain statistics
+        cursor.execute("""
+            SELECT 
+                CASE 
+                    WHEN vrf_vpn IS NULL OR vrf_vpn = '' THEN 'No Service Domain'
+                    ELSE vrf_vpn 
+                END as vrf_name,
+                COUNT(*) as total_ips,
+                SUM(CASE WHEN derived_status = 'used' THEN 1 ELSE 0 END) as used_ips,
+                SUM(CASE WHEN derived_status = 'available' THEN 1 ELSE 0 END) as available_ips,
+                SUM(CASE WHEN derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
+                COUNT(DISTINCT subnet) as subnet_count
+            FROM ip_inventory 
+            GROUP BY vrf_name
+            ORDER BY total_ips DESC
+        """)
+        
+        vrf_analysis = cursor.fetchall()
+        
+        # Calculate utilization percentages
+        for vrf in vrf_analysis:
+            if vrf['total_ips'] > 0:
+                vrf['utilization_percentage'] = round((vrf['used_ips'] / vrf['total_ips']) * 100, 2)
+            else:
+                vrf['utilization_percentage'] = 0
+        
+        cursor.close()
+        connection.close()
+        
+        return jsonify({
+            'vrf_analysis': vrf_analysis,
+            'total_vrfs': len(vrf_analysis)
+        })
+        
+    except Error as e:
+        print(f"❌ Error getting Service Domain analysis: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ================== DASHBOARD BOOTSTRAP ==================
+# One request for everything a dashboard shows on load. The widgets share one grouped pass
+# over ip_inventory (per section, subnet, VRF and status) instead of each running its own scan.
+STATUS_COLORS = {'used': '#dc3545', 'available': '#28a745', 'reserved': '#ffc107'}
+
+def dashboard_utilization_trend(cursor):
+    """Overall utilization, hourly points for the last 7 days"""
+    end = datetime.now()
+    return fetch_utilization_series(cursor, 'global', ['all'], end - timedelta(days=7), end, '1h')['all']
+
+# Independent queries behind the widgets; only those the requested widgets need are run
+DASHBOARD_SOURCES = {
+    'inventory_summary': query_task("""
+        SELECT section_id, subnet, vrf_vpn, derived_status, COUNT(*) as count
+        FROM ip_inventory
+        GROUP BY section_id, subnet, vrf_vpn, derived_status
+    """),
+    'section_subnets': query_task("""
+        SELECT section_id, COUNT(*) as subnet_count
+        FROM subnets
+        WHERE section_id IS NOT NULL
+        GROUP BY section_id
+    """),
+    'utilization_trend': dashboard_utilization_trend
+}
+
+def vrf_display_name(vrf_vpn):
+    return vrf_vpn if vrf_vpn else 'No Service Domain'
+
+def summary_counts(rows, key):
+    """{key(row): {'total', 'used', 'available', 'reserved'}} from inventory_summary rows"""
+    groups = {}
+    for row in rows:
+        group = groups.setdefault(key(row), {'total': 0, 'used': 0, 'available': 0, 'reserved': 0})
+        group['total'] += row['count']
+        group[row['derived_status']] += row['count']
+    return groups
+
+class DashboardContext:
+    """Source results plus values derived from them, each computed once per request"""
+
+    def __init__(self, results):
+        self.results = results
+        self.derived = {}
+
+    def get(self, name):
+        if name in self.results:
+            return self.results[name]
+        if name not in self.derived:
+            self.derived[name] = DASHBOARD_DERIVED[name](self)
+        return self.derived[name]
+
+def derive_real_statistics(context):
+    """build_real_statistics() fed from the summary instead of STATISTICS_QUERIES"""
+    rows = context.get('inventory_summary')
+    subnets = summary_counts([row for row in rows if row['subnet']], lambda row: row['subnet'])
+    sections = {row['subnet']: row['section_id'] for row in rows if row['subnet'] and row['section_id'] is not None}
+    return build_real_statistics({
+        'subnets': [{
+            'subnet': subnet,
+            'section_id': sections.get(subnet),
+            'total_records': counts['total'],
+            'actual_used_count': counts['used'],
+            'actual_reserved_count': counts['reserved'],
+            'actual_available_count': counts['available']
+        } for subnet, counts in subnets.items()],
+        'vrfs': [{'count': len({row['vrf_vpn'] for row in rows if row['vrf_vpn']})}],
+        'records': [{'total': sum(row['count'] for row in rows)}]
+    })
+
+DASHBOARD_DERIVED = {
+    'real_statistics': derive_real_statistics,
+    'vrf_counts': lambda context: summary_counts(context.get('inventory_summary'),
+                                                 lambda row: vrf_display_name(row['vrf_vpn']))
+}
+
+def widget_status_distribution(context):
+    counts = summary_counts(context.get('inventory_summary'), lambda row: row['derived_status'])
+    return [{'status': status, 'count': group['total'], 'color': STATUS_COLORS[status]}
+            for status, group in sorted(counts.items())]
+
+def widget_subnet_distribution(context):
+    counts = summary_counts(context.get('inventory_summary'), lambda row: row['subnet'])
+    ranked = sorted(counts.items(), key=lambda item: item[1]['total'], reverse=True)[:10]
+    return [{'subnet': subnet, 'count': group['total']} for subnet, group in ranked]
+
+def widget_vrf_distribution(context):
+    ranked = sorted(context.get('vrf_counts').items(), key=lambda item: item[1]['total'], reverse=True)[:10]
+    return [{'vrf_name': name, 'count': group['total']} for name, group in ranked]
+
+def widget_vrf_analysis(context):
+    subnets = {}
+    for row in context.get('inventory_summary'):
+        subnets.setdefault(vrf_display_name(row['vrf_vpn']), set()).add(row['subnet'])
+    analysis = [{
+        'vrf_vpn': name,
+        'ip_count': group['total'],
+        'used_count': group['used'],
+        'available_count': group['available'],
+        'reserved_count': group['reserved'],
+        'subnet_count': len(subnets[name]),
+        'utilization_percentage': round(group['used'] / group['total'] * 100, 2) if group['total'] else 0
+    } for name, group in context.get('vrf_counts').items()]
+    return sorted(analysis, key=lambda item: item['ip_count'], reverse=True)
+
+def widget_top_subnets(context):
+    _, subnet_utilization = context.get('real_statistics')
+    ranked = sorted(subnet_utilization.items(), key=lambda item: item[1]['utilization'], reverse=True)[:10]
+    return [dict(values, subnet=subnet) for subnet, values in ranked]
+
+def widget_network_tree(context):
+    """Root -> VRF -> subnet nodes in the shape the tree view renders"""
+    per_subnet = summary_counts(context.get('inventory_summary'),
+                                lambda row: (vrf_display_name(row['vrf_vpn']), row['subnet']))
+    vrfs = {}
+    for (vrf_name, subnet), counts in sorted(per_subnet.items()):
+        try:
+            size = subnet_capacity(subnet)
+        except ValueError:
+            size = 0
+        vrf = vrfs.setdefault(vrf_name, {'type': 'vrf', 'name': vrf_name, 'ip_count': 0, 'children': []})
+        vrf['ip_count'] += counts['total']
+        vrf['children'].append({
+            'type': 'subnet',
+            'name': subnet,
+            'used': counts['used'],
+            'size': size,
+            'utilization': round(counts['used'] / size * 100, 1) if size > 0 else 0
+        })
+    return {'type': 'root', 'name': 'All Networks', 'children': list(vrfs.values())}
+
+def widget_sections(context):
+    """Same rows as /api/sections"""
+    subnet_counts = {row['section_id']: row['subnet_count'] for row in context.get('section_subnets')}
+    ip_counts = summary_counts([row for row in context.get('inventory_summary') if row['section_id'] is not None],
+                               lambda row: row['section_id'])
+    sections = []
+    for section in sorted(section_cache.all(), key=lambda row: row['name']):
+        counts = ip_counts.get(section['id'], {'total': 0, 'used': 0, 'available': 0, 'reserved': 0})
+        section.update({
+            'subnet_count': subnet_counts.get(section['id'], 0),
+            'ip_count': counts['total'],
+            'used_ips': counts['used'],
+            'available_ips': counts['available'],
+            'reserved_ips': counts['reserved'],
+            'utilization': round(counts['used'] / counts['total'] * 100) if counts['total'] > 0 else 0
+        })
+        sections.append(section)
+    return sections
+
+# Widget name -> (sources it needs, builder)
+DASHBOARD_WIDGETS = {
+    'statistics': (('inventory_summary',), lambda context: context.get('real_statistics')[0]),
+    'status_distribution': (('inventory_summary',), widget_status_distribution),
+    'vrf_distribution': (('inventory_summary',), widget_vrf_distribution),
+    'subnet_distribution': (('inventory_summary',), widget_subnet_distribution),
+    'top_subnets': (('inventory_summary',), widget_top_subnets),
+    'vrf_analysis': (('inventory_summary',), widget_vrf_analysis),
+    'network_tree': (('inventory_summary',), widget_network_tree),
+    'sections': (('inventory_summary', 'section_subnets'), widget_sections),
+    'utilization_trend': (('utilization_trend',), lambda context: context.get('utilization_trend'))
+}
+
+@app.route('/api/dashboard/bootstrap', methods=['GET', 'POST'])
+@read_only
+@coalesce
+@admission('dashboard', dashboard_cost)
+def api_dashboard_bootstrap():
+    """Several dashboard widgets in one response: ?widgets=a,b or {"widgets": [...]} (default: all)"""
+    if request.method == 'POST':
+        widgets = (request.get_json(silent=True) or {}).get('widgets') or list(DASHBOARD_WIDGETS)
+    else:
+        widgets = [name.strip() for name in request.args.get('widgets', '').split(',') if name.strip()]
+        widgets = widgets or list(DASHBOARD_WIDGETS)
+    unknown = [name for name in widgets if name not in DASHBOARD_WIDGETS]
+    if unknown:
+        return jsonify({'error': f"Unknown widgets: {', '.join(unknown)}",
+                        'available': list(DASHBOARD_WIDGETS)}), 400
+
+    try:
+        started = time.perf_counter()
+        sources = {source for name in widgets for source in DASHBOARD_WIDGETS[name][0]}
+        context = DashboardContext(fan_out({source: DASHBOARD_SOURCES[source] for source in sources}))
+        result = {name: DASHBOARD_WIDGETS[name][1](context) for name in widgets}
+        return jsonify({'widgets': result, 'took_ms': round((time.perf_counter() - started) * 1000, 1)})
+
+    except QueryTimeout as e:
+        print(f"❌ Dashboard bootstrap timed out: {e}")
+        return jsonify({'error': str(e)}), 504
+    except Error as e:
+        print(f"❌ Error building dashboard bootstrap: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ================== UTILIZATION HISTORY ==================
+app.config['UTILIZATION_SAMPLE_INTERVAL'] = int(os.environ.get('IPAM_UTILIZATION_INTERVAL', 300))  # 0 disables the in-process sampler
+app.config['UTILIZATION_RETENTION_DAYS'] = {'5m': 2, '1h': 90, '1d': 1825}
+app.config['UTILIZATION_MAX_POINTS'] = 500     # Auto resolution picks the finest level under this many points per series
+
+UTILIZATION_RESOLUTIONS = {'5m': timedelta(minutes=5), '1h': timedelta(hours=1), '1d': timedelta(days=1)}
+UTILIZATION_SCOPES = ['global', 'section', 'vrf', 'subnet']
+
+# Source resolution and bucket expression for each rollup level
+UTILIZATION_ROLLUPS = [
+    ('1h', '5m', "DATE(bucket_start) + INTERVAL HOUR(bucket_start) HOUR"),
+    ('1d', '1h', "TIMESTAMP(DATE(bucket_start))")
+]
+
+utilization_sampler = None
+utilization_sampler_lock = threading.Lock()
+
+def floor_bucket(moment, resolution):
+    """Start of the bucket containing moment"""
+    step = int(UTILIZATION_RESOLUTIONS[resolution].total_seconds())
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = int((moment - midnight).total_seconds()) // step * step
+    return midnight + timedelta(seconds=offset)
+
+def collect_utilization_points(cursor):
+    """Current capacity/used/reserved per subnet, section, VRF and overall"""
+    stats, subnet_utilization = compute_real_statistics(cursor)
+    
+    # Section and VRF membership of each subnet, from the same inventory rows
+    cursor.execute("""
+        SELECT subnet, MAX(section_id) as section_id, MAX(NULLIF(vrf_vpn, '')) as vrf_vpn
+        FROM ip_inventory
+        WHERE subnet IS NOT NULL AND subnet != ''
+        GROUP BY subnet
+    """)
+    membership = {row['subnet']: row for row in cursor.fetchall()}
+    
+    points = {('global', 'all'): {
+        'capacity': stats['total_possible_ips'],
+        'used': stats['used_ips'],
+        'reserved': stats['reserved_ips']
+    }}
+    for subnet, usage in subnet_utilization.items():
+        points[('subnet', subnet)] = {key: usage[key] for key in ('capacity', 'used', 'reserved')}
+        row = membership.get(subnet, {})
+        for scope, key in (('section', row.get('section_id')), ('vrf', row.get('vrf_vpn'))):
+            if key is None:
+                continue
+            total = points.setdefault((scope, str(key)), {'capacity': 0, 'used': 0, 'reserved': 0})
+            for field in total:
+                total[field] += usage[field]
+    return points
+
+def record_utilization_samples(cursor, points, bucket):
+    """Write one 5m point per scope; re-running inside the same bucket overwrites it"""
+    rows = []
+    for (scope, key), point in points.items():
+        utilization = round(point['used'] / point['capacity'] * 100, 2) if point['capacity'] else 0
+        rows.append(('5m', scope, key[:100], bucket, point['capacity'], point['used'], point['used'],
+                     point['reserved'], utilization, utilization))
+    cursor.executemany("""
+        INSERT INTO utilization_history
+        (resolution, scope, scope_key, bucket_start, capacity, used_avg, used_max,
+         reserved_avg, utilization_avg, utilization_max, samples)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 1)
+        ON DUPLICATE KEY UPDATE
+        capacity = VALUES(capacity), used_avg = VALUES(used_avg), used_max = VALUES(used_max),
+        reserved_avg = VALUES(reserved_avg), utilization_avg = VALUES(utilization_avg),
+        utilization_max = VALUES(utilization_max), samples = 1
+    """, rows)
+    return len(rows)
+
+def rollup_utilization(cursor, now):
+    """Re-aggregate the open and previous hourly/daily buckets from the finer level"""
+    rolled = {}
+    for target, source, bucket_expression in UTILIZATION_ROLLUPS:
+        since = floor_bucket(now, target) - UTILIZATION_RESOLUTIONS[target]
+        cursor.execute(f"""
+            INSERT INTO utilization_history
+            (resolution, scope, scope_key, bucket_start, capacity, used_avg, used_max,
+             reserved_avg, utilization_avg, utilization_max, samples)
+            SELECT %s, scope, scope_key, {bucket_expression} as rolled_bucket,
+                   MAX(capacity),
+                   SUM(used_avg * samples) / SUM(samples),
+                   MAX(used_max),
+                   SUM(reserved_avg * samples) / SUM(samples),
+                   SUM(utilization_avg * samples) / SUM(samples),
+                   MAX(utilization_max),
+                   SUM(samples)
+            FROM utilization_history
+            WHERE resolution = %s AND bucket_start >= %s
+            GROUP BY scope, scope_key, rolled_bucket
+            ON DUPLICATE KEY UPDATE
+            capacity = VALUES(capacity), used_avg = VALUES(used_avg), used_max = VALUES(used_max),
+            reserved_avg = VALUES(reserved_avg), utilization_avg = VALUES(utilization_avg),
+            utilization_max = VALUES(utilization_max), samples = VALUES(samples)
+        """, (target, source, since))
+        rolled[target] = cursor.rowcount
+    return rolled
+
+def prune_utilization_history(connection, cursor, now, batch_size=10000):
+    """Delete points past retention in small batches so the table is never locked for long"""
+    deleted = {}
+    for resolution, days in app.config['UTILIZATION_RETENTION_DAYS'].items():
+        cutoff = now - timedelta(days=days)
+        deleted[resolution] = 0
+        while True:
+            cursor.execute("""
+                DELETE FROM utilization_history
+                WHERE resolution = %s AND bucket_start < %s
+                LIMIT %s
+            """, (resolution, cutoff, batch_size))
+            connection.commit()
+            deleted[resolution] += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+    return deleted
+
+def run_utilization_snapshot(now=None):
+    """Sample current utilization, roll up, recount subnet counters, apply retention and refresh forecasts when due"""
+    now = now or datetime.now()
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError('Database connection failed')
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        points = collect_utilization_points(cursor)
+        samples = record_utilization_samples(cursor, points, floor_bucket(now, '5m'))
+        rolled = rollup_utilization(cursor, now)
+        counters = refresh_subnet_counters(cursor, now=now)
+        connection.commit()
+        deleted = prune_utilization_history(connection, cursor, now)
+        forecasts = refresh_forecasts(connection, cursor, now) if forecasts_due(cursor, now) else None
+        cursor.close()
+        return {'samples': samples, 'rolled_up': rolled, 'counters': counters, 'deleted': deleted, 'forecasts': forecasts}
+    finally:
+        connection.close()
+
+def utilization_sampler_loop():
+    """Background loop aligned to the sample interval"""
+    interval = app.config['UTILIZATION_SAMPLE_INTERVAL']
+    while True:
+        try:
+            run_utilization_snapshot()
+        except Exception as e:
+            print(f"❌ Error recording utilization snapshot: {e}")
+        time.sleep(interval - time.time() % interval)
+
+def start_utilization_sampler():
+    """Start the in-process sampler once; several processes sampling the same bucket is harmless"""
+    global utilization_sampler
+    if app.config['UTILIZATION_SAMPLE_INTERVAL'] <= 0:
+        return
+    with utilization_sampler_lock:
+        if utilization_sampler is None or not utilization_sampler.is_alive():
+            utilization_sampler = threading.Thread(target=utilization_sampler_loop, name='utilization-sampler', daemon=True)
+            utilization_sampler.start()
+
+def pick_utilization_resolution(start, end):
+    """Finest resolution that stays within retention and the point budget for the range"""
+    oldest_needed = (datetime.now() - start).days
+    for resolution, step in UTILIZATION_RESOLUTIONS.items():
+        if oldest_needed > app.config['UTILIZATION_RETENTION_DAYS'][resolution]:
+            continue
+        if (end - start) / step <= app.config['UTILIZATION_MAX_POINTS']:
+            return resolution
+    return '1d'
+
+def fetch_utilization_series(cursor, scope, keys, start, end, resolution):
+    """Points per scope key, oldest first"""
+    cursor.execute(f"""
+        SELECT scope_key, bucket_start as t, capacity, used_avg as used, used_max,
+               reserved_avg as reserved, utilization_avg as utilization, utilization_max
+        FROM utilization_history
+        WHERE resolution = %s AND scope = %s
+          AND scope_key IN ({', '.join(['%s'] * len(keys))})
+          AND bucket_start >= %s AND bucket_start <= %s
+        ORDER BY scope_key, bucket_start
+    """, [resolution, scope] + list(keys) + [start, end])
+    
+    series = {key: [] for key in keys}
+    for row in cursor.fetchall():
+        series[row.pop('scope_key')].append(row)
+    return series
+
+@app.route('/api/utilization/history')
+def api_utilization_history():
+    """Pre-aggregated utilization series for trend charts"""
+    scope = request.args.get('scope', 'global')
+    if scope not in UTILIZATION_SCOPES:
+        return jsonify({'error': f"scope must be one of: {', '.join(UTILIZATION_SCOPES)}"}), 400
+    keys = request.args.getlist('key') or (['all'] if scope == 'global' else [])
+    if not keys:
+        return jsonify({'error': 'At least one key is required for this scope'}), 400
+    
+    try:
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.now()
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=7)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 timestamps'}), 400
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    
+    resolution = request.args.get('resolution', 'auto')
+    if resolution == 'auto':
+        resolution = pick_utilization_resolution(start, end)
+    elif resolution not in UTILIZATION_RESOLUTIONS:
+        return jsonify({'error': f"resolution must be auto or one of: {', '.join(UTILIZATION_RESOLUTIONS)}"}), 400
+    
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+        
+        cursor = connection.cursor(dictionary=True)
+        series = fetch_utilization_series(cursor, scope, keys, start, end, resolution)
+        cursor.close()
+        connection.close()
+        
+        if wants_columnar():
+            series = {key: to_columnar(points, UTILIZATION_POINT_COLUMNS) for key, points in series.items()}
+        
+        return jsonify({
+            'scope': scope,
+            'resolution': resolution,
+            'start': start,
+            'end': end,
+            'series': series
+        })
+        
+    except Error as e:
+        print(f"❌ Error getting utilization history: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/utilization/snapshot', methods=['POST'])
+def api_utilization_snapshot():
+    """Record a utilization sample now (for cron jobs or after large imports)"""
+    try:
+        return jsonify({'success': True, **run_utilization_snapshot()})
+    except Exception as e:
+        print(f"❌ Error recording utilization snapshot: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ================== CAPACITY FORECASTING ==================
+app.config['FORECAST_WINDOW_DAYS'] = 30          # History used to fit the growth rate
+app.config['FORECAST_MIN_POINTS'] = 6            # Hourly points required before a trend is reported
+app.config['FORECAST_REFRESH_INTERVAL'] = 3600   # Seconds between batch refreshes triggered by the sampler
+app.config['FORECAST_HORIZON_DAYS'] = 36500      # Projections further out than this are reported as None
+
+def fit_growth(fit):
+    """Least-squares slope (IPs/day) and r² from aggregated sums"""
+    n = fit['n']
+    denominator = n * fit['sxx'] - fit['sx'] ** 2
+    if n < app.config['FORECAST_MIN_POINTS'] or denominator <= 0:
+        return None, None
+    covariance = n * fit['sxy'] - fit['sx'] * fit['sy']
+    slope = covariance / denominator
+    spread = n * fit['syy'] - fit['sy'] ** 2
+    r_squared = min(1.0, covariance ** 2 / (denominator * spread)) if spread > 0 else None
+    return slope, r_squared
+
+def days_until(target, current, slope):
+    """Days until current reaches target at slope per day (0 when already there)"""
+    if current >= target:
+        return 0
+    if not slope or slope <= 0:
+        return None
+    days = (target - current) / slope
+    return round(days, 1) if days <= app.config['FORECAST_HORIZON_DAYS'] else None
+
+def compute_forecasts(cursor, scope, now=None):
+    """Fit growth for every key of a scope with one grouped regression query"""
+    now = now or datetime.now()
+    window_start = now - timedelta(days=app.config['FORECAST_WINDOW_DAYS'])
+    
+    # Regression sums per key (x = days since window start, y = used IPs)
+    cursor.execute("""
+        SELECT scope_key, COUNT(*) as n,
+               SUM(x) as sx, SUM(y) as sy, SUM(x * x) as sxx, SUM(x * y) as sxy, SUM(y * y) as syy
+        FROM (
+            SELECT scope_key, TIMESTAMPDIFF(MINUTE, %s, bucket_start) / 1440 as x, used_avg as y
+            FROM utilization_history
+            WHERE resolution = '1h' AND scope = %s AND bucket_start >= %s
+        ) points
+        GROUP BY scope_key
+    """, (window_start, scope, window_start))
+    fits = {row['scope_key']: {key: float(row[key] or 0) for key in ('n', 'sx', 'sy', 'sxx', 'sxy', 'syy')}
+            for row in cursor.fetchall()}
+    
+    # Latest capacity and usage per key
+    cursor.execute("""
+        SELECT h.scope_key, h.capacity, h.used_avg as used
+        FROM utilization_history h
+        JOIN (
+            SELECT scope_key, MAX(bucket_start) as latest
+            FROM utilization_history
+            WHERE resolution = '5m' AND scope = %s
+            GROUP BY scope_key
+        ) l ON h.scope_key = l.scope_key AND h.bucket_start = l.latest
+        WHERE h.resolution = '5m' AND h.scope = %s
+    """, (scope, scope))
+    latest = {row['scope_key']: row for row in cursor.fetchall()}
+    
+    # Per-subnet thresholds; other scopes use the default
+    settings = {}
+    if scope == 'subnet':
+        cursor.execute("""
+            SELECT subnet, MIN(threshold_percentage) as threshold_percentage, MAX(mark_as_full) as mark_as_full
+            FROM subnets
+            GROUP BY subnet
+        """)
+        settings = {row['subnet']: row for row in cursor.fetchall()}
+    
+    forecasts = []
+    for key, current in latest.items():
+        capacity = int(current['capacity'])
+        used = float(current['used'])
+        setting = settings.get(key, {})
+        threshold = setting.get('threshold_percentage') or 80
+        marked_full = bool(setting.get('mark_as_full'))
+        slope, r_squared = fit_growth(fits[key]) if key in fits else (None, None)
+        
+        forecasts.append({
+            'scope': scope,
+            'scope_key': key,
+            'computed_at': now,
+            'capacity': capacity,
+            'used': int(round(used)),
+            'utilization': round(used / capacity * 100, 2) if capacity else 0,
+            'threshold_percentage': threshold,
+            'mark_as_full': marked_full,
+            'growth_per_day': round(slope, 4) if slope is not None else None,
+            'r_squared': round(r_squared, 4) if r_squared is not None else None,
+            'days_to_threshold': 0 if marked_full else days_until(capacity * threshold / 100, used, slope),
+            'days_to_full': 0 if marked_full else days_until(capacity, used, slope),
+            'sample_points': int(fits.get(key, {}).get('n', 0))
+        })
+    return forecasts
+
+FORECAST_COLUMNS = ['scope', 'scope_key', 'computed_at', 'capacity', 'used', 'utilization', 'threshold_percentage',
+                    'mark_as_full', 'growth_per_day', 'r_squared', 'days_to_threshold', 'days_to_full', 'sample_points']
+
+def refresh_forecasts(connection, cursor, now=None):
+    """Recompute forecasts for every scope and replace the stored results"""
+    now = (now or datetime.now()).replace(microsecond=0)  # Matches DATETIME precision for the stale-row delete
+    summary = {}
+    for scope in UTILIZATION_SCOPES:
+        forecasts = compute_forecasts(cursor, scope, now)
+        if forecasts:
+            cursor.executemany(f"""
+                INSERT INTO capacity_forecasts ({', '.join(FORECAST_COLUMNS)})
+                VALUES ({', '.join(['%s'] * len(FORECAST_COLUMNS))})
+                ON DUPLICATE KEY UPDATE {', '.join(f'{column} = VALUES({column})' for column in FORECAST_COLUMNS[2:])}
+            """, [tuple(forecast[column] for column in FORECAST_COLUMNS) for forecast in forecasts])
+        cursor.execute("DELETE FROM capacity_forecasts WHERE scope = %s AND computed_at < %s", (scope, now))
+        connection.commit()
+        summary[scope] = len(forecasts)
+    return summary
+
+def forecasts_due(cursor, now):
+    """True when the stored forecasts are older than FORECAST_REFRESH_INTERVAL"""
+    cursor.execute("SELECT MAX(computed_at) as computed_at FROM capacity_forecasts")
+    computed_at = cursor.fetchone()['computed_at']
+    return computed_at is None or (now - computed_at).total_seconds() >= app.config['FORECAST_REFRESH_INTERVAL']
+
+@app.route('/api/forecasts')
+def api_forecasts():
+    """Subnets (or VRFs/sections) ranked by how soon they reach their threshold"""
+    scope = request.args.get('scope', 'subnet')
+    if scope not in UTILIZATION_SCOPES:
+        return jsonify({'error': f"scope must be one of: {', '.join(UTILIZATION_SCOPES)}"}), 400
+    limit = min(request.args.get('limit', 50, type=int), 1000)
+    within_days = request.args.get('within_days', type=float)
+    rank_by = 'days_to_full' if request.args.get('rank_by') == 'full' else 'days_to_threshold'
+    
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+        
+        cursor = connection.cursor(dictionary=True)
+        
+        conditions = ["scope = %s"]
+        params = [scope]
+        if within_days is not None:
+            conditions.append(f"{rank_by} <= %s")
+            params.append(within_days)
+        else:
+            conditions.append(f"{rank_by} IS NOT NULL")
+        
+        cursor.execute(f"""
+            SELECT {', '.join(FORECAST_COLUMNS[1:])}
+            FROM capacity_forecasts
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {rank_by}, utilization DESC
+            LIMIT %s
+        """, params + [limit])
+        forecasts = cursor.fetchall()
+        
+        cursor.close()
+        connection.close()
+        
+        for forecast in forecasts:
+            forecast['mark_as_full'] = bool(forecast['mark_as_full'])
+            for field, projected in (('days_to_threshold', 'threshold_date'), ('days_to_full', 'full_date')):
+                days = forecast[field]
+                forecast[projected] = (forecast['computed_at'] + timedelta(days=float(days))).date() if days is not None else None
+        
+        return jsonify({
+            'scope': scope,
+            'rank_by': rank_by,
+            'forecasts': forecasts,
+            'count': len(forecasts)
+        })
+        
+    except Error as e:
+        print(f"❌ Error getting forecasts: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/forecasts/refresh', methods=['POST'])
+def api_refresh_forecasts():
+    """Recompute all forecasts now"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        summary = refresh_forecasts(connection, cursor)
+        cursor.close()
+        return jsonify({'success': True, 'forecasts': summary})
+    except Error as e:
+        print(f"❌ Error refreshing forecasts: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
+
+# ================== SUBNET COUNTERS ==================
+def refresh_subnet_counters(cursor, subnets=None, now=None):
+    """Recount used/reserved addresses into the subnets rows (all rows, or those with the given CIDRs).
+
+    Counts are kept per (subnet, section_id) so each section's dashboard reads its own
+    rows; capacity and utilization are stored alongside for ORDER BY utilization LIMIT k.
+    """
+    now = now or datetime.now()
+    where = ''
+    params = []
+    if subnets is not None:
+        if not subnets:
+            return 0
+        where = f"WHERE subnet IN ({', '.join(['%s'] * len(subnets))})"
+        params = list(subnets)
+
+    cursor.execute(f"""
+        SELECT subnet, section_id,
+               COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as used,
+               COUNT(CASE WHEN derived_status = 'reserved' THEN 1 END) as reserved
+        FROM ip_inventory
+        {where}
+        GROUP BY subnet, section_id
+    """, params)
+    counts = {(row['subnet'], row['section_id']): row for row in cursor.fetchall()}
+
+    cursor.execute(f"SELECT id, subnet, section_id FROM subnets {where}", params)
+    updates = []
+    for row in cursor.fetchall():
+        try:
+            capacity = subnet_capacity(row['subnet'])
+        except ValueError:
+            continue
+        count = counts.get((row['subnet'], row['section_id']), {})
+        used = count.get('used', 0)
+        reserved = count.get('reserved', 0)
+        utilization = min(round(used / capacity * 100, 2), 100) if capacity > 0 else 0
+        updates.append((used, reserved, capacity, utilization, now, row['id']))
+
+    if updates:
+        cursor.executemany("""
+            UPDATE subnets
+            SET used_count = %s, reserved_count = %s, capacity = %s, utilization = %s, counters_updated_at = %s
+            WHERE id = %s
+        """, updates)
+    return len(updates)
+
+def refresh_stale_subnet_counters(cursor, batch_size=500):
+    """Count subnets that have never been counted (new installs, rows added outside the app)"""
+    cursor.execute("SELECT DISTINCT subnet FROM subnets WHERE counters_updated_at IS NULL")
+    subnets = [row['subnet'] for row in cursor.fetchall()]
+    refreshed = 0
+    for start in range(0, len(subnets), batch_size):
+        refreshed += refresh_subnet_counters(cursor, subnets[start:start + batch_size])
+    return refreshed
+
+# ================== SUBNET ALERTS ==================
+app.config['ALERT_SINKS'] = [sink.strip() for sink in os.environ.get('IPAM_ALERT_SINKS', 'log').split(',') if sink.strip()]
+app.config['ALERT_LOG_FILE'] = os.environ.get('IPAM_ALERT_LOG_FILE', 'alerts.log')
+app.config['ALERT_WEBHOOK_URL'] = os.environ.get('IPAM_ALERT_WEBHOOK_URL', 'http://127.0.0.1:5099/alerts')
+app.config['ALERT_WEBHOOK_TIMEOUT'] = 5
+app.config['ALERT_DEBOUNCE'] = 2.0              # Seconds to collect touched subnets before evaluating
+app.config['ALERT_HYSTERESIS'] = 2              # Percentage points below threshold before an alert resolves
+app.config['ALERT_RENOTIFY_INTERVAL'] = 6 * 3600  # Seconds before an unchanged active alert is sent again
+app.config['ALERT_RATE_LIMIT'] = 30             # Notifications per minute per process; the rest wait for the next pass
+app.config['ALERT_BATCH_SIZE'] = 500            # Subnets per evaluation query
+app.config['ALERT_RETRY_INTERVAL'] = 60         # Seconds between sweeps re-sending undelivered notifications
+
+class LogFileAlertSink:
+    """Append one JSON line per notification"""
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def send(self, notifications):
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            for notification in notifications:
+                handle.write(app.json.dumps(notification) + '\n')
+
+class WebhookAlertSink:
+    """POST notifications as one JSON batch"""
+    
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+    
+    def send(self, notifications):
+        body = app.json.dumps({'alerts': notifications}).encode('utf-8')
+        webhook_request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(webhook_request, timeout=self.timeout) as response:
+            response.read()
+
+# Sink name -> factory; extensions can add their own with register_alert_sink()
+ALERT_SINK_FACTORIES = {
+    'log': lambda: LogFileAlertSink(app.config['ALERT_LOG_FILE']),
+    'webhook': lambda: WebhookAlertSink(app.config['ALERT_WEBHOOK_URL'], app.config['ALERT_WEBHOOK_TIMEOUT'])
+}
+
+def register_alert_sink(name, factory):
+    """Make a sink available to IPAM_ALERT_SINKS"""
+    ALERT_SINK_FACTORIES[name] = factory
+
+def measure_subnets(cursor, subnets):
+    """Used/reserved counts and alert settings for the given subnets only"""
+    placeholders = ', '.join(['%s'] * len(subnets))
+    cursor.execute(f"""
+        SELECT subnet,
+               COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as used,
+               COUNT(CASE WHEN derived_status = 'reserved' THEN 1 END) as reserved
+        FROM ip_inventory
+        WHERE subnet IN ({placeholders})
+        GROUP BY subnet
+    """, list(subnets))
+    counts = {row['subnet']: row for row in cursor.fetchall()}
+    
+    cursor.execute(f"""
+        SELECT subnet, MIN(threshold_percentage) as threshold_percentage, MAX(mark_as_full) as mark_as_full
+        FROM subnets
+        WHERE subnet IN ({placeholders})
+        GROUP BY subnet
+    """, list(subnets))
+    settings = {row['subnet']: row for row in cursor.fetchall()}
+    
+    measurements = {}
+    for subnet in subnets:
+        try:
+            capacity = subnet_capacity(subnet)
+        except ValueError:
+            continue
+        row = counts.get(subnet, {})
+        setting = settings.get(subnet, {})
+        used = row.get('used', 0)
+        measurements[subnet] = {
+            'capacity': capacity,
+            'used': used,
+            'reserved': row.get('reserved', 0),
+            'utilization': round(used / capacity * 100, 2) if capacity > 0 else 0,
+            'threshold_percentage': setting.get('threshold_percentage') or 80,
+            'mark_as_full': bool(setting.get('mark_as_full'))
+        }
+    return measurements
+
+def alert_conditions(measurement, active_types):
+    """Alert types that should be active; hysteresis keeps a threshold alert until usage drops clearly below"""
+    conditions = set()
+    threshold = measurement['threshold_percentage']
+    if measurement['utilization'] >= threshold or (
+            'threshold' in active_types and measurement['utilization'] > threshold - app.config['ALERT_HYSTERESIS']):
+        conditions.add('threshold')
+    if measurement['capacity'] > 0 and measurement['used'] + measurement['reserved'] >= measurement['capacity']:
+        conditions.add('full')
+    if measurement['mark_as_full']:
+        conditions.add('marked_full')
+    return conditions
+
+class AlertEngine:
+    """Evaluate subnet alerts incrementally for subnets touched by writes.
+    
+    Writes hand their subnets to touch(); a background thread batches them,
+    re-measures only those subnets, refreshes their subnet counters, updates
+    subnet_alerts and sends new, resolved and overdue notifications to the
+    configured sinks. Each notification is stored on its subnet_alerts row
+    (pending_event) in the same transaction as the new alert state and cleared
+    once a sink accepts it; notifications held back by the rate limit or a
+    failing sink are re-sent by a sweep every ALERT_RETRY_INTERVAL seconds.
+    """
+    
+    def __init__(self):
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.worker = None
+        self.sent_times = []
+        self.last_retry = 0
+        self.stats = {'evaluations': 0, 'subnets_evaluated': 0, 'notifications_sent': 0,
+                      'notifications_suppressed': 0, 'notifications_retried': 0, 'sink_errors': 0}
+    
+    def start(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name='subnet-alerts', daemon=True)
+                self.worker.start()
+    
+    def touch(self, subnets):
+        with self.lock:
+            self.pending.update(subnets)
+        self.start()
+        self.changed.set()
+    
+    def _run(self):
+        while True:
+            if self.changed.wait(app.config['ALERT_RETRY_INTERVAL']):
+                time.sleep(app.config['ALERT_DEBOUNCE'])
+                self.changed.clear()
+                with self.lock:
+                    subnets, self.pending = self.pending, set()
+                try:
+                    self.evaluate(subnets)
+                except Exception as e:
+                    print(f"❌ Error evaluating subnet alerts: {e}")
+            if time.monotonic() - self.last_retry >= app.config['ALERT_RETRY_INTERVAL']:
+                self.last_retry = time.monotonic()
+                try:
+                    self.retry_pending()
+                except Exception as e:
+                    print(f"❌ Error re-sending subnet alerts: {e}")
+    
+    def evaluate(self, subnets, now=None):
+        """Re-check the given subnets and deliver resulting notifications; returns them"""
+        subnets = sorted(subnets)
+        now = (now or datetime.now()).replace(microsecond=0)
+        notifications = []
+        connection = get_db_connection()
+        if not connection:
+            raise RuntimeError('Database connection failed')
+        
+        try:
+            cursor = connection.cursor(dictionary=True)
+            batch_size = app.config['ALERT_BATCH_SIZE']
+            for start in range(0, len(subnets), batch_size):
+                notifications.extend(self._evaluate_batch(cursor, subnets[start:start + batch_size], now))
+                connection.commit()
+            
+            self.mark_delivered(connection, cursor, self.deliver(notifications), now)
+            cursor.close()
+        finally:
+            connection.close()
+        
+        with self.lock:
+            self.stats['evaluations'] += 1
+            self.stats['subnets_evaluated'] += len(subnets)
+        return notifications
+    
+    def _evaluate_batch(self, cursor, subnets, now):
+        refresh_subnet_counters(cursor, subnets, now)
+        measurements = measure_subnets(cursor, subnets)
+        cursor.execute(f"""
+            SELECT subnet, alert_type, state, last_notified_at, pending_event
+            FROM subnet_alerts
+            WHERE subnet IN ({', '.join(['%s'] * len(subnets))})
+        """, subnets)
+        existing = {(row['subnet'], row['alert_type']): row for row in cursor.fetchall()}
+        
+        renotify_before = now - timedelta(seconds=app.config['ALERT_RENOTIFY_INTERVAL'])
+        upserts = []
+        resolved = []
+        notifications = []
+        for subnet, measurement in measurements.items():
+            active_types = {alert_type for (alert_subnet, alert_type), row in existing.items()
+                            if alert_subnet == subnet and row['state'] == 'active'}
+            conditions = alert_conditions(measurement, active_types)
+            
+            for alert_type in conditions:
+                previous = existing.get((subnet, alert_type))
+                if alert_type not in active_types:
+                    event = 'triggered'
+                elif previous['pending_event']:
+                    event = None  # Still waiting for delivery: the retry sweep sends it
+                elif previous['last_notified_at'] is None or previous['last_notified_at'] <= renotify_before:
+                    event = 'reminder'
+                else:
+                    event = None  # Active and recently notified: deduplicated
+                upserts.append((subnet, alert_type, measurement['utilization'], measurement['threshold_percentage'],
+                                measurement['used'], measurement['reserved'], measurement['capacity'], now, now,
+                                event, now if event else None))
+                if event:
+                    notifications.append(dict(measurement, subnet=subnet, alert_type=alert_type, event=event, at=now))
+            
+            for alert_type in active_types - conditions:
+                resolved.append((measurement['utilization'], measurement['used'], measurement['reserved'],
+                                 now, now, now, subnet, alert_type))
+                notifications.append(dict(measurement, subnet=subnet, alert_type=alert_type, event='resolved', at=now))
+        
+        if upserts:
+            cursor.executemany("""
+                INSERT INTO subnet_alerts
+                (subnet, alert_type, utilization, threshold_percentage, used, reserved, capacity,
+                 first_triggered_at, last_evaluated_at, pending_event, pending_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                pending_at = IF(VALUES(pending_event) IS NULL, pending_at, VALUES(pending_at)),
+                pending_event = COALESCE(VALUES(pending_event), pending_event),
+                first_triggered_at = IF(state = 'active', first_triggered_at, VALUES(first_triggered_at)),
+                last_notified_at = IF(state = 'active', last_notified_at, NULL),
+                resolved_at = IF(state = 'active', resolved_at, NULL),
+                state = 'active',
+                utilization = VALUES(utilization), threshold_percentage = VALUES(threshold_percentage),
+                used = VALUES(used), reserved = VALUES(reserved), capacity = VALUES(capacity),
+                last_evaluated_at = VALUES(last_evaluated_at)
+            """, upserts)
+        if resolved:
+            cursor.executemany("""
+                UPDATE subnet_alerts
+                SET state = 'resolved', utilization = %s, used = %s, reserved = %s,
+                    resolved_at = %s, last_evaluated_at = %s, pending_event = 'resolved', pending_at = %s
+                WHERE subnet = %s AND alert_type = %s
+            """, resolved)
+        return notifications
+    
+    def deliver(self, notifications):
+        """Send within the rate limit; returns the notifications that reached at least one sink"""
+        if not notifications:
+            return []
+        
+        now = time.monotonic()
+        with self.lock:
+            self.sent_times = [sent for sent in self.sent_times if now - sent < 60]
+            allowed = max(0, app.config['ALERT_RATE_LIMIT'] - len(self.sent_times))
+            batch, suppressed = notifications[:allowed], notifications[allowed:]
+            self.sent_times.extend([now] * len(batch))
+            self.stats['notifications_suppressed'] += len(suppressed)
+        if not batch:
+            return []
+        
+        delivered = False
+        for name in app.config['ALERT_SINKS']:
+            factory = ALERT_SINK_FACTORIES.get(name)
+            if factory is None:
+                print(f"⚠️  Unknown alert sink '{name}'")
+                continue
+            try:
+                factory().send(batch)
+                delivered = True
+            except Exception as e:
+                print(f"❌ Alert sink '{name}' failed: {e}")
+                with self.lock:
+                    self.stats['sink_errors'] += 1
+        
+        if not delivered:
+            return []
+        with self.lock:
+            self.stats['notifications_sent'] += len(batch)
+        return batch
+    
+    def mark_delivered(self, connection, cursor, delivered, now):
+        """Clear the stored pending notifications that reached a sink"""
+        if not delivered:
+            return
+        # pending_at guards against clearing a newer notification queued meanwhile
+        cursor.executemany("""
+            UPDATE subnet_alerts
+            SET pending_event = NULL, pending_at = NULL,
+                last_notified_at = IF(%s = 'resolved', last_notified_at, %s),
+                notify_count = notify_count + IF(%s = 'resolved', 0, 1)
+            WHERE subnet = %s AND alert_type = %s AND pending_event = %s AND pending_at = %s
+        """, [(item['event'], now, item['event'], item['subnet'], item['alert_type'], item['event'], item['at'])
+              for item in delivered])
         connection.commit()
+    
+    def retry_pending(self, now=None):
+        """Re-send stored notifications that no sink has accepted yet (oldest first); returns them"""
+        now = (now or datetime.now()).replace(microsecond=0)
+        connection = get_db_connection()
+        if not connection:
+            raise RuntimeError('Database connection failed')
         
-        cursor.close()
-        connection.close()
-        
-        return jsonify({'success': True, 'message': 'IP updated successfully'})
+        try:
+            cursor = connection.cursor(dictionary=True)
+            # One sweeping worker at a time, so several processes do not send the same backlog
+            cursor.execute("SELECT GET_LOCK('ipam_alert_retry', 0) as locked")
+            if not cursor.fetchone()['locked']:
+                cursor.close()
+                return []
+            cursor.execute("""
+                SELECT subnet, alert_type, pending_event as event, pending_at as at, utilization,
+                       threshold_percentage, used, reserved, capacity, alert_type = 'marked_full' as mark_as_full
+                FROM subnet_alerts
+                WHERE pending_event IS NOT NULL
+                ORDER BY pending_at
+                LIMIT %s
+            """, (app.config['ALERT_BATCH_SIZE'],))
+            notifications = cursor.fetchall()
+            for item in notifications:
+                item['mark_as_full'] = bool(item['mark_as_full'])
+            
+            delivered = self.deliver(notifications)
+            self.mark_delivered(connection, cursor, delivered, now)
+            cursor.execute("SELECT RELEASE_LOCK('ipam_alert_retry')")
+            cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
         
-    except Error as e:
-        print(f"❌ Error updating IP: {e}")
-        return jsonify({'error': str(e)}), 500
+        with self.lock:
+            self.stats['notifications_retried'] += len(delivered)
+        return notifications
 
-@app.route('/api/delete-ip/<int:ip_id>', methods=['DELETE'])
-def api_delete_ip(ip_id):
-    """API to delete IP"""
+alert_engine = AlertEngine()
+
+@app.route('/api/alerts')
+def api_alerts():
+    """List subnet alerts (active by default)"""
+    state = request.args.get('state', 'active')
+    if state not in ('active', 'resolved', 'all'):
+        return jsonify({'error': 'state must be active, resolved or all'}), 400
+    limit = min(request.args.get('limit', 200, type=int), 1000)
+    
     try:
         connection = get_db_connection()
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = connection.cursor()
-        
-        # Check if IP exists
-        cursor.execute("SELECT id FROM ip_inventory WHERE id = %s", (ip_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            connection.close()
-            return jsonify({'error': 'IP not found'}), 404
-        
-        # Delete IP
-        cursor.execute("DELETE FROM ip_inventory WHERE id = %s", (ip_id,))
-        connection.commit()
         
+        cursor = connection.cursor(dictionary=True)
+        where_clause = "" if state == 'all' else "WHERE state = %s"
+        cursor.execute(f"""
+            SELECT * FROM subnet_alerts
+            {where_clause}
+            ORDER BY last_evaluated_at DESC
+            LIMIT %s
+        """, ([] if state == 'all' else [state]) + [limit])
+        alerts = cursor.fetchall()
         cursor.close()
         connection.close()
         
-        return jsonify({'success': True, 'message': 'IP deleted successfully'})
+        return jsonify({'alerts': alerts, 'count': len(alerts), 'engine': dict(alert_engine.stats)})
         
     except Error as e:
-        print(f"❌ Error deleting IP: {e}")
+        print(f"❌ Error getting alerts: {e}")
         return jsonify({'error': str(e)}), 500
 
-# ================== ADVANCED DASHBOARD API ROUTES ==================
-@app.route('/api/charts-data')
-def get_charts_data():
-    """Get data for charts in advanced dashboard"""
+@app.route('/api/alerts/evaluate', methods=['POST'])
+def api_evaluate_alerts():
+    """Evaluate alerts now for the given subnets, or for every known subnet"""
+    subnets = (request.get_json(silent=True) or {}).get('subnets')
     try:
+        if not subnets:
+            connection = get_db_connection()
+            if not connection:
+                return jsonify({'error': 'Database connection failed'}), 500
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT subnet FROM subnets
+                UNION
+                SELECT DISTINCT subnet FROM ip_inventory WHERE subnet IS NOT NULL AND subnet != ''
+            """)
+            subnets = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            connection.close()
+        
+        notifications = alert_engine.evaluate(subnets)
+        return jsonify({'success': True, 'subnets_evaluated': len(subnets), 'notifications': notifications})
+    except Exception as e:
+        print(f"❌ Error evaluating alerts: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ================== WEBHOOK OUTBOX ==================
+# Mutations write webhook events to webhook_outbox in their own transaction (via record_changes),
+# one row per destination, so an event exists exactly when its change committed. A background
+# dispatcher POSTs them in batches per destination, retries failed batches with exponential
+# backoff and never lets an event overtake an earlier, still pending event of the same subnet.
+def parse_webhook_destinations(value):
+    """'name=url,name2=url2' -> {name: url}; a bare URL is named 'default'"""
+    destinations = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, url = entry.split('=', 1) if '=' in entry.split('://', 1)[0] else ('default', entry)
+        destinations[name.strip()] = url.strip()
+    return destinations
+
+app.config['WEBHOOK_DESTINATIONS'] = parse_webhook_destinations(os.environ.get('IPAM_WEBHOOK_DESTINATIONS', ''))
+app.config['WEBHOOK_EVENTS'] = {event.strip() for event in os.environ.get('IPAM_WEBHOOK_EVENTS', 'reserve,release,import').split(',') if event.strip()}
+app.config['WEBHOOK_BATCH_SIZE'] = 100          # Events per POST
+app.config['WEBHOOK_TIMEOUT'] = 5               # Seconds per POST
+app.config['WEBHOOK_POLL_INTERVAL'] = 5         # Seconds between passes when no write wakes the dispatcher
+app.config['WEBHOOK_RETRY_BASE'] = 2            # Seconds before the first retry, doubled per attempt
+app.config['WEBHOOK_RETRY_MAX'] = 600           # Longest wait between retries
+app.config['WEBHOOK_MAX_ATTEMPTS'] = 12         # After this many failures an event is marked dead
+app.config['WEBHOOK_RETENTION_DAYS'] = 7        # Delivered events are pruned after this long
+
+WEBHOOK_OUTBOX_DDL = """
+    CREATE TABLE IF NOT EXISTS webhook_outbox (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        destination VARCHAR(50) NOT NULL,
+        ordering_key VARCHAR(49) NOT NULL DEFAULT '',
+        event VARCHAR(20) NOT NULL,
+        payload JSON NOT NULL,
+        state ENUM('pending', 'delivered', 'dead') NOT NULL DEFAULT 'pending',
+        attempts INT NOT NULL DEFAULT 0,
+        created_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+        next_attempt_at TIMESTAMP(3) NULL,
+        delivered_at TIMESTAMP(3) NULL,
+        last_error VARCHAR(255),
+        INDEX idx_destination_state (destination, state, id),
+        INDEX idx_state_delivered (state, delivered_at)
+    )
+"""
+
+def enqueue_webhook_events(cursor, changes):
+    """Queue configured events for every destination using the caller's cursor (same transaction)"""
+    destinations = app.config['WEBHOOK_DESTINATIONS']
+    events = [change for change in changes if change['action'] in app.config['WEBHOOK_EVENTS']]
+    if not destinations or not events:
+        return
+    at = datetime.now()
+    rows = []
+    for change in events:
+        payload = {field: change.get(field) for field in CHANGE_LOG_FIELDS if field != 'action'}
+        payload = app.json.dumps(dict(payload, event=change['action'], at=at))
+        rows.extend((name, change.get('subnet') or '', change['action'], payload) for name in destinations)
+    cursor.executemany("""
+        INSERT INTO webhook_outbox (destination, ordering_key, event, payload)
+        VALUES (%s, %s, %s, %s)
+    """, rows)
+    if has_request_context():
+        g.webhooks_pending = True
+
+def post_webhook_batch(name, url, events):
+    """POST one batch; any non-2xx status or network error raises"""
+    body = app.json.dumps({'destination': name, 'events': events}).encode('utf-8')
+    webhook_request = urllib.request.Request(url, data=body, headers={
+        'Content-Type': 'application/json',
+        'X-IPAM-Batch': f"{name}:{events[0]['id']}-{events[-1]['id']}"
+    })
+    with urllib.request.urlopen(webhook_request, timeout=app.config['WEBHOOK_TIMEOUT']) as response:
+        response.read()
+
+class WebhookDispatcher:
+    """Deliver webhook_outbox rows to their destinations in batches.
+    
+    Writes wake the dispatcher after commit; otherwise it polls every
+    WEBHOOK_POLL_INTERVAL seconds for retries and events queued by other
+    processes. A MySQL named lock per destination keeps concurrent workers
+    from sending the same events or reordering them.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.worker = None
+        self.delivered_times = []
+        self.last_pruned = 0
+        self.last_lag = {}
+        self.stats = {'passes': 0, 'batches_sent': 0, 'events_delivered': 0, 'batch_errors': 0, 'events_dead': 0}
+    
+    def wake(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name='webhook-dispatcher', daemon=True)
+                self.worker.start()
+        self.changed.set()
+    
+    def _run(self):
+        while True:
+            self.changed.wait(app.config['WEBHOOK_POLL_INTERVAL'])
+            self.changed.clear()
+            try:
+                self.dispatch()
+            except Exception as e:
+                print(f"❌ Error dispatching webhooks: {e}")
+    
+    def dispatch(self):
+        """One pass over every destination; returns events delivered per destination"""
         connection = get_db_connection()
         if not connection:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        # Get status distribution
-        cursor.execute("""
-            SELECT status, COUNT(*) as count 
-            FROM ip_inventory 
-            GROUP BY status
-        """)
-        status_data = cursor.fetchall()
-        
-        # Get Service Domain distribution
-        cursor.execute("""
-            SELECT 
-                CASE 
-                    WHEN vrf_vpn IS NULL OR vrf_vpn = '' THEN 'No Service Domain'
-                    ELSE vrf_vpn 
-                END as vrf_name,
-                COUNT(*) as count 
-            FROM ip_inventory 
-            GROUP BY vrf_name
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        vrf_data = cursor.fetchall()
+            raise RuntimeError('Database connection failed')
         
-        # Get subnet distribution
-        cursor.execute("""
-            SELECT subnet, COUNT(*) as count 
-            FROM ip_inventory 
-            GROUP BY subnet
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        subnet_data = cursor.fetchall()
+        delivered = {}
+        try:
+            cursor = connection.cursor(dictionary=True)
+            for name, url in app.config['WEBHOOK_DESTINATIONS'].items():
+                cursor.execute("SELECT GET_LOCK(%s, 0) as locked", (f'ipam_webhook:{name}',))
+                if not cursor.fetchone()['locked']:
+                    continue  # Another worker is delivering to this destination
+                # Start a fresh snapshot now that we hold the lock, so rows another worker delivered
+                # (and committed) under it are not seen as pending from an older read view
+                connection.commit()
+                try:
+                    delivered[name] = 0
+                    while True:
+                        sent, full = self._dispatch_batch(connection, cursor, name, url)
+                        delivered[name] += sent
+                        if not full:
+                            break
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (f'ipam_webhook:{name}',))
+                    cursor.fetchall()
+            
+            if time.monotonic() - self.last_pruned > 3600:
+                cursor.execute("""
+                    DELETE FROM webhook_outbox
+                    WHERE state = 'delivered' AND delivered_at < NOW(3) - INTERVAL %s DAY
+                    LIMIT 10000
+                """, (app.config['WEBHOOK_RETENTION_DAYS'],))
+                connection.commit()
+                self.last_pruned = time.monotonic()
+            cursor.close()
+        finally:
+            connection.close()
         
-        # Get recent activity (last 7 days)
+        with self.lock:
+            self.stats['passes'] += 1
+        return delivered
+    
+    def _dispatch_batch(self, connection, cursor, name, url):
+        """Send the next batch for one destination; returns (events sent, whether the batch was full)"""
+        batch_size = app.config['WEBHOOK_BATCH_SIZE']
         cursor.execute("""
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as count
-            FROM ip_inventory 
-            WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
-        activity_data = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
+            SELECT id, ordering_key, payload, created_at,
+                   COALESCE(next_attempt_at > NOW(3), 0) as waiting
+            FROM webhook_outbox
+            WHERE destination = %s AND state = 'pending'
+            ORDER BY id
+            LIMIT %s
+        """, (name, batch_size * 4))
+        
+        # An event waiting for its retry holds back every later event of the same subnet
+        blocked = set()
+        batch = []
+        for row in cursor.fetchall():
+            if row['ordering_key'] in blocked:
+                continue
+            if row['waiting']:
+                blocked.add(row['ordering_key'])
+                continue
+            batch.append(row)
+            if len(batch) == batch_size:
+                break
+        if not batch:
+            return 0, False
+        
+        ids = [row['id'] for row in batch]
+        placeholders = ', '.join(['%s'] * len(ids))
+        events = [dict(json.loads(row['payload']), id=row['id']) for row in batch]
+        try:
+            post_webhook_batch(name, url, events)
+        except Exception as e:
+            print(f"❌ Webhook destination '{name}' failed: {e}")
+            cursor.execute(f"""
+                UPDATE webhook_outbox
+                SET attempts = attempts + 1,
+                    state = IF(attempts >= %s, 'dead', 'pending'),
+                    next_attempt_at = NOW(3) + INTERVAL LEAST(%s * POW(2, attempts - 1), %s) SECOND,
+                    last_error = %s
+                WHERE id IN ({placeholders})
+            """, [app.config['WEBHOOK_MAX_ATTEMPTS'], app.config['WEBHOOK_RETRY_BASE'],
+                  app.config['WEBHOOK_RETRY_MAX'], str(e)[:255]] + ids)
+            cursor.execute(f"SELECT COUNT(*) as dead FROM webhook_outbox WHERE id IN ({placeholders}) AND state = 'dead'", ids)
+            dead = cursor.fetchone()['dead']
+            connection.commit()
+            with self.lock:
+                self.stats['batch_errors'] += 1
+                self.stats['events_dead'] += dead
+            return 0, False
         
-        return jsonify({
-            'status_distribution': status_data,
-            'vrf_distribution': vrf_data,
-            'subnet_distribution': subnet_data,
-            'recent_activity': activity_data
-        })
+        cursor.execute(f"""
+            UPDATE webhook_outbox
+            SET state = 'delivered', attempts = attempts + 1, delivered_at = NOW(3), last_error = NULL
+            WHERE id IN ({placeholders})
+        """, ids)
+        connection.commit()
         
-    except Error as e:
-        print(f"❌ Error getting charts data: {e}")
-        return jsonify({'error': str(e)}), 500
+        now = time.monotonic()
+        with self.lock:
+            self.stats['batches_sent'] += 1
+            self.stats['events_delivered'] += len(batch)
+            self.delivered_times = [entry for entry in self.delivered_times if now - entry[0] < 60]
+            self.delivered_times.append((now, len(batch)))
+            self.last_lag[name] = round((datetime.now() - min(row['created_at'] for row in batch)).total_seconds(), 3)
+        return len(batch), len(batch) == batch_size
 
-@app.route('/api/network-tree')
-def get_network_tree():
-    """Get network tree data organized by Service Domain"""
+webhook_dispatcher = WebhookDispatcher()
+
+@app.route('/api/webhooks/stats')
+def api_webhook_stats():
+    """Outbox backlog and delivery lag per destination, plus dispatcher throughput"""
     try:
         connection = get_db_connection()
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
-            
         cursor = connection.cursor(dictionary=True)
-        
-        # Get tree structure grouped by VRF and subnet
         cursor.execute("""
-            SELECT 
-                CASE 
-                    WHEN vrf_vpn IS NULL OR vrf_vpn = '' THEN 'Default'
-                    ELSE vrf_vpn 
-                END as vrf_name,
-                subnet,
-                status,
-                COUNT(*) as count
-            FROM ip_inventory 
-            GROUP BY vrf_name, subnet, status
-            ORDER BY vrf_name, subnet, status
+            SELECT destination, state, COUNT(*) as events,
+                   MAX(TIMESTAMPDIFF(MICROSECOND, created_at, NOW(3))) / 1000000 as oldest_seconds
+            FROM webhook_outbox
+            WHERE state IN ('pending', 'dead')
+            GROUP BY destination, state
         """)
-        
-        raw_data = cursor.fetchall()
+        backlog = cursor.fetchall()
         cursor.close()
         connection.close()
-        
-        # Organize data into tree structure
-        tree_data = {}
-        
-        for row in raw_data:
-            vrf_name = row['vrf_name']
-            subnet = row['subnet']
-            status = row['status']
-            count = row['count']
-            
-            if vrf_name not in tree_data:
-                tree_data[vrf_name] = {}
-            
-            if subnet not in tree_data[vrf_name]:
-                tree_data[vrf_name][subnet] = {}
-            
-            tree_data[vrf_name][subnet][status] = count
-        
-        return jsonify(tree_data)
-        
     except Error as e:
-        print(f"❌ Error getting network tree: {e}")
+        print(f"❌ Error getting webhook stats: {e}")
         return jsonify({'error': str(e)}), 500
+    
+    with webhook_dispatcher.lock:
+        stats = dict(webhook_dispatcher.stats)
+        now = time.monotonic()
+        stats['events_last_minute'] = sum(count for sent, count in webhook_dispatcher.delivered_times if now - sent < 60)
+        last_lag = dict(webhook_dispatcher.last_lag)
+    
+    destinations = {name: {'url': url, 'pending': 0, 'dead': 0, 'oldest_pending_seconds': None,
+                           'last_delivery_lag_seconds': last_lag.get(name)}
+                    for name, url in app.config['WEBHOOK_DESTINATIONS'].items()}
+    for row in backlog:
+        entry = destinations.setdefault(row['destination'], {'url': None, 'pending': 0, 'dead': 0,
+                                                             'oldest_pending_seconds': None,
+                                                             'last_delivery_lag_seconds': None})
+        entry[row['state']] = row['events']
+        if row['state'] == 'pending':
+            entry['oldest_pending_seconds'] = float(row['oldest_seconds'] or 0)
+    return jsonify({'destinations': destinations, 'dispatcher': stats,
+                    'events': sorted(app.config['WEBHOOK_EVENTS'])})
 
-@app.route('/api/vrf-vpn-analysis')
-def get_vrf_vpn_analysis():
-    """Get Service Domain analysis data"""
+@app.route('/api/webhooks/dispatch', methods=['POST'])
+def api_dispatch_webhooks():
+    """Run a delivery pass now"""
+    try:
+        return jsonify({'success': True, 'delivered': webhook_dispatcher.dispatch()})
+    except Exception as e:
+        print(f"❌ Error dispatching webhooks: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/webhooks/retry', methods=['POST'])
+def api_retry_webhooks():
+    """Requeue dead events, for one destination or all"""
+    destination = (request.get_json(silent=True) or {}).get('destination')
     try:
         connection = get_db_connection()
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        # Get detailed Service Domain statistics
-        cursor.execute("""
-            SELECT 
-                CASE 
-                    WHEN vrf_vpn IS NULL OR vrf_vpn = '' THEN 'No Service Domain'
-                    ELSE vrf_vpn 
-                END as vrf_name,
-                COUNT(*) as total_ips,
-                SUM(CASE WHEN status = 'used' THEN 1 ELSE 0 END) as used_ips,
-                SUM(CASE WHEN status = 'available' THEN 1 ELSE 0 END) as available_ips,
-                SUM(CASE WHEN status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
-                COUNT(DISTINCT subnet) as subnet_count
-            FROM ip_inventory 
-            GROUP BY vrf_name
-            ORDER BY total_ips DESC
-        """)
-        
-        vrf_analysis = cursor.fetchall()
-        
-        # Calculate utilization percentages
-        for vrf in vrf_analysis:
-            if vrf['total_ips'] > 0:
-                vrf['utilization_percentage'] = round((vrf['used_ips'] / vrf['total_ips']) * 100, 2)
-            else:
-                vrf['utilization_percentage'] = 0
-        
+        cursor = connection.cursor()
+        cursor.execute(f"""
+            UPDATE webhook_outbox
+            SET state = 'pending', attempts = 0, next_attempt_at = NULL
+            WHERE state = 'dead' {'AND destination = %s' if destination else ''}
+        """, [destination] if destination else [])
+        requeued = cursor.rowcount
+        connection.commit()
         cursor.close()
         connection.close()
-        
-        return jsonify({
-            'vrf_analysis': vrf_analysis,
-            'total_vrfs': len(vrf_analysis)
-        })
-        
+        if requeued:
+            webhook_dispatcher.wake()
+        return jsonify({'success': True, 'requeued': requeued})
     except Error as e:
-        print(f"❌ Error getting Service Domain analysis: {e}")
+        print(f"❌ Error requeueing webhooks: {e}")
         return jsonify({'error': str(e)}), 500
 
 # ================== IP MANAGEMENT API ROUTES ==================
@@ -1781,15 +4976,20 @@ def get_port_ips():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/subnet-monitor')
+@coalesce
+@admission('heavy', inventory_scan_cost)
 def api_subnet_monitor():
     """API for subnet monitoring with configurable CIDR"""
     try:
-        # Get CIDR from query parameter, default to 24
+        # Get CIDR from query parameter, default to 24 (IPv4) and 64 (IPv6)
         cidr = request.args.get('cidr', 24, type=int)
+        cidr6 = request.args.get('cidr6', 64, type=int)
         
         # Validate CIDR range
         if cidr < 8 or cidr > 30:
             return jsonify({'error': 'CIDR must be between 8 and 30'}), 400
+        if cidr6 < 16 or cidr6 > 128:
+            return jsonify({'error': 'IPv6 CIDR must be between 16 and 128'}), 400
         
         connection = get_db_connection()
         if not connection:
@@ -1799,9 +4999,9 @@ def api_subnet_monitor():
         
         # Get all IPs with their status and Service Domain info
         cursor.execute("""
-            SELECT ip_address, status, subnet, vrf_vpn
+            SELECT ip_address, derived_status, subnet, vrf_vpn
             FROM ip_inventory 
-            ORDER BY INET_ATON(ip_address)
+            ORDER BY ip_bin
         """)
         
         ips = cursor.fetchall()
@@ -1816,30 +5016,27 @@ def api_subnet_monitor():
         
         for ip_data in ips:
             ip_str = ip_data['ip_address']
-            status = ip_data['status']
+            status = ip_data['derived_status']
             vrf_vpn = ip_data.get('vrf_vpn', 'default')
             
             try:
                 # Create IP object
-                ip_obj = ipaddress.IPv4Address(ip_str)
+                ip_obj = ipaddress.ip_address(ip_str)
+                prefix = cidr if ip_obj.version == 4 else cidr6
                 
                 # Calculate subnet based on the CIDR
-                network = ipaddress.IPv4Network(f"{ip_str}/{cidr}", strict=False)
+                network = ipaddress.ip_network(f"{ip_str}/{prefix}", strict=False)
                 subnet_str = str(network)
                 
                 # Initialize subnet if not exists
                 if subnet_str not in subnet_summary:
-                    # Calculate total addresses in subnet (exclude network and broadcast for /24 and larger)
-                    total_addresses = 2 ** (32 - cidr)
-                    if cidr < 31:
-                        total_addresses -= 2  # Exclude network and broadcast
-                    else:
-                        total_addresses = 2 if cidr == 31 else 1  # Point-to-point or host route
+                    # Usable addresses (network and broadcast excluded for IPv4 below /31)
+                    total_addresses = subnet_capacity(network)
                     
                     subnet_summary[subnet_str] = {
                         'subnet': subnet_str,
                         'network': str(network.network_address),
-                        'cidr': cidr,
+                        'cidr': prefix,
                         'total_addresses': total_addresses,
                         'used': 0,
                         'available': 0,
@@ -1891,7 +5088,7 @@ def api_subnet_monitor():
             result_subnets.append({
                 'subnet': subnet_str,
                 'network': data['network'],
-                'cidr': cidr,
+                'cidr': data['cidr'],
                 'total_addresses': total_addresses,
                 'used': used_count,
                 'free': free_count,
@@ -1901,7 +5098,7 @@ def api_subnet_monitor():
             })
         
         # Sort subnets by network address
-        result_subnets.sort(key=lambda x: ipaddress.IPv4Network(x['subnet']).network_address)
+        result_subnets.sort(key=lambda x: address_key(ipaddress.ip_network(x['subnet']).network_address))
         
         return jsonify({
             'subnets': result_subnets,
@@ -1930,7 +5127,7 @@ def api_get_subnets():
             ORDER BY subnet
         """)
         
-        subnets = cursor.fetchall()
+        subnets = decode_address_columns(cursor.fetchall())
         cursor.close()
         connection.close()
         
@@ -1950,11 +5147,12 @@ def api_update_subnet(subnet_id):
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = connection.cursor()
+        cursor = connection.cursor(dictionary=True)
         
         # Check if subnet exists
-        cursor.execute("SELECT id FROM subnets WHERE id = %s", (subnet_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT id, subnet, section_id FROM subnets WHERE id = %s", (subnet_id,))
+        existing_subnet = cursor.fetchone()
+        if not existing_subnet:
             return jsonify({'error': 'Subnet not found'}), 404
         
         # Update subnet
@@ -1987,8 +5185,12 @@ def api_update_subnet(subnet_id):
             data.get('irr', ''),
             subnet_id
         ))
+        record_change(cursor, 'update', entity_type='subnet', entity_id=subnet_id, subnet=existing_subnet['subnet'],
+                      section_id=existing_subnet['section_id'], vrf_vpn=data.get('vrf', ''),
+                      description=data.get('description', ''))
         
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
         connection.close()
         
@@ -2006,17 +5208,22 @@ def api_delete_subnet(subnet_id):
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = connection.cursor()
+        cursor = connection.cursor(dictionary=True)
         
         # Check if subnet exists
-        cursor.execute("SELECT id FROM subnets WHERE id = %s", (subnet_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT id, subnet, section_id, vrf, description FROM subnets WHERE id = %s", (subnet_id,))
+        existing_subnet = cursor.fetchone()
+        if not existing_subnet:
             return jsonify({'error': 'Subnet not found'}), 404
         
         # Delete subnet
         cursor.execute("DELETE FROM subnets WHERE id = %s", (subnet_id,))
+        record_change(cursor, 'delete', entity_type='subnet', entity_id=subnet_id, subnet=existing_subnet['subnet'],
+                      section_id=existing_subnet['section_id'], vrf_vpn=existing_subnet['vrf'],
+                      description=existing_subnet['description'])
         
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
         connection.close()
         
@@ -2055,43 +5262,25 @@ def api_suggest_ips():
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get all used IPs in this subnet
-        cursor.execute("""
-            SELECT ip_address, status 
-            FROM ip_inventory 
-            WHERE subnet = %s
-        """, (subnet,))
-        
-        used_ips_data = cursor.fetchall()
-        used_ips = set(row['ip_address'] for row in used_ips_data)
+        # Walk the gaps between recorded IPs; any inventory row makes its address unavailable
+        suggested_ips = [str(ip) for ip in itertools.islice(iter_free_addresses(cursor, network, ''), count)]
+        available_count = subnet_capacity(network) - sum(count_range_statuses(cursor, network).values())
         
         cursor.close()
         connection.close()
         
-        # Find available IPs
-        available_ips = []
-        suggested_ips = []
-        
-        for ip in network.hosts():
-            ip_str = str(ip)
-            if ip_str not in used_ips:
-                available_ips.append(ip_str)
-                
-        # Get the requested number of IPs
-        suggested_ips = available_ips[:count]
-        
         if len(suggested_ips) < count:
             return jsonify({
                 'warning': f'Only {len(suggested_ips)} IPs available, but {count} requested',
                 'suggested_ips': suggested_ips,
-                'available_count': len(available_ips),
+                'available_count': available_count,
                 'subnet': subnet
             })
         
         return jsonify({
             'success': True,
             'suggested_ips': suggested_ips,
-            'available_count': len(available_ips),
+            'available_count': available_count,
             'subnet': subnet
         })
         
@@ -2122,55 +5311,304 @@ def api_bulk_reserve():
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = connection.cursor()
+        cursor = connection.cursor(dictionary=True)
         
         reserved_ips = []
         failed_ips = []
+        candidates = []
         
+        # Validate IP format
         for ip in ip_list:
             try:
-                # Validate IP format
                 ipaddress.ip_address(ip)
-                
-                # Check if IP already exists
-                cursor.execute("SELECT id FROM ip_inventory WHERE ip_address = %s", (ip,))
-                if cursor.fetchone():
-                    failed_ips.append({'ip': ip, 'reason': 'IP already exists'})
+                candidates.append(ip)
+            except ValueError:
+                failed_ips.append({'ip': ip, 'reason': 'Invalid IP format'})
+        
+        # Check which IPs already exist with one query per chunk
+        existing = {row['ip_address'] for row in fetch_ip_rows(cursor, 'ip_address', set(candidates))}
+        
+        rows = []
+        full_description = f"Reserved for {service}: {description}" if service else description
+        for ip in candidates:
+            if ip in existing:
+                failed_ips.append({'ip': ip, 'reason': 'IP already exists'})
+                continue
+            existing.add(ip)  # Later duplicates in the same list fail the same way
+            hostname = f"{service}-{address_suffix(ip)}" if service else ''
+            rows.append((ip, subnet, vrf_vpn, hostname, full_description))
+            reserved_ips.append(ip)
+        
+        # Insert new reserved IPs as multi-row statements
+        for chunk in chunked(rows, app.config['BULK_CHUNK_SIZE']):
+            cursor.executemany("""
+                INSERT INTO ip_inventory 
+                (ip_address, subnet, status, vrf_vpn, hostname, description)
+                VALUES (%s, %s, 'reserved', %s, %s, %s)
+            """, chunk)
+        
+        new_ids = {row['ip_address']: row['id'] for row in fetch_ip_rows(cursor, 'ip_address', reserved_ips)}
+        record_changes(cursor, [{'action': 'reserve', 'entity_id': new_ids.get(ip), 'ip_address': ip, 'subnet': subnet,
+                                 'status': 'reserved', 'vrf_vpn': vrf_vpn, 'hostname': hostname,
+                                 'description': full_description, 'source': 'bulk'}
+                                for ip, _, _, hostname, _ in rows])
+        connection.commit()
+        notify_dashboard_change()
+        cursor.close()
+        connection.close()
+        
+        return jsonify({
+            'success': True,
+            'reserved_ips': reserved_ips,
+            'failed_ips': failed_ips,
+            'total_reserved': len(reserved_ips),
+            'total_failed': len(failed_ips)
+        })
+        
+    except Exception as e:
+        print(f"❌ Error in bulk reserve: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ================== BULK IP OPERATIONS ==================
+app.config['BULK_MAX_OPERATIONS'] = 50000
+app.config['BULK_CHUNK_SIZE'] = 1000     # Rows per IN (...) lookup and per multi-row statement
+
+BULK_OPERATION_TYPES = ('reserve', 'release', 'update', 'delete')
+BULK_UPDATABLE_FIELDS = ['ip_address', 'subnet', 'status', 'vrf_vpn', 'hostname', 'description']
+BULK_ROW_COLUMNS = ['id', 'ip_address', 'subnet', 'section_id', 'status', 'vrf_vpn', 'hostname', 'description']
+IP_STATUSES = ('used', 'available', 'reserved')
+
+def chunked(items, size):
+    """Split a list into consecutive slices of at most size items"""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def fetch_ip_rows(cursor, column, values, for_update=False):
+    """ip_inventory rows whose column is in values, one query per chunk"""
+    rows = []
+    lock_clause = "FOR UPDATE" if for_update else ""
+    for chunk in chunked(values, app.config['BULK_CHUNK_SIZE']):
+        cursor.execute(f"""
+            SELECT * FROM ip_inventory
+            WHERE {column} IN ({', '.join(['%s'] * len(chunk))})
+            {lock_clause}
+        """, chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+def validate_bulk_operation(operation):
+    """Check shape and formats of one operation; returns an error message or None"""
+    if not isinstance(operation, dict):
+        return 'Operation must be an object'
+    op = operation.get('op')
+    if op not in BULK_OPERATION_TYPES:
+        return f"op must be one of: {', '.join(BULK_OPERATION_TYPES)}"
+    
+    if op == 'reserve' or 'id' not in operation:
+        if not operation.get('ip_address'):
+            return 'ip_address is required' if op == 'reserve' else 'id or ip_address is required'
+        try:
+            ipaddress.ip_address(operation['ip_address'])
+        except ValueError:
+            return 'Invalid IP address format'
+    elif not isinstance(operation['id'], int):
+        return 'id must be an integer'
+    
+    fields = operation.get('fields', {}) if op == 'update' else operation
+    if op == 'update':
+        if not isinstance(fields, dict) or not fields:
+            return 'fields is required for update'
+        unknown = [field for field in fields if field not in BULK_UPDATABLE_FIELDS]
+        if unknown:
+            return f"Fields cannot be updated: {', '.join(unknown)}"
+        if 'ip_address' in fields:
+            try:
+                ipaddress.ip_address(fields['ip_address'])
+            except ValueError:
+                return 'Invalid IP address format'
+    if fields.get('subnet'):
+        try:
+            network = ipaddress.ip_network(fields['subnet'], strict=False)
+        except ValueError:
+            return 'Invalid subnet format'
+        if op == 'reserve' and ipaddress.ip_address(operation['ip_address']) not in network:
+            return 'IP address is not inside the subnet'
+    if op == 'update' and 'status' in fields and fields['status'] not in IP_STATUSES:
+        return f"status must be one of: {', '.join(IP_STATUSES)}"
+    return None
+
+def plan_bulk_operations(cursor, operations):
+    """Resolve every operation against the locked current rows.
+    
+    Returns (results, upserts, deletes, changes, applied); upserts are full
+    rows keyed by id (None for new rows) so inserts and updates share one
+    multi-row INSERT ... ON DUPLICATE KEY UPDATE statement, and applied pairs
+    each successful result with its change log entry.
+    """
+    results = []
+    for index, operation in enumerate(operations):
+        operation = operation if isinstance(operation, dict) else {}
+        results.append({'index': index, 'op': operation.get('op'),
+                        'ip_address': operation.get('ip_address'), 'id': operation.get('id')})
+    valid = []
+    for result, operation in zip(results, operations):
+        error = validate_bulk_operation(operation)
+        if error:
+            result.update(status='error', error=error)
+        else:
+            valid.append((result, operation))
+    
+    # Set-based existence checks: one locked lookup per chunk of ids and of addresses
+    ids = {operation['id'] for _, operation in valid if 'id' in operation and operation['op'] != 'reserve'}
+    addresses = {operation['ip_address'] for _, operation in valid if operation.get('ip_address')}
+    addresses.update(operation['fields']['ip_address'] for _, operation in valid
+                     if operation['op'] == 'update' and 'ip_address' in operation['fields'])
+    by_id = {row['id']: row for row in fetch_ip_rows(cursor, 'id', ids, for_update=True)}
+    by_address = {}
+    for row in fetch_ip_rows(cursor, 'ip_address', addresses, for_update=True):
+        by_id.setdefault(row['id'], row)
+        by_address.setdefault(row['ip_address'], []).append(row)
+    
+    claimed = set()
+    upserts, deletes, changes, applied = [], [], [], []
+    for result, operation in valid:
+        op = operation['op']
+        section_id = operation.get('section_id')
+        
+        if 'id' in operation and op != 'reserve':
+            row = by_id.get(operation['id'])
+        else:
+            rows = [candidate for candidate in by_address.get(operation['ip_address'], [])
+                    if section_id is None or candidate['section_id'] == section_id]
+            if len(rows) > 1:
+                result.update(status='error', error='IP address exists in several sections; pass id or section_id')
+                continue
+            row = rows[0] if rows else None
+        
+        if row is None and op != 'reserve':
+            result.update(status='error', error='IP address not found')
+            continue
+        key = row['id'] if row else (operation['ip_address'], section_id)
+        if key in claimed:
+            result.update(status='error', error='IP address appears more than once in this batch')
+            continue
+        
+        result['ip_address'] = row['ip_address'] if row else operation['ip_address']
+        result['id'] = row['id'] if row else None
+        
+        if op == 'reserve':
+            if row and row['hostname'] and row['hostname'].strip():
+                result.update(status='error', error='IP address is already in use')
+                continue
+            if row is None and not operation.get('subnet'):
+                result.update(status='error', error='subnet is required for new IP addresses')
+                continue
+            new_row = dict(row or {'id': None, 'ip_address': operation['ip_address'], 'section_id': section_id,
+                                   'vrf_vpn': ''},
+                           status='reserved',
+                           hostname=operation.get('hostname', ''),
+                           description=operation.get('description') or 'Reserved')
+            for field in ('subnet', 'vrf_vpn'):
+                if operation.get(field):
+                    new_row[field] = operation[field]
+        elif op == 'release':
+            new_row = dict(row, status='available', hostname='', description='')
+        elif op == 'update':
+            new_row = dict(row, **operation['fields'])
+            if new_row['ip_address'] != row['ip_address']:
+                target_key = (new_row['ip_address'], row['section_id'])
+                clash = [other for other in by_address.get(new_row['ip_address'], [])
+                         if other['section_id'] == row['section_id'] and other['id'] != row['id']]
+                if clash or target_key in claimed:
+                    result.update(status='error', error='IP address already exists')
                     continue
-                
-                # Insert new reserved IP
-                insert_query = """
-                    INSERT INTO ip_inventory 
-                    (ip_address, subnet, status, vrf_vpn, hostname, description)
-                    VALUES (%s, %s, 'reserved', %s, %s, %s)
-                """
-                
-                hostname = f"{service}-{ip.split('.')[-1]}" if service else ''
-                full_description = f"Reserved for {service}: {description}" if service else description
-                
-                cursor.execute(insert_query, (ip, subnet, vrf_vpn, hostname, full_description))
-                reserved_ips.append(ip)
-                
-            except ValueError:
-                failed_ips.append({'ip': ip, 'reason': 'Invalid IP format'})
-            except Exception as e:
-                failed_ips.append({'ip': ip, 'reason': str(e)})
+                claimed.add(target_key)
+        else:
+            new_row = row
+            deletes.append(row['id'])
+        
+        claimed.add(key)
+        if op != 'delete':
+            upserts.append(new_row)
+        result['status'] = 'ok'
+        changes.append({'action': op, 'entity_id': new_row['id'], 'ip_address': new_row['ip_address'],
+                        'subnet': new_row['subnet'], 'section_id': new_row['section_id'],
+                        'status': new_row['status'], 'vrf_vpn': new_row['vrf_vpn'],
+                        'hostname': new_row['hostname'], 'description': new_row['description'], 'source': 'bulk'})
+        applied.append((result, changes[-1]))
+    return results, upserts, deletes, changes, applied
+
+def apply_bulk_operations(cursor, upserts, deletes, changes):
+    """Write the planned rows with multi-row statements and log the changes"""
+    update_clause = ', '.join(f"{column} = VALUES({column})" for column in BULK_ROW_COLUMNS[1:])
+    for chunk in chunked(upserts, app.config['BULK_CHUNK_SIZE']):
+        cursor.executemany(f"""
+            INSERT INTO ip_inventory ({', '.join(BULK_ROW_COLUMNS)})
+            VALUES ({', '.join(['%s'] * len(BULK_ROW_COLUMNS))})
+            ON DUPLICATE KEY UPDATE {update_clause}, updated_at = NOW()
+        """, [tuple(row.get(column) for column in BULK_ROW_COLUMNS) for row in chunk])
+    
+    for chunk in chunked(deletes, app.config['BULK_CHUNK_SIZE']):
+        cursor.execute(f"DELETE FROM ip_inventory WHERE id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+    
+    # Look up ids of newly inserted rows for the change log
+    inserted = {(row['ip_address'], row['section_id']) for row in upserts if row['id'] is None}
+    if inserted:
+        new_ids = {(row['ip_address'], row['section_id']): row['id']
+                   for row in fetch_ip_rows(cursor, 'ip_address', {address for address, _ in inserted})}
+        for change in changes:
+            if change['entity_id'] is None:
+                change['entity_id'] = new_ids.get((change['ip_address'], change['section_id']))
+    record_changes(cursor, changes)
+    return inserted
+
+@app.route('/api/bulk-operations', methods=['POST'])
+def api_bulk_operations():
+    """Apply mixed reserve/release/update/delete operations in one transaction"""
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    atomic = bool(data.get('atomic', False))
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    if len(operations) > app.config['BULK_MAX_OPERATIONS']:
+        return jsonify({'error': f"At most {app.config['BULK_MAX_OPERATIONS']} operations per request"}), 413
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        results, upserts, deletes, changes, applied = plan_bulk_operations(cursor, operations)
+        failed = sum(1 for result in results if result['status'] == 'error')
+        
+        if atomic and failed:
+            connection.rollback()
+            cursor.close()
+            return jsonify({'success': False, 'error': f'{failed} operations failed; nothing was applied',
+                            'results': results}), 409
         
+        inserted = apply_bulk_operations(cursor, upserts, deletes, changes)
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
-        connection.close()
         
-        return jsonify({
-            'success': True,
-            'reserved_ips': reserved_ips,
-            'failed_ips': failed_ips,
-            'total_reserved': len(reserved_ips),
-            'total_failed': len(failed_ips)
-        })
+        for result, change in applied:
+            result['id'] = change['entity_id']
         
-    except Exception as e:
-        print(f"❌ Error in bulk reserve: {e}")
+        summary = {op: sum(1 for result in results if result['op'] == op and result['status'] == 'ok')
+                   for op in BULK_OPERATION_TYPES}
+        summary.update(inserted=len(inserted), failed=failed)
+        return jsonify({'success': True, 'summary': summary, 'results': results})
+        
+    except Error as e:
+        connection.rollback()
+        print(f"❌ Error in bulk operations: {e}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
 
 @app.route('/api/available-subnets')
 def api_available_subnets():
@@ -2187,9 +5625,9 @@ def api_available_subnets():
             SELECT 
                 subnet,
                 COUNT(*) as total_used,
-                SUM(CASE WHEN status = 'available' THEN 1 ELSE 0 END) as available_count,
-                SUM(CASE WHEN status = 'used' THEN 1 ELSE 0 END) as used_count,
-                SUM(CASE WHEN status = 'reserved' THEN 1 ELSE 0 END) as reserved_count
+                SUM(CASE WHEN derived_status = 'available' THEN 1 ELSE 0 END) as available_count,
+                SUM(CASE WHEN derived_status = 'used' THEN 1 ELSE 0 END) as used_count,
+                SUM(CASE WHEN derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_count
             FROM ip_inventory 
             WHERE subnet IS NOT NULL AND subnet != ''
             GROUP BY subnet
@@ -2197,14 +5635,15 @@ def api_available_subnets():
         """)
         
         subnet_stats = cursor.fetchall()
+        occupied_runs = fetch_subnet_runs(cursor, [stats['subnet'] for stats in subnet_stats])
         
-        # Calculate subnet capacities
+        # Calculate subnet capacities arithmetically
         subnets = []
         for stats in subnet_stats:
             subnet = stats['subnet']
             try:
-                network = ipaddress.ip_network(subnet, strict=False)
-                total_capacity = len(list(network.hosts()))
+                occupancy = subnet_occupancy(subnet, occupied_runs)
+                total_capacity = occupancy['capacity']
                 used_in_db = stats['used_count'] + stats['reserved_count']
                 available_ips = total_capacity - used_in_db
                 
@@ -2214,6 +5653,7 @@ def api_available_subnets():
                     'used_count': stats['used_count'],
                     'reserved_count': stats['reserved_count'], 
                     'available_count': available_ips,
+                    'largest_free_block': occupancy['largest_free_block'],
                     'utilization_percent': round((used_in_db / total_capacity * 100), 2) if total_capacity > 0 else 0
                 })
             except:
@@ -2277,8 +5717,8 @@ def api_smart_subnet_recommendations():
             SELECT 
                 subnet,
                 COUNT(*) as total_in_db,
-                SUM(CASE WHEN hostname != '' AND hostname IS NOT NULL THEN 1 ELSE 0 END) as used_count,
-                SUM(CASE WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 1 ELSE 0 END) as reserved_count,
+                SUM(CASE WHEN derived_status = 'used' THEN 1 ELSE 0 END) as used_count,
+                SUM(CASE WHEN derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_count,
                 GROUP_CONCAT(DISTINCT vrf_vpn) as vrfs,
                 MAX(updated_at) as last_activity
             FROM ip_inventory 
@@ -2288,6 +5728,16 @@ def api_smart_subnet_recommendations():
         """)
         
         subnet_stats = cursor.fetchall()
+        
+        # Free-block analysis only for subnets with enough free addresses by count
+        candidates = []
+        for stats in subnet_stats:
+            try:
+                if subnet_capacity(stats['subnet']) - stats['used_count'] - stats['reserved_count'] >= required_ips:
+                    candidates.append(stats['subnet'])
+            except ValueError:
+                continue
+        occupied_runs = fetch_subnet_runs(cursor, candidates)
         cursor.close()
         connection.close()
         
@@ -2297,9 +5747,8 @@ def api_smart_subnet_recommendations():
         for stats in subnet_stats:
             subnet = stats['subnet']
             try:
-                import ipaddress
-                network = ipaddress.ip_network(subnet, strict=False)
-                total_capacity = len(list(network.hosts()))
+                occupancy = subnet_occupancy(subnet, occupied_runs)
+                total_capacity = occupancy['capacity']
                 used_in_db = stats['used_count'] + stats['reserved_count']
                 available_ips = total_capacity - used_in_db
                 
@@ -2319,6 +5768,7 @@ def api_smart_subnet_recommendations():
                     'used_count': stats['used_count'],
                     'reserved_count': stats['reserved_count'],
                     'available_count': available_ips,
+                    'largest_free_block': occupancy['largest_free_block'],
                     'utilization_percent': round((used_in_db / total_capacity * 100), 2),
                     'recommendation_score': score['total_score'],
                     'score_breakdown': score['breakdown'],
@@ -2438,6 +5888,8 @@ def get_network_class(subnet):
     """Get network class (A, B, C) for subnet"""
     try:
         network = ipaddress.ip_network(subnet, strict=False)
+        if network.version == 6:
+            return 'IPv6'
         first_octet = int(str(network.network_address).split('.')[0])
         
         if 1 <= first_octet <= 126:
@@ -2515,8 +5967,8 @@ def api_fast_subnets():
             SELECT 
                 subnet,
                 COUNT(*) as records_in_db,
-                COUNT(CASE WHEN hostname != '' AND hostname IS NOT NULL THEN 1 END) as used_count,
-                COUNT(CASE WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 1 END) as reserved_count,
+                COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as used_count,
+                COUNT(CASE WHEN derived_status = 'reserved' THEN 1 END) as reserved_count,
                 GROUP_CONCAT(DISTINCT vrf_vpn) as vrf_list,
                 MAX(updated_at) as last_activity
             FROM ip_inventory 
@@ -2536,9 +5988,7 @@ def api_fast_subnets():
         for stats in subnet_stats:
             subnet = stats['subnet']
             try:
-                import ipaddress
-                network = ipaddress.ip_network(subnet, strict=False)
-                theoretical_capacity = len(list(network.hosts()))
+                theoretical_capacity = subnet_capacity(subnet)
                 
                 used_ips = stats['used_count']
                 reserved_ips = stats['reserved_count']
@@ -2630,49 +6080,33 @@ def api_fast_subnet_ips():
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get existing IPs from database
+        # Count actual usage
         cursor.execute("""
-            SELECT 
-                ip_address, 
-                hostname, 
-                description, 
-                vrf_vpn,
-                CASE 
-                    WHEN hostname != '' AND hostname IS NOT NULL THEN 'used'
-                    WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 'reserved'
-                    ELSE 'available'
-                END as status
+            SELECT derived_status as status, COUNT(*) as count
             FROM ip_inventory 
             WHERE subnet = %s 
-            ORDER BY INET_ATON(ip_address)
+            GROUP BY derived_status
         """, (subnet_name,))
-        
-        existing_ips = cursor.fetchall()
-        existing_ip_dict = {ip['ip_address']: ip for ip in existing_ips}
+        status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
         
         # Calculate subnet stats
         network = ipaddress.ip_network(subnet_name, strict=False)
-        all_host_ips = list(network.hosts())
-        total_ips = len(all_host_ips)
-        
-        # Count actual usage
-        used_count = len([ip for ip in existing_ips if ip['status'] == 'used'])
-        reserved_count = len([ip for ip in existing_ips if ip['status'] == 'reserved'])
+        total_ips = subnet_capacity(network)
+        used_count = status_counts.get('used', 0)
+        reserved_count = status_counts.get('reserved', 0)
         available_count = total_ips - used_count - reserved_count
         
-        # Generate paginated IP list
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        page_host_ips = all_host_ips[start_index:end_index]
+        # Generate the requested page of the address range
+        window = subnet_address_window(cursor, network, (page - 1) * per_page, per_page,
+                                       'ip_address, hostname, description, vrf_vpn, derived_status as status')
         
         page_ips = []
-        for ip_obj in page_host_ips:
-            ip_str = str(ip_obj)
-            if ip_str in existing_ip_dict:
-                page_ips.append(existing_ip_dict[ip_str])
+        for ip_obj, row in window:
+            if row:
+                page_ips.append(row)
             else:
                 page_ips.append({
-                    'ip_address': ip_str,
+                    'ip_address': str(ip_obj),
                     'hostname': '',
                     'description': '',
                     'vrf_vpn': '',
@@ -2727,13 +6161,9 @@ def get_ip_data():
             
         cursor = connection.cursor(dictionary=True)
         
-        # Define REAL status conditions based on actual data
-        if status == 'available':
-            condition = "(hostname = '' OR hostname IS NULL) AND (description NOT LIKE '%reserved%' OR description IS NULL)"
-        elif status == 'used':
-            condition = "hostname != '' AND hostname IS NOT NULL"
-        elif status == 'reserved':
-            condition = "(hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%'"
+        # Filter on the derived (REAL) status
+        if status in IP_STATUSES:
+            condition = f"derived_status = '{status}'"
         else:
             condition = "1=1"  # All records
         
@@ -2744,14 +6174,10 @@ def get_ip_data():
             vrf_vpn, 
             description,
             subnet,
-            CASE 
-                WHEN hostname != '' AND hostname IS NOT NULL THEN 'Used'
-                WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 'Reserved'
-                ELSE 'Available'
-            END as actual_status
+            CONCAT(UCASE(LEFT(derived_status, 1)), SUBSTRING(derived_status, 2)) as actual_status
         FROM ip_inventory ip
         WHERE {condition}
-        ORDER BY INET_ATON(ip_address)
+        ORDER BY ip_bin
         LIMIT {limit}
         """
         
@@ -2759,13 +6185,15 @@ def get_ip_data():
         data = cursor.fetchall()
         
         if format_type == 'csv':
-            # Return CSV format
-            output = []
-            output.append('IP Address,Hostname,VRF,Description,Subnet,Status')
+            # Return CSV format (csv.writer quotes commas and quotes inside descriptions)
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(['IP Address', 'Hostname', 'VRF', 'Description', 'Subnet', 'Status'])
             for row in data:
-                output.append(f"{row['ip_address']},{row['hostname'] or ''},{row['vrf_vpn'] or ''},{row['description'] or ''},{row['subnet'] or ''},{row['actual_status']}")
+                writer.writerow([row['ip_address'], row['hostname'] or '', row['vrf_vpn'] or '',
+                                 row['description'] or '', row['subnet'] or '', row['actual_status']])
             
-            response = make_response('\n'.join(output))
+            response = make_response(output.getvalue())
             response.headers['Content-Type'] = 'text/csv'
             response.headers['Content-Disposition'] = f'attachment; filename={status}_ips_real_data.csv'
             return response
@@ -2797,14 +6225,12 @@ def get_subnets_overview():
             s.description,
             s.vrf as vrf_vpn,
             -- Count actual used IPs (those with hostnames)
-            COUNT(CASE WHEN ip.hostname != '' AND ip.hostname IS NOT NULL THEN 1 END) as actual_used_ips,
+            COUNT(CASE WHEN ip.derived_status = 'used' THEN 1 END) as actual_used_ips,
             -- Count actual reserved IPs 
-            COUNT(CASE WHEN (ip.hostname = '' OR ip.hostname IS NULL) AND ip.description LIKE '%reserved%' THEN 1 END) as actual_reserved_ips
+            COUNT(CASE WHEN ip.derived_status = 'reserved' THEN 1 END) as actual_reserved_ips
         FROM subnets s
         LEFT JOIN ip_inventory ip ON (
-            INET_ATON(ip.ip_address) BETWEEN 
-            INET_ATON(SUBSTRING_INDEX(s.subnet, '/', 1)) + 1 AND 
-            INET_ATON(SUBSTRING_INDEX(s.subnet, '/', 1)) + POWER(2, 32 - SUBSTRING_INDEX(s.subnet, '/', -1)) - 2
+            ip.ip_bin BETWEEN s.network_bin AND s.broadcast_bin
         )
         GROUP BY s.subnet, s.description, s.vrf
         ORDER BY s.subnet
@@ -2823,12 +6249,7 @@ def get_subnets_overview():
             
             try:
                 # Calculate real subnet capacity
-                network = ipaddress.IPv4Network(subnet_cidr, strict=False)
-                
-                if network.prefixlen >= 31:
-                    total_capacity = network.num_addresses  # /31 and /32 use all IPs
-                else:
-                    total_capacity = network.num_addresses - 2  # Exclude network and broadcast
+                total_capacity = subnet_capacity(subnet_cidr)
                 
                 # Calculate real available IPs
                 real_available_ips = total_capacity - actual_used - actual_reserved
@@ -2899,17 +6320,13 @@ def calculation_comparison():
         """)
         old_status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
         
-        # NEW METHOD - Based on actual hostname data
+        # NEW METHOD - Based on the derived status (hostname/description aware)
         cursor.execute("""
             SELECT 
-                CASE 
-                    WHEN hostname != '' AND hostname IS NOT NULL THEN 'used'
-                    WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 'reserved'
-                    ELSE 'available'
-                END as real_status,
+                derived_status as real_status,
                 COUNT(*) as count
             FROM ip_inventory 
-            GROUP BY real_status
+            GROUP BY derived_status
         """)
         new_status_counts = {row['real_status']: row['count'] for row in cursor.fetchall()}
         
@@ -2924,12 +6341,7 @@ def calculation_comparison():
         total_possible_from_subnets = 0
         for subnet in subnets:
             try:
-                network = ipaddress.IPv4Network(subnet, strict=False)
-                if network.prefixlen >= 31:
-                    capacity = network.num_addresses
-                else:
-                    capacity = network.num_addresses - 2
-                total_possible_from_subnets += capacity
+                total_possible_from_subnets += subnet_capacity(subnet)
             except:
                 continue
         
@@ -2984,8 +6396,8 @@ def get_vrf_distribution():
         SELECT 
             vrf_vpn,
             COUNT(*) as count,
-            COUNT(CASE WHEN hostname != '' THEN 1 END) as used_count,
-            COUNT(CASE WHEN hostname = '' THEN 1 END) as available_count
+            COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as used_count,
+            COUNT(CASE WHEN derived_status = 'available' THEN 1 END) as available_count
         FROM ip_inventory 
         WHERE vrf_vpn IS NOT NULL AND vrf_vpn != ''
         GROUP BY vrf_vpn
@@ -3059,6 +6471,8 @@ def process_ip_inventory_csv(csv_data, conflict_strategy):
         'skipped': 0
     }
     
+    changes = []
+    
     # Required columns for IP inventory
     required_columns = ['ip_address']
     optional_columns = ['subnet', 'hostname', 'vrf_vpn', 'description', 'status']
@@ -3084,6 +6498,8 @@ def process_ip_inventory_csv(csv_data, conflict_strategy):
             # Check if IP already exists
             cursor.execute("SELECT * FROM ip_inventory WHERE ip_address = %s", (ip_address,))
             existing_record = cursor.fetchone()
+            if existing_record:
+                decode_address_columns([existing_record])  # Returned to the client as existing_data
             
             # Prepare data for insertion/update
             data = {
@@ -3134,6 +6550,8 @@ def process_ip_inventory_csv(csv_data, conflict_strategy):
                             data['description'], data['status'], ip_address
                         ))
                         stats['updated_records'] += 1
+                        changes.append(dict(data, action='update', entity_id=existing_record['id'],
+                                            section_id=existing_record['section_id'], source='import'))
                 else:
                     # No differences, skip
                     stats['skipped'] += 1
@@ -3148,8 +6566,11 @@ def process_ip_inventory_csv(csv_data, conflict_strategy):
                     data['vrf_vpn'], data['description'], data['status']
                 ))
                 stats['new_records'] += 1
+                changes.append(dict(data, action='import', entity_id=cursor.lastrowid, source='import'))
         
+        record_changes(cursor, changes)
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
         connection.close()
         
@@ -3184,6 +6605,8 @@ def process_subnets_csv(csv_data, conflict_strategy):
         'skipped': 0
     }
     
+    changes = []
+    
     # Required columns for subnets
     required_columns = ['subnet']
     optional_columns = ['description', 'section', 'vlan', 'device', 'vrf', 'customer', 'location', 'nameservers', 'threshold_percentage']
@@ -3209,6 +6632,8 @@ def process_subnets_csv(csv_data, conflict_strategy):
             # Check if subnet already exists
             cursor.execute("SELECT * FROM subnets WHERE subnet = %s", (subnet,))
             existing_record = cursor.fetchone()
+            if existing_record:
+                decode_address_columns([existing_record])  # Returned to the client as existing_data
             
             # Prepare data for insertion/update
             data = {
@@ -3265,6 +6690,9 @@ def process_subnets_csv(csv_data, conflict_strategy):
                             data['threshold_percentage'], subnet
                         ))
                         stats['updated_records'] += 1
+                        changes.append({'action': 'update', 'entity_type': 'subnet', 'entity_id': existing_record['id'],
+                                        'subnet': subnet, 'section_id': existing_record['section_id'],
+                                        'vrf_vpn': data['vrf'], 'description': data['description'], 'source': 'import'})
                 else:
                     # No differences, skip
                     stats['skipped'] += 1
@@ -3280,8 +6708,13 @@ def process_subnets_csv(csv_data, conflict_strategy):
                     data['nameservers'], data['threshold_percentage']
                 ))
                 stats['new_records'] += 1
+                changes.append({'action': 'import', 'entity_type': 'subnet', 'entity_id': cursor.lastrowid,
+                                'subnet': subnet, 'vrf_vpn': data['vrf'], 'description': data['description'],
+                                'source': 'import'})
         
+        record_changes(cursor, changes)
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
         connection.close()
         
@@ -3318,6 +6751,7 @@ def resolve_conflicts():
         'skipped_records': 0,
         'errors': []
     }
+    changes = []
     
     try:
         for i, conflict in enumerate(conflicts):
@@ -3337,6 +6771,7 @@ def resolve_conflicts():
                         data['subnet'], data['hostname'], data['vrf_vpn'], 
                         data['description'], data['status'], data['ip_address']
                     ))
+                    changes.append(dict(data, action='update', source='conflict'))
                 elif 'subnet' in conflict['new_data']:
                     # Subnets update
                     data = conflict['new_data']
@@ -3351,6 +6786,9 @@ def resolve_conflicts():
                         data['vrf'], data['customer'], data['location'], data['nameservers'], 
                         data['threshold_percentage'], data['subnet']
                     ))
+                    changes.append({'action': 'update', 'entity_type': 'subnet', 'subnet': data['subnet'],
+                                    'vrf_vpn': data['vrf'], 'description': data['description'],
+                                    'source': 'conflict'})
                 
                 stats['updated_records'] += 1
                 
@@ -3359,7 +6797,9 @@ def resolve_conflicts():
             else:
                 stats['errors'].append(f"Unknown resolution '{resolution}' for conflict {i}")
         
+        record_changes(cursor, changes)
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
         connection.close()
         
@@ -3375,6 +6815,10 @@ def resolve_conflicts():
         connection.close()
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
+# Column layouts accepted by /api/import-csv (also used by the sample files and exports)
+IP_INVENTORY_CSV_COLUMNS = ['ip_address', 'subnet', 'hostname', 'vrf_vpn', 'description', 'status']
+SUBNETS_CSV_COLUMNS = ['subnet', 'description', 'section', 'vlan', 'device', 'vrf', 'customer', 'location', 'nameservers', 'threshold_percentage']
+
 @app.route('/api/download-sample-csv/<data_type>')
 def download_sample_csv(data_type):
     """Download sample CSV files"""
@@ -3382,7 +6826,7 @@ def download_sample_csv(data_type):
     if data_type == 'ip_inventory':
         # Sample IP inventory CSV
         sample_data = [
-            ['ip_address', 'subnet', 'hostname', 'vrf_vpn', 'description', 'status'],
+            IP_INVENTORY_CSV_COLUMNS,
             ['192.168.1.1', '192.168.1.0/24', 'gateway-router', 'CORP-VRF', 'Main gateway for corporate network', 'used'],
             ['192.168.1.10', '192.168.1.0/24', 'web-server-01', 'CORP-VRF', 'Primary web server', 'used'],
             ['192.168.1.50', '192.168.1.0/24', '', 'CORP-VRF', 'Reserved for future use', 'reserved'],
@@ -3393,7 +6837,7 @@ def download_sample_csv(data_type):
     elif data_type == 'subnets':
         # Sample subnets CSV
         sample_data = [
-            ['subnet', 'description', 'section', 'vlan', 'device', 'vrf', 'customer', 'location', 'nameservers', 'threshold_percentage'],
+            SUBNETS_CSV_COLUMNS,
             ['192.168.1.0/24', 'Corporate LAN Network', 'CORPORATE', 'VLAN100', 'Core-Switch-01', 'CORP-VRF', 'Internal IT', 'Building A Floor 1', '8.8.8.8,8.8.4.4', '80'],
             ['10.0.1.0/24', 'Management Network', 'MANAGEMENT', 'VLAN10', 'Mgmt-Switch-01', 'MGMT-VRF', 'Network Operations', 'Server Room A', '10.0.1.1,10.0.1.2', '75']
         ]
@@ -3414,6 +6858,321 @@ def download_sample_csv(data_type):
     
     return response
 
+# ================== STREAMING EXPORT API ==================
+EXPORT_FETCH_SIZE = 2000  # Rows pulled from the server-side cursor per chunk
+
+def iter_query_batches(connection, query, params, batch_size=EXPORT_FETCH_SIZE):
+    """Yield row batches from an unbuffered (server-side) cursor, closing the connection when done"""
+    cursor = connection.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        # The client may disconnect mid-stream, leaving unread rows behind
+        try:
+            cursor.close()
+        except Error:
+            pass
+        try:
+            connection.close()
+        except Error:
+            pass
+
+def encode_csv_rows(rows, columns, header=False):
+    """Encode a batch of row dicts as properly quoted CSV text"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(['' if row.get(column) is None else row.get(column) for column in columns])
+    return output.getvalue()
+
+def encode_ndjson_rows(rows, columns):
+    """Encode a batch of row dicts as newline-delimited JSON"""
+    return b''.join(app.json.encode_bytes({column: row.get(column) for column in columns}) + b'\n' for row in rows)
+
+def streaming_export_response(query, params, columns, export_name):
+    """Build a generator response that streams query results as CSV or NDJSON"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format must be csv or ndjson'}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    def generate():
+        if export_format == 'csv':
+            yield encode_csv_rows([], columns, header=True)
+        for rows in iter_query_batches(connection, query, params):
+            if export_format == 'csv':
+                yield encode_csv_rows(rows, columns)
+            else:
+                yield encode_ndjson_rows(rows, columns)
+    
+    if export_format == 'csv':
+        mimetype, extension = 'text/csv', 'csv'
+    else:
+        mimetype, extension = 'application/x-ndjson', 'ndjson'
+    
+    filename = f"{export_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    response = Response(generate(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let reverse proxies pass chunks straight through
+    return response
+
+def build_export_filters(section_column, vrf_column, subnet_column=None, status_column=None):
+    """Build WHERE conditions from the section/vrf/subnet/status query parameters"""
+    where_conditions = ["1=1"]
+    params = []
+    
+    section = request.args.get('section', '').strip()
+    if section:
+        if section.isdigit():
+            where_conditions.append(f"{section_column} = %s")
+            params.append(int(section))
+        else:
+            where_conditions.append(f"{section_column} = (SELECT id FROM network_sections WHERE name = %s)")
+            params.append(section)
+    
+    vrf = request.args.get('vrf', '').strip()
+    if vrf:
+        where_conditions.append(f"{vrf_column} = %s")
+        params.append(vrf)
+    
+    subnet = request.args.get('subnet', '').strip()
+    if subnet and subnet_column:
+        where_conditions.append(f"{subnet_column} = %s")
+        params.append(subnet)
+    
+    status = request.args.get('status', '').strip()
+    if status and status_column:
+        where_conditions.append(f"{status_column} = %s")
+        params.append(status)
+    
+    return " AND ".join(where_conditions), params
+
+@app.route('/api/export/ip-inventory')
+@read_only
+@admission('export', inventory_scan_cost)
+def export_ip_inventory():
+    """Stream the IP inventory as CSV (importer layout) or NDJSON, filterable by section/vrf/subnet/status"""
+    where_clause, params = build_export_filters('i.section_id', 'i.vrf_vpn', 'i.subnet', 'i.status')
+    
+    # Primary key order streams straight off the clustered index without a filesort
+    query = f"""
+        SELECT i.ip_address, i.subnet, i.hostname, i.vrf_vpn, i.description, i.status
+        FROM ip_inventory i
+        WHERE {where_clause}
+        ORDER BY i.id
+    """
+    return streaming_export_response(query, params, IP_INVENTORY_CSV_COLUMNS, 'ip_inventory')
+
+@app.route('/api/export/subnets')
+@read_only
+@admission('export', subnets_scan_cost)
+def export_subnets():
+    """Stream the subnets table as CSV (importer layout) or NDJSON, filterable by section/vrf/subnet"""
+    where_clause, params = build_export_filters('s.section_id', 's.vrf', 's.subnet')
+    
+    query = f"""
+        SELECT s.subnet, s.description, s.section, s.vlan, s.device, s.vrf,
+               s.customer, s.location, s.nameservers, s.threshold_percentage
+        FROM subnets s
+        WHERE {where_clause}
+        ORDER BY s.id
+    """
+    return streaming_export_response(query, params, SUBNETS_CSV_COLUMNS, 'subnets')
+
+# ================== ANALYTICS SNAPSHOT EXPORT ==================
+# pyarrow is optional; snapshot endpoints report 501 when it is not installed
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+app.config['SNAPSHOT_FOLDER'] = 'snapshots'
+app.config['SNAPSHOT_ROW_GROUP_SIZE'] = 100000
+app.config['SNAPSHOT_COMPRESSION'] = 'zstd'
+
+def _int_or_none(value):
+    return int(value) if value is not None else None
+
+def _bool_or_none(value):
+    return bool(value) if value is not None else None
+
+def snapshot_columns(table_name):
+    """Column spec (name, arrow type, row converter) for each snapshot table"""
+    category = pa.dictionary(pa.int32(), pa.string())  # VRF/section/status repeat heavily
+    if table_name == 'ip_inventory':
+        return [
+            ('id', pa.int64(), lambda r: r['id']),
+            ('ip_bin', pa.binary(16), lambda r: r['ip_bin']),
+            ('ip_family', pa.uint8(), lambda r: _int_or_none(r['ip_family'])),
+            ('subnet_network', pa.binary(16), lambda r: r['subnet_network']),
+            ('subnet_prefix', pa.uint8(), lambda r: _int_or_none(r['subnet_prefix'])),
+            ('section', category, lambda r: r['section']),
+            ('status', category, lambda r: r['status']),
+            ('vrf_vpn', category, lambda r: r['vrf_vpn'] or None),
+            ('hostname', pa.string(), lambda r: r['hostname'] or None),
+            ('description', pa.string(), lambda r: r['description'] or None),
+            ('created_at', pa.timestamp('s'), lambda r: r['created_at']),
+            ('updated_at', pa.timestamp('s'), lambda r: r['updated_at'])
+        ]
+    if table_name == 'subnets':
+        return [
+            ('id', pa.int64(), lambda r: r['id']),
+            ('ip_family', pa.uint8(), lambda r: _int_or_none(r['ip_family'])),
+            ('subnet_network', pa.binary(16), lambda r: r['subnet_network']),
+            ('subnet_prefix', pa.uint8(), lambda r: _int_or_none(r['subnet_prefix'])),
+            ('section', category, lambda r: r['section_name'] or r['section'] or None),
+            ('vrf', category, lambda r: r['vrf'] or None),
+            ('vlan', category, lambda r: r['vlan'] or None),
+            ('device', pa.string(), lambda r: r['device'] or None),
+            ('customer', pa.string(), lambda r: r['customer'] or None),
+            ('location', category, lambda r: r['location'] or None),
+            ('description', pa.string(), lambda r: r['description'] or None),
+            ('threshold_percentage', pa.uint8(), lambda r: _int_or_none(r['threshold_percentage'])),
+            ('mark_as_pool', pa.bool_(), lambda r: _bool_or_none(r['mark_as_pool'])),
+            ('mark_as_full', pa.bool_(), lambda r: _bool_or_none(r['mark_as_full'])),
+            ('created_at', pa.timestamp('s'), lambda r: r['created_at'])
+        ]
+    if table_name == 'subnet_utilization':
+        return [
+            ('subnet_network', pa.binary(16), lambda r: r['subnet_network']),
+            ('subnet_prefix', pa.uint8(), lambda r: _int_or_none(r['subnet_prefix'])),
+            ('capacity', pa.float64(), lambda r: r['capacity']),  # IPv6 capacities overflow int64
+            ('records', pa.int64(), lambda r: _int_or_none(r['records'])),
+            ('used', pa.int64(), lambda r: _int_or_none(r['used'])),
+            ('reserved', pa.int64(), lambda r: _int_or_none(r['reserved'])),
+            ('available', pa.float64(), lambda r: r['available']),
+            ('utilization_percent', pa.float32(), lambda r: r['utilization_percent'])
+        ]
+    raise ValueError(f"Unknown snapshot table: {table_name}")
+
+SNAPSHOT_QUERIES = {
+    'ip_inventory': f"""
+        SELECT i.id, i.ip_bin, i.ip_family,
+               {SQL_ADDRESS_BIN.format("SUBSTRING_INDEX(i.subnet, '/', 1)")} as subnet_network,
+               CAST(SUBSTRING_INDEX(i.subnet, '/', -1) AS UNSIGNED) as subnet_prefix,
+               s.name as section, i.status, i.vrf_vpn, i.hostname, i.description,
+               i.created_at, i.updated_at
+        FROM ip_inventory i
+        LEFT JOIN network_sections s ON i.section_id = s.id
+        ORDER BY i.id
+    """,
+    'subnets': """
+        SELECT sub.*, sub.network_bin as subnet_network,
+               CAST(SUBSTRING_INDEX(sub.subnet, '/', -1) AS UNSIGNED) as subnet_prefix,
+               s.name as section_name
+        FROM subnets sub
+        LEFT JOIN network_sections s ON sub.section_id = s.id
+        ORDER BY sub.id
+    """,
+    'subnet_utilization': f"""
+        SELECT 
+            subnet,
+            {SQL_ADDRESS_BIN.format("SUBSTRING_INDEX(subnet, '/', 1)")} as subnet_network,
+            CAST(SUBSTRING_INDEX(subnet, '/', -1) AS UNSIGNED) as subnet_prefix,
+            COUNT(*) as records,
+            COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as used,
+            COUNT(CASE WHEN derived_status = 'reserved' THEN 1 END) as reserved
+        FROM ip_inventory 
+        WHERE subnet IS NOT NULL AND subnet != ''
+        GROUP BY subnet
+        ORDER BY subnet
+    """
+}
+
+def add_utilization_fields(rows):
+    """Compute capacity/available/utilization for grouped subnet rows (invalid subnets are dropped)"""
+    result = []
+    for row in rows:
+        try:
+            network = ipaddress.ip_network(row['subnet'], strict=False)
+        except ValueError:
+            continue
+        capacity = subnet_capacity(network)
+        used = int(row['used'] or 0)
+        reserved = int(row['reserved'] or 0)
+        row['capacity'] = capacity
+        row['available'] = max(0, capacity - used - reserved)
+        row['utilization_percent'] = round(used / capacity * 100, 2) if capacity > 0 else 0
+        result.append(row)
+    return result
+
+def write_snapshot_table(table_name, path):
+    """Write one table to a Parquet file, one row group per server-side cursor batch"""
+    connection = get_db_connection()
+    if not connection:
+        raise Error(msg='Database connection failed')
+    
+    columns = snapshot_columns(table_name)
+    schema = pa.schema([(name, arrow_type) for name, arrow_type, _ in columns])
+    total_rows = 0
+    
+    with pq.ParquetWriter(path, schema, compression=app.config['SNAPSHOT_COMPRESSION']) as writer:
+        batches = iter_query_batches(connection, SNAPSHOT_QUERIES[table_name], (),
+                                     batch_size=app.config['SNAPSHOT_ROW_GROUP_SIZE'])
+        for rows in batches:
+            if table_name == 'subnet_utilization':
+                rows = add_utilization_fields(rows)
+            arrays = [pa.array([convert(row) for row in rows], type=arrow_type)
+                      for _, arrow_type, convert in columns]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            total_rows += len(rows)
+    
+    return total_rows
+
+def write_snapshot(output_dir, tables=None):
+    """Write the analytics snapshot (ip_inventory, subnets, subnet_utilization) into output_dir"""
+    if pa is None:
+        raise RuntimeError('pyarrow is required for snapshot export (pip install pyarrow)')
+    
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    for table_name in tables or list(SNAPSHOT_QUERIES):
+        path = os.path.join(output_dir, f"{table_name}.parquet")
+        rows = write_snapshot_table(table_name, path)
+        results[table_name] = {'path': path, 'rows': rows}
+        print(f"📦 Snapshot {table_name}: {rows} rows -> {path}")
+    return results
+
+@app.route('/api/export/snapshot/<table_name>')
+@read_only
+@admission('export', inventory_scan_cost)
+def export_snapshot_table(table_name):
+    """Download a compressed Parquet snapshot of ip_inventory, subnets or subnet_utilization"""
+    if pa is None:
+        return jsonify({'error': 'Snapshot export requires pyarrow'}), 501
+    if table_name not in SNAPSHOT_QUERIES:
+        return jsonify({'error': f'Unknown table: {table_name}'}), 404
+    
+    try:
+        os.makedirs(app.config['SNAPSHOT_FOLDER'], exist_ok=True)
+        handle, path = tempfile.mkstemp(suffix='.parquet', dir=app.config['SNAPSHOT_FOLDER'])
+        os.close(handle)
+        write_snapshot_table(table_name, path)
+        
+        filename = f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        response = send_file(path, mimetype='application/vnd.apache.parquet',
+                             as_attachment=True, download_name=filename)
+        response.call_on_close(lambda: os.remove(path))
+        return response
+        
+    except Exception as e:
+        print(f"❌ Error exporting snapshot: {e}")
+        if 'path' in locals() and os.path.exists(path):
+            os.remove(path)
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/import-history')
 def get_import_history():
     """Get import history and statistics"""
@@ -3424,37 +7183,15 @@ def get_import_history():
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get recent imports (last 100 records)
-        cursor.execute("""
-            SELECT 
-                ip_address,
-                hostname,
-                vrf_vpn,
-                description,
-                created_at,
-                updated_at,
-                CASE 
-                    WHEN created_at = updated_at THEN 'Imported'
-                    ELSE 'Updated'
-                END as action
-            FROM ip_inventory 
-            ORDER BY updated_at DESC 
-            LIMIT 100
-        """)
-        
-        recent_activities = cursor.fetchall()
-        
-        # Convert timestamps to strings
-        for activity in recent_activities:
-            activity['created_at'] = activity['created_at'].isoformat() if activity['created_at'] else None
-            activity['updated_at'] = activity['updated_at'].isoformat() if activity['updated_at'] else None
+        # Get recent imports (last 100 change log entries from CSV imports and conflict resolution)
+        recent_activities = fetch_recent_activity(cursor, limit=100, sources=['import', 'conflict'])
         
         # Get import statistics
         cursor.execute("""
             SELECT 
                 COUNT(*) as total_ips,
-                COUNT(CASE WHEN hostname != '' AND hostname IS NOT NULL THEN 1 END) as used_ips,
-                COUNT(CASE WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 1 END) as reserved_ips,
+                COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as used_ips,
+                COUNT(CASE WHEN derived_status = 'reserved' THEN 1 END) as reserved_ips,
                 COUNT(DISTINCT vrf_vpn) as total_vrfs,
                 COUNT(DISTINCT subnet) as total_subnets_in_ips
             FROM ip_inventory
@@ -3547,9 +7284,12 @@ def add_single_ip():
         
         values = (ip_address, subnet, status, vrf_vpn, hostname, description)
         cursor.execute(insert_query, values)
+        new_id = cursor.lastrowid
+        record_change(cursor, 'add', entity_id=new_id, ip_address=ip_address, subnet=subnet, status=status,
+                      vrf_vpn=vrf_vpn, hostname=hostname, description=description)
         connection.commit()
+        notify_dashboard_change()
         
-        new_id = cursor.lastrowid
         cursor.close()
         connection.close()
         
@@ -3579,11 +7319,11 @@ def api_ip_details(status):
         
         if status == 'available':
             # Get all subnets and calculate available IPs
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT DISTINCT subnet 
                 FROM ip_inventory 
                 WHERE subnet IS NOT NULL AND subnet != ''
-                ORDER BY INET_ATON(SUBSTRING_INDEX(subnet, '/', 1))
+                ORDER BY {SQL_ADDRESS_BIN.format("SUBSTRING_INDEX(subnet, '/', 1)")}
             """)
             subnets = cursor.fetchall()
             
@@ -3596,40 +7336,19 @@ def api_ip_details(status):
                     
                 subnet = subnet_row['subnet']
                 try:
-                    network = ipaddress.IPv4Network(subnet, strict=False)
-                    
-                    # Get used IPs in this subnet
-                    cursor.execute("""
-                        SELECT ip_address 
-                        FROM ip_inventory 
-                        WHERE subnet = %s AND (hostname IS NOT NULL AND hostname != '')
-                    """, (subnet,))
-                    used_ips = set(row['ip_address'] for row in cursor.fetchall())
-                    
-                    # Get reserved IPs in this subnet
-                    cursor.execute("""
-                        SELECT ip_address 
-                        FROM ip_inventory 
-                        WHERE subnet = %s AND (hostname IS NULL OR hostname = '') 
-                        AND description LIKE '%reserved%'
-                    """, (subnet,))
-                    reserved_ips = set(row['ip_address'] for row in cursor.fetchall())
+                    network = ipaddress.ip_network(subnet, strict=False)
                     
-                    # Find available IPs
-                    for ip in network.hosts() if network.prefixlen < 31 else network:
-                        if total_checked >= limit:
-                            break
-                            
-                        ip_str = str(ip)
-                        if ip_str not in used_ips and ip_str not in reserved_ips:
-                            available_ips.append({
-                                'ip_address': ip_str,
-                                'subnet': subnet,
-                                'hostname': '-',
-                                'vrf_vpn': '',
-                                'description': 'Available for allocation'
-                            })
-                            total_checked += 1
+                    # Walk the gaps between used and reserved IPs in this subnet
+                    free_ips = iter_free_addresses(cursor, network)
+                    for ip in itertools.islice(free_ips, limit - total_checked):
+                        available_ips.append({
+                            'ip_address': str(ip),
+                            'subnet': subnet,
+                            'hostname': '-',
+                            'vrf_vpn': '',
+                            'description': 'Available for allocation'
+                        })
+                        total_checked += 1
                             
                 except Exception as e:
                     print(f"Error processing subnet {subnet}: {e}")
@@ -3646,8 +7365,8 @@ def api_ip_details(status):
             cursor.execute("""
                 SELECT ip_address, subnet, hostname, vrf_vpn, description
                 FROM ip_inventory 
-                WHERE hostname IS NOT NULL AND hostname != ''
-                ORDER BY INET_ATON(ip_address)
+                WHERE derived_status = 'used'
+                ORDER BY ip_bin
                 LIMIT %s
             """, (limit,))
             
@@ -3656,9 +7375,8 @@ def api_ip_details(status):
             cursor.execute("""
                 SELECT ip_address, subnet, hostname, vrf_vpn, description
                 FROM ip_inventory 
-                WHERE (hostname IS NULL OR hostname = '') 
-                AND description LIKE '%reserved%'
-                ORDER BY INET_ATON(ip_address)
+                WHERE derived_status = 'reserved'
+                ORDER BY ip_bin
                 LIMIT %s
             """, (limit,))
         
@@ -3723,6 +7441,35 @@ def api_ip_details(status):
         return jsonify({'error': str(e)}), 500
 
 # Existing routes continue...
+def fetch_recent_activity(cursor, limit=20, section_id=None, subnet=None, sources=None):
+    """Recent activity rows for dashboards, newest first from the change log"""
+    conditions = []
+    params = []
+    if section_id:
+        conditions.append("section_id = %s")
+        params.append(section_id)
+    if subnet:
+        conditions.append("subnet = %s")
+        params.append(subnet)
+    if sources:
+        conditions.append(f"source IN ({', '.join(['%s'] * len(sources))})")
+        params.extend(sources)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    cursor.execute(f"""
+        SELECT id, action, entity_type, ip_address, subnet, section_id, status,
+               vrf_vpn, hostname, description, source, changed_at as timestamp
+        FROM change_log
+        {where_clause}
+        ORDER BY changed_at DESC, id DESC
+        LIMIT %s
+    """, params + [limit])
+    
+    activities = cursor.fetchall()
+    for activity in activities:
+        activity['action'] = CHANGE_ACTION_LABELS.get(activity['action'], activity['action'].title())
+    return activities
+
 @app.route('/api/recent-activity')
 def get_recent_activity():
     """Get recent activity data"""
@@ -3732,32 +7479,12 @@ def get_recent_activity():
             return jsonify({'error': 'Database connection failed'}), 500
             
         cursor = connection.cursor(dictionary=True)
-        
-        # Simulate recent activity based on IP data
-        query = """
-        SELECT 
-            ip_address,
-            hostname,
-            vrf_vpn,
-            description,
-            CASE 
-                WHEN hostname != '' THEN 'Allocated'
-                WHEN hostname = '' THEN 'Released'
-                ELSE 'Updated'
-            END as action,
-            NOW() - INTERVAL FLOOR(RAND() * 168) HOUR as timestamp
-        FROM ip_inventory 
-        WHERE hostname != '' OR description LIKE '%recent%'
-        ORDER BY timestamp DESC
-        LIMIT 20
-        """
-        
-        cursor.execute(query)
-        activities = cursor.fetchall()
-        
-        # Convert timestamp to string for JSON serialization
-        for activity in activities:
-            activity['timestamp'] = activity['timestamp'].isoformat() if activity['timestamp'] else None
+        activities = fetch_recent_activity(
+            cursor,
+            limit=min(request.args.get('limit', 20, type=int), 500),
+            section_id=request.args.get('section_id', type=int),
+            subnet=request.args.get('subnet')
+        )
         
         return jsonify({'activities': activities})
         
@@ -3768,8 +7495,85 @@ def get_recent_activity():
             cursor.close()
             connection.close()
 
+def fetch_changes(cursor, since, limit, section_id=None, vrf=None, subnet=None, entity_type=None):
+    """Change log rows with id > since in id order (one seek on the matching *_seq index)"""
+    conditions = ["id > %s"]
+    params = [since]
+    if section_id:
+        conditions.append("section_id = %s")
+        params.append(section_id)
+    if vrf:
+        conditions.append("vrf_vpn = %s")
+        params.append(vrf)
+    if subnet:
+        conditions.append("subnet = %s")
+        params.append(subnet)
+    if entity_type:
+        conditions.append("entity_type = %s")
+        params.append(entity_type)
+    
+    cursor.execute(f"""
+        SELECT id, changed_at, action, entity_type, entity_id, ip_address, subnet, section_id,
+               status, vrf_vpn, hostname, description, source
+        FROM change_log
+        WHERE {' AND '.join(conditions)}
+        ORDER BY id
+        LIMIT %s
+    """, params + [limit])
+    return cursor.fetchall()
+
+@app.route('/api/changes')
+def api_changes():
+    """Change feed: mutations after ?since=<cursor>, oldest first, for incremental sync.
+    
+    Always served from the primary, so a consumer never reads a cursor back from a lagging replica.
+    """
+    since = request.args.get('since', '0')
+    if since != 'latest':
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': "since must be a change id or 'latest'"}), 400
+    limit = request.args.get('limit', app.config['CHANGES_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['CHANGES_PAGE_SIZE'] * 10))
+    entity_type = request.args.get('entity_type')
+    if entity_type and entity_type not in ('ip', 'subnet', 'section'):
+        return jsonify({'error': 'entity_type must be ip, subnet or section'}), 400
+    
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+        cursor = connection.cursor(dictionary=True)
+        
+        if since == 'latest':
+            # Start a new consumer at the head (after taking a full snapshot elsewhere); ids are
+            # assigned in commit order, so nothing below it can still appear
+            cursor.execute("SELECT COALESCE(MAX(id), 0) as head FROM change_log")
+            since = cursor.fetchone()['head']
+            changes = []
+        else:
+            changes = fetch_changes(cursor, since, limit,
+                                    section_id=request.args.get('section_id', type=int),
+                                    vrf=request.args.get('vrf'),
+                                    subnet=request.args.get('subnet'),
+                                    entity_type=entity_type)
+        cursor.close()
+        connection.close()
+        
+        return jsonify({
+            'changes': changes,
+            'cursor': changes[-1]['id'] if changes else since,
+            'has_more': len(changes) == limit
+        })
+        
+    except Error as e:
+        print(f"❌ Error reading change feed: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # New enhanced subnet management endpoints
 @app.route('/api/subnet-details/<path:subnet_name>')
+@admission('analytics', subnet_page_cost)
 def get_subnet_details(subnet_name):
     """Get detailed information about a specific subnet including all IPs"""
     try:
@@ -3797,47 +7601,30 @@ def get_subnet_details(subnet_name):
             'updated_at': None
         }
         
-        # Get all IPs in this subnet with REAL status calculation
+        # Count IPs in this subnet by VRF and REAL status
         cursor.execute("""
-            SELECT 
-                ip_address, 
-                hostname, 
-                description, 
-                vrf_vpn,
-                created_at, 
-                updated_at,
-                CASE 
-                    WHEN hostname != '' AND hostname IS NOT NULL THEN 'used'
-                    WHEN (hostname = '' OR hostname IS NULL) AND description LIKE '%reserved%' THEN 'reserved'
-                    ELSE 'available'
-                END as status
+            SELECT vrf_vpn, derived_status as status, COUNT(*) as count
             FROM ip_inventory 
             WHERE subnet = %s 
-            ORDER BY INET_ATON(ip_address)
+            GROUP BY vrf_vpn, derived_status
         """, (subnet_name,))
-        existing_ips = cursor.fetchall()
-        
-        # Create a dictionary for quick lookup of existing IPs
-        existing_ip_dict = {ip['ip_address']: ip for ip in existing_ips}
+        status_rows = cursor.fetchall()
         
-        # Generate ALL possible IPs in the subnet
+        # List one window of the subnet's host addresses; addresses without a row are available
         network = ipaddress.ip_network(subnet_name, strict=False)
-        all_ips = []
-        
-        # For each possible IP in the subnet
-        for ip_obj in network.hosts():
-            ip_str = str(ip_obj)
-            
-            if ip_str in existing_ip_dict:
+        actual_total_ips = subnet_capacity(network)
+        offset, limit, pagination = page_args(actual_total_ips)
+        window = subnet_address_window(cursor, network, offset, limit,
+                                       'ip_address, hostname, description, vrf_vpn, created_at, updated_at, derived_status as status')
+        ips = []
+        for ip_obj, row in window:
+            if row:
                 # IP exists in database - use database data
-                ip_data = existing_ip_dict[ip_str]
-                ip_data['created_at'] = ip_data['created_at'].isoformat() if ip_data['created_at'] else None
-                ip_data['updated_at'] = ip_data['updated_at'].isoformat() if ip_data['updated_at'] else None
-                all_ips.append(ip_data)
+                ips.append(row)
             else:
                 # IP not in database - mark as available
-                all_ips.append({
-                    'ip_address': ip_str,
+                ips.append({
+                    'ip_address': str(ip_obj),
                     'hostname': '',
                     'description': '',
                     'vrf_vpn': '',
@@ -3846,35 +7633,21 @@ def get_subnet_details(subnet_name):
                     'status': 'available'
                 })
         
-        # Use the complete IP list for calculations
-        ips = all_ips
-        
         # Calculate subnet statistics based on ALL possible IPs in subnet
         try:
-            network = ipaddress.ip_network(subnet_name, strict=False)
-            theoretical_total = network.num_addresses - 2  # Exclude network and broadcast
-            
-            # Count IPs by status from the complete IP list
-            actual_used_count = len([ip for ip in ips if ip['status'] == 'used'])
-            actual_reserved_count = len([ip for ip in ips if ip['status'] == 'reserved'])
-            actual_available_count = len([ip for ip in ips if ip['status'] == 'available'])
+            theoretical_total = network.num_addresses - 2 if network.version == 4 else network.num_addresses
             
-            # Total IPs is the theoretical total (all possible host IPs)
-            actual_total_ips = len(ips)  # This should equal theoretical_total
+            actual_used_count = sum(row['count'] for row in status_rows if row['status'] == 'used')
+            actual_reserved_count = sum(row['count'] for row in status_rows if row['status'] == 'reserved')
+            actual_available_count = actual_total_ips - actual_used_count - actual_reserved_count
             
             # Create VRF summary from existing IPs only
             vrf_summary = {}
-            for ip in existing_ips:  # Use existing_ips for VRF summary
-                vrf = ip['vrf_vpn'] or 'Default'
+            for row in status_rows:
+                vrf = row['vrf_vpn'] or 'Default'
                 if vrf not in vrf_summary:
                     vrf_summary[vrf] = {'used': 0, 'available': 0, 'reserved': 0}
-                
-                if ip['hostname'] and ip['hostname'].strip():
-                    vrf_summary[vrf]['used'] += 1
-                elif ip['description'] and 'reserved' in ip['description'].lower():
-                    vrf_summary[vrf]['reserved'] += 1
-                else:
-                    vrf_summary[vrf]['available'] += 1
+                vrf_summary[vrf][row['status']] += row['count']
             
             subnet_stats = {
                 'total_ips': actual_total_ips,  # Use actual count from database
@@ -3902,7 +7675,8 @@ def get_subnet_details(subnet_name):
         return jsonify({
             'success': True,
             'subnet': subnet,
-            'ips': ips,
+            'ips': to_columnar(ips, SUBNET_IP_COLUMNS) if wants_columnar() else ips,
+            'pagination': pagination,
             'vrf_summary': vrf_summary,
             'network_address': subnet_stats['network_address'],
             'broadcast_address': subnet_stats['broadcast_address'],
@@ -3927,6 +7701,7 @@ def get_subnet_details(subnet_name):
             connection.close()
 
 @app.route('/api/subnet-all-ips/<path:subnet_name>')
+@admission('analytics', subnet_page_cost)
 def get_subnet_all_ips(subnet_name):
     """Get ALL IP addresses in a subnet (including available ones)"""
     try:
@@ -3942,34 +7717,21 @@ def get_subnet_all_ips(subnet_name):
         except ValueError as e:
             return jsonify({'error': f'Invalid subnet format: {e}'}), 400
         
-        # Get existing IPs from database
-        cursor.execute("""
-            SELECT 
-                ip_address, 
-                hostname, 
-                description, 
-                vrf_vpn,
-                created_at, 
-                updated_at
-            FROM ip_inventory 
-            WHERE subnet = %s
-        """, (subnet_name,))
-        existing_ips = {row['ip_address']: row for row in cursor.fetchall()}
+        # List one window of the subnet; existing IPs come from a single ip_bin range scan
+        total_ips = subnet_capacity(network)
+        offset, limit, pagination = page_args(total_ips)
+        window = subnet_address_window(cursor, network, offset, limit,
+                                       'ip_address, hostname, description, vrf_vpn, created_at, updated_at, derived_status')
         
-        # Generate all possible IPs in subnet
         all_ips = []
-        for ip in network.hosts():
+        for ip, ip_data in window:
             ip_str = str(ip)
             
-            if ip_str in existing_ips:
+            if ip_data:
                 # IP exists in database
-                ip_data = existing_ips[ip_str]
-                status = 'used' if ip_data['hostname'] and ip_data['hostname'].strip() else \
-                        'reserved' if ip_data['description'] and 'reserved' in ip_data['description'].lower() else 'available'
-                
                 all_ips.append({
                     'ip_address': ip_str,
-                    'status': status,
+                    'status': ip_data['derived_status'],
                     'hostname': ip_data['hostname'] or '',
                     'description': ip_data['description'] or '',
                     'vrf_vpn': ip_data['vrf_vpn'] or 'Default',
@@ -3994,8 +7756,9 @@ def get_subnet_all_ips(subnet_name):
         return jsonify({
             'success': True,
             'subnet': subnet_name,
-            'total_ips': len(all_ips),
-            'ips': all_ips
+            'total_ips': total_ips,
+            'ips': to_columnar(all_ips, SUBNET_IP_COLUMNS) if wants_columnar() else all_ips,
+            'pagination': pagination
         })
         
     except Exception as e:
@@ -4022,20 +7785,9 @@ def reserve_next_ip():
         try:
             network = ipaddress.ip_network(subnet_name, strict=False)
             
-            # Get existing IPs in this subnet
-            cursor.execute("""
-                SELECT ip_address FROM ip_inventory 
-                WHERE subnet = %s AND status IN ('used', 'reserved')
-            """, (subnet_name,))
-            used_ips = [row['ip_address'] for row in cursor.fetchall()]
-            
-            # Find next available IP
-            next_ip = None
-            for ip in network.hosts():
-                ip_str = str(ip)
-                if ip_str not in used_ips:
-                    next_ip = ip_str
-                    break
+            # Find next available IP by walking the gaps between used and reserved IPs
+            next_ip = next(iter_free_addresses(cursor, network), None)
+            next_ip = str(next_ip) if next_ip else None
             
             if not next_ip:
                 return jsonify({'error': 'No available IPs in subnet'}), 400
@@ -4051,8 +7803,11 @@ def reserve_next_ip():
                 updated_at = CURRENT_TIMESTAMP
             """, (next_ip, subnet_name, f"Auto-reserved-{datetime.now().strftime('%Y%m%d-%H%M%S')}", 
                   f"Automatically reserved IP from subnet {subnet_name}"))
+            record_change(cursor, 'reserve', ip_address=next_ip, subnet=subnet_name, status='reserved',
+                          description=f"Automatically reserved IP from subnet {subnet_name}")
             
             connection.commit()
+            notify_dashboard_change()
             cursor.close()
             connection.close()
             
@@ -4083,21 +7838,21 @@ def get_enhanced_subnets():
         cursor.execute("""
             SELECT s.*, 
                    COUNT(i.id) as configured_ips,
-                   SUM(CASE WHEN i.status = 'used' THEN 1 ELSE 0 END) as used_ips,
-                   SUM(CASE WHEN i.status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
-                   SUM(CASE WHEN i.status = 'available' THEN 1 ELSE 0 END) as available_ips
+                   SUM(CASE WHEN i.derived_status = 'used' THEN 1 ELSE 0 END) as used_ips,
+                   SUM(CASE WHEN i.derived_status = 'reserved' THEN 1 ELSE 0 END) as reserved_ips,
+                   SUM(CASE WHEN i.derived_status = 'available' THEN 1 ELSE 0 END) as available_ips
             FROM subnets s
             LEFT JOIN ip_inventory i ON s.subnet = i.subnet
             GROUP BY s.id, s.subnet
             ORDER BY s.subnet
         """)
-        subnets = cursor.fetchall()
+        subnets = decode_address_columns(cursor.fetchall())
         
         # Calculate total possible IPs for each subnet
         for subnet in subnets:
             try:
                 network = ipaddress.ip_network(subnet['subnet'], strict=False)
-                subnet['total_ips'] = network.num_addresses - 2  # Exclude network and broadcast
+                subnet['total_ips'] = subnet_capacity(network)
                 
                 # Calculate real availability
                 used = subnet['used_ips'] or 0
@@ -4163,6 +7918,9 @@ def api_reserve_ip():
                 SET hostname = %s, description = %s, updated_at = NOW()
                 WHERE ip_address = %s
             """, (hostname, description, ip_address))
+            record_change(cursor, 'reserve', entity_id=existing_ip['id'], ip_address=ip_address,
+                          subnet=existing_ip['subnet'], section_id=existing_ip.get('section_id'),
+                          vrf_vpn=existing_ip['vrf_vpn'], hostname=hostname, description=description)
         else:
             # Create new record - need to determine subnet
             import ipaddress
@@ -4190,8 +7948,11 @@ def api_reserve_ip():
                 INSERT INTO ip_inventory (ip_address, hostname, description, subnet, vrf_vpn, created_at, updated_at)
                 VALUES (%s, %s, %s, %s, 'DEFAULT-VRF', NOW(), NOW())
             """, (ip_address, hostname, description, target_subnet))
+            record_change(cursor, 'reserve', entity_id=cursor.lastrowid, ip_address=ip_address,
+                          subnet=target_subnet, vrf_vpn='DEFAULT-VRF', hostname=hostname, description=description)
         
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
         connection.close()
         
@@ -4236,8 +7997,12 @@ def api_release_ip():
             SET hostname = '', description = '', updated_at = NOW()
             WHERE ip_address = %s
         """, (ip_address,))
+        record_change(cursor, 'release', entity_id=existing_ip['id'], ip_address=ip_address,
+                      subnet=existing_ip['subnet'], section_id=existing_ip.get('section_id'),
+                      vrf_vpn=existing_ip['vrf_vpn'])
         
         connection.commit()
+        notify_dashboard_change()
         cursor.close()
         connection.close()
         
@@ -4352,63 +8117,49 @@ def section_csv_import(section_id):
 def api_section_statistics(section_id):
     """Get statistics for a specific section"""
     try:
+        section = section_cache.by_id(section_id)
+        if not section:
+            return jsonify({'error': 'Section not found'}), 404
+        
         connection = get_db_connection()
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get section details
-        cursor.execute("SELECT * FROM network_sections WHERE id = %s", (section_id,))
-        section = cursor.fetchone()
-        
-        if not section:
-            return jsonify({'error': 'Section not found'}), 404
-        
-        # Get subnet statistics for this section
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as subnet_count,
-                SUM(CAST(SUBSTRING_INDEX(subnet, '/', -1) AS UNSIGNED)) as total_capacity
-            FROM subnets 
-            WHERE section_id = %s
-        """, (section_id,))
-        subnet_stats = cursor.fetchone()
-        
-        # Get IP statistics for this section
+        # Capacity from the per-subnet counters, address counts from idx_section_subnet_status
         cursor.execute("""
-            SELECT 
-                COUNT(*) as total_ips,
-                SUM(CASE WHEN status = 'Active' THEN 1 ELSE 0 END) as used_ips,
-                SUM(CASE WHEN status = 'Reserved' THEN 1 ELSE 0 END) as reserved_ips,
-                SUM(CASE WHEN status = 'Available' THEN 1 ELSE 0 END) as available_ips
-            FROM ip_addresses 
-            WHERE section_id = %s
-        """, (section_id,))
-        ip_stats = cursor.fetchone()
+            SELECT sub.subnet_count, sub.total_capacity, ip.total_ips, ip.used_ips, ip.reserved_ips
+            FROM (
+                SELECT COUNT(*) as subnet_count, COALESCE(SUM(capacity), 0) as total_capacity
+                FROM subnets
+                WHERE section_id = %s
+            ) sub
+            CROSS JOIN (
+                SELECT COUNT(*) as total_ips,
+                       COUNT(CASE WHEN derived_status = 'used' THEN 1 END) as used_ips,
+                       COUNT(CASE WHEN derived_status = 'reserved' THEN 1 END) as reserved_ips
+                FROM ip_inventory
+                WHERE section_id = %s
+            ) ip
+        """, (section_id, section_id))
+        stats = cursor.fetchone()
         
         cursor.close()
         connection.close()
         
-        # Calculate statistics
-        subnet_count = subnet_stats['subnet_count'] or 0
-        total_capacity = subnet_stats['total_capacity'] or 0
-        used_ips = ip_stats['used_ips'] or 0
-        reserved_ips = ip_stats['reserved_ips'] or 0
-        available_ips = ip_stats['available_ips'] or 0
-        
-        # Calculate estimated capacity based on /24 networks if no specific data
-        if total_capacity == 0 and subnet_count > 0:
-            total_capacity = subnet_count * 254  # Assume /24 networks
-            available_ips = total_capacity - used_ips - reserved_ips
+        total_capacity = int(stats['total_capacity'])
+        used_ips = stats['used_ips']
+        reserved_ips = stats['reserved_ips']
         
         return jsonify({
             'section_id': section_id,
             'section_name': section['name'],
-            'subnets': subnet_count,
+            'subnets': stats['subnet_count'],
+            'total_ips': stats['total_ips'],
             'used': used_ips,
             'reserved': reserved_ips,
-            'available': max(0, available_ips),
+            'available': max(0, total_capacity - used_ips - reserved_ips),
             'total_capacity': total_capacity,
             'utilization': round((used_ips / total_capacity * 100) if total_capacity > 0 else 0, 2)
         })
@@ -4421,36 +8172,25 @@ def api_section_statistics(section_id):
 def api_section_top_subnets(section_id):
     """Get top subnets by utilization for a specific section"""
     try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        
         connection = get_db_connection()
         if not connection:
             return jsonify({'error': 'Database connection failed'}), 500
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get top subnets for this section with IP counts
+        # Precomputed counters: a backward range read of idx_section_utilization
         cursor.execute("""
-            SELECT 
-                s.id,
-                s.subnet,
-                s.description,
-                COUNT(ip.id) as used_count,
-                (POWER(2, (32 - CAST(SUBSTRING_INDEX(s.subnet, '/', -1) AS UNSIGNED))) - 2) as capacity
-            FROM subnets s
-            LEFT JOIN ip_addresses ip ON s.id = ip.subnet_id AND ip.status = 'Active'
-            WHERE s.section_id = %s
-            GROUP BY s.id, s.subnet, s.description
-            ORDER BY (COUNT(ip.id) / (POWER(2, (32 - CAST(SUBSTRING_INDEX(s.subnet, '/', -1) AS UNSIGNED))) - 2)) DESC
-            LIMIT 10
-        """, (section_id,))
+            SELECT id, subnet, description, used_count, reserved_count, capacity, utilization, counters_updated_at
+            FROM subnets
+            WHERE section_id = %s AND utilization IS NOT NULL
+            ORDER BY utilization DESC
+            LIMIT %s
+        """, (section_id, limit))
         
         subnets = cursor.fetchall()
-        
-        # Calculate utilization percentage
         for subnet in subnets:
-            if subnet['capacity'] > 0:
-                subnet['utilization'] = round((subnet['used_count'] / subnet['capacity']) * 100, 1)
-            else:
-                subnet['utilization'] = 0
             subnet['used'] = subnet['used_count']
             
         cursor.close()
@@ -4472,20 +8212,15 @@ def api_section_subnets(section_id):
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get subnets for this section
+        # Get subnets for this section with their precomputed counters
         cursor.execute("""
-            SELECT 
-                s.*,
-                COUNT(ip.id) as used_ips,
-                (POWER(2, (32 - CAST(SUBSTRING_INDEX(s.subnet, '/', -1) AS UNSIGNED))) - 2) as capacity
+            SELECT s.*, s.used_count as used_ips
             FROM subnets s
-            LEFT JOIN ip_addresses ip ON s.id = ip.subnet_id AND ip.status = 'Active'
             WHERE s.section_id = %s
-            GROUP BY s.id
-            ORDER BY s.subnet
+            ORDER BY s.network_bin
         """, (section_id,))
         
-        subnets = cursor.fetchall()
+        subnets = decode_address_columns(cursor.fetchall())
         
         cursor.close()
         connection.close()
@@ -4499,18 +8234,7 @@ def api_section_subnets(section_id):
 def get_section_by_id(section_id):
     """Helper function to get section by ID"""
     try:
-        connection = get_db_connection()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM network_sections WHERE id = %s", (section_id,))
-        section = cursor.fetchone()
-        
-        cursor.close()
-        connection.close()
-        
-        return section
+        return section_cache.by_id(section_id)
         
     except Exception as e:
         print(f"❌ Error getting section by ID: {e}")
@@ -4525,6 +8249,13 @@ if __name__ == '__main__':
     # Initialize database
     init_database()
     
+    # With the debug reloader only the child process serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_utilization_sampler()
+        alert_engine.start()  # Re-sends notifications left undelivered by the previous run
+        if app.config['WEBHOOK_DESTINATIONS']:
+            webhook_dispatcher.wake()  # Pick up events left pending by the previous run
+    
     print("\n🌐 Server URLs:")
     print("   Main (IP Management): http://127.0.0.1:5005")
     print("   IP Management:        http://127.0.0.1:5005/ip-management")
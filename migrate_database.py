@@ -1,11 +1,29 @@
 """
-Database Migration Script for Network Sections Support
-This script adds section_id columns and foreign key relationships to existing tables
+Versioned Database Migrations for IPAM System
+Applies ordered schema migrations recorded in schema_migrations. ALTERs run in place without
+blocking writes where MySQL allows it, and data changes run as throttled, resumable batches.
+
+Usage:
+    python migrate_database.py              Apply all pending migrations
+    python migrate_database.py --status     List applied and pending migrations
+    python migrate_database.py --to N       Apply pending migrations up to version N
+    python migrate_database.py --archive-section NAME   Move a section into its archive partition
+    python migrate_database.py --restore-section NAME   Move an archived section back
+    python migrate_database.py --drop-archive NAME      Delete an archived section for good
+    python migrate_database.py --archived               List archived sections
 """
 
+import sys
+import time
+
 import mysql.connector
 from mysql.connector import Error
 
+from main_server import (SQL_ADDRESS_BIN, SQL_DERIVED_STATUS, subnet_bounds_sql, refresh_stale_subnet_counters,
+                         refresh_subnet_counters, ARCHIVE_TABLES, ARCHIVE_TABLE_DDL, archive_partition_name,
+                         archived_sections, alert_engine, WEBHOOK_OUTBOX_DDL, record_changes,
+                         CHANGE_LOG_SEQUENCE_DDL, CHANGE_LOG_SEQUENCE_SEED)
+
 # Database Configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -14,6 +32,24 @@ DB_CONFIG = {
     'database': 'ipam_db'
 }
 
+# Online migration settings
+BACKFILL_BATCH_SIZE = 1000          # Starting rows (id range) per batch
+BACKFILL_MAX_BATCH_SIZE = 20000
+BACKFILL_TARGET_SECONDS = 0.5       # Batches slower than this shrink, faster ones grow
+BACKFILL_THROTTLE_SECONDS = 0.05    # Pause between batches so foreground writes get the locks
+BACKFILL_MAX_THREADS_RUNNING = 50   # Back off while the server is this busy
+LOCK_WAIT_TIMEOUT = 5               # Seconds an ALTER may wait for its metadata lock before giving up
+
+MIGRATIONS = []
+
+def migration(version, name):
+    """Register a migration function; versions are applied in ascending order"""
+    def register(function):
+        MIGRATIONS.append((version, name, function))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return function
+    return register
+
 def get_db_connection():
     """Get database connection"""
     try:
@@ -23,139 +59,604 @@ def get_db_connection():
         print(f"❌ Database connection error: {e}")
         return None
 
-def migrate_database():
-    """Migrate database to support network sections"""
-    try:
-        connection = get_db_connection()
-        if not connection:
-            return False
-            
-        cursor = connection.cursor()
-        
-        print("🔧 Starting database migration for Network Sections support...")
-        
-        # 1. Add section_id column to subnets table if it doesn't exist
-        try:
-            cursor.execute("SHOW COLUMNS FROM subnets LIKE 'section_id'")
-            if not cursor.fetchone():
-                print("📝 Adding section_id column to subnets table...")
-                cursor.execute("ALTER TABLE subnets ADD COLUMN section_id INT AFTER description")
-                cursor.execute("CREATE INDEX idx_section_id_subnets ON subnets (section_id)")
-                print("✅ Added section_id column to subnets table")
-            else:
-                print("✅ section_id column already exists in subnets table")
-        except Error as e:
-            print(f"❌ Error adding section_id to subnets: {e}")
-        
-        # 2. Add section_id column to ip_inventory table if it doesn't exist
-        try:
-            cursor.execute("SHOW COLUMNS FROM ip_inventory LIKE 'section_id'")
-            if not cursor.fetchone():
-                print("📝 Adding section_id column to ip_inventory table...")
-                cursor.execute("ALTER TABLE ip_inventory ADD COLUMN section_id INT AFTER subnet")
-                cursor.execute("CREATE INDEX idx_section_id_ip ON ip_inventory (section_id)")
-                print("✅ Added section_id column to ip_inventory table")
-            else:
-                print("✅ section_id column already exists in ip_inventory table")
-        except Error as e:
-            print(f"❌ Error adding section_id to ip_inventory: {e}")
-        
-        # 3. Drop the existing unique constraint on ip_address if it exists
-        try:
-            cursor.execute("SHOW INDEX FROM ip_inventory WHERE Key_name = 'ip_address'")
-            if cursor.fetchone():
-                print("📝 Dropping old unique constraint on ip_address...")
-                cursor.execute("ALTER TABLE ip_inventory DROP INDEX ip_address")
-                print("✅ Dropped old unique constraint")
-            else:
-                print("✅ No old unique constraint to drop")
-        except Error as e:
-            print(f"⚠️  Note: Could not drop old unique constraint: {e}")
-        
-        # 4. Add new composite unique constraint for ip_address + section_id
-        try:
-            cursor.execute("SHOW INDEX FROM ip_inventory WHERE Key_name = 'unique_ip_section'")
-            if not cursor.fetchone():
-                print("📝 Adding composite unique constraint for ip_address + section_id...")
-                cursor.execute("ALTER TABLE ip_inventory ADD UNIQUE KEY unique_ip_section (ip_address, section_id)")
-                print("✅ Added composite unique constraint")
-            else:
-                print("✅ Composite unique constraint already exists")
-        except Error as e:
-            print(f"⚠️  Note: Could not add composite unique constraint: {e}")
-        
-        # 5. Add unique constraint for subnet + section_id in subnets table
-        try:
-            cursor.execute("SHOW INDEX FROM subnets WHERE Key_name = 'unique_subnet_section'")
-            if not cursor.fetchone():
-                print("📝 Adding composite unique constraint for subnet + section_id...")
-                cursor.execute("ALTER TABLE subnets ADD UNIQUE KEY unique_subnet_section (subnet, section_id)")
-                print("✅ Added subnet composite unique constraint")
-            else:
-                print("✅ Subnet composite unique constraint already exists")
-        except Error as e:
-            print(f"⚠️  Note: Could not add subnet composite unique constraint: {e}")
-        
-        # 6. Try to add foreign key constraints (might fail if data doesn't match)
+# ================== SCHEMA HELPERS ==================
+def ensure_migration_tables(cursor):
+    """Create the version and checkpoint tables"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(200) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migration_checkpoints (
+            version INT NOT NULL,
+            step VARCHAR(100) NOT NULL,
+            last_id BIGINT NOT NULL DEFAULT 0,
+            rows_done BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (version, step)
+        )
+    """)
+
+def applied_versions(cursor):
+    """Versions already recorded in schema_migrations"""
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def table_exists(cursor, table):
+    cursor.execute("SHOW TABLES LIKE %s", (table,))
+    return cursor.fetchone() is not None
+
+def column_exists(cursor, table, column):
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE %s", (column,))
+    return cursor.fetchone() is not None
+
+def index_exists(cursor, table, index):
+    cursor.execute(f"SHOW INDEX FROM {table} WHERE Key_name = %s", (index,))
+    return cursor.fetchone() is not None
+
+def online_alter(cursor, table, clauses, lock='NONE', allow_copy=False):
+    """ALTER TABLE without blocking writes where MySQL allows it.
+
+    Tries ALGORITHM=INSTANT, then ALGORITHM=INPLACE with the given LOCK. A table copy (which blocks
+    writes for the whole rebuild) only happens when allow_copy is set. lock_wait_timeout is kept
+    short so a waiting ALTER does not queue every other query behind its metadata lock.
+    """
+    statement = f"ALTER TABLE {table} " + ", ".join(clauses)
+    cursor.execute(f"SET SESSION lock_wait_timeout = {LOCK_WAIT_TIMEOUT}")
+    for algorithm in ('ALGORITHM=INSTANT', f'ALGORITHM=INPLACE, LOCK={lock}'):
         try:
-            cursor.execute("SHOW CREATE TABLE subnets")
-            table_def = cursor.fetchone()[1]
-            if 'FOREIGN KEY' not in table_def or 'section_id' not in table_def:
-                print("📝 Adding foreign key constraint for subnets.section_id...")
-                cursor.execute("""
-                    ALTER TABLE subnets 
-                    ADD CONSTRAINT fk_subnets_section 
-                    FOREIGN KEY (section_id) REFERENCES network_sections(id) 
-                    ON DELETE SET NULL
-                """)
-                print("✅ Added foreign key constraint for subnets")
-            else:
-                print("✅ Foreign key constraint already exists for subnets")
+            cursor.execute(f"{statement}, {algorithm}")
+            print(f"   ✅ {table}: {algorithm}")
+            return
         except Error as e:
-            print(f"⚠️  Could not add foreign key for subnets (data might exist): {e}")
-        
+            # 1845/1846: algorithm or lock level not supported for this change
+            if e.errno not in (1845, 1846):
+                raise
+    if not allow_copy:
+        raise Error(msg=f"ALTER on {table} needs a table copy; rerun it in a maintenance window")
+    print(f"   ⚠️  {table}: falling back to a table copy (writes wait until it finishes)")
+    cursor.execute(statement)
+
+def throttle(cursor):
+    """Pause between batches, longer while the server is busy"""
+    time.sleep(BACKFILL_THROTTLE_SECONDS)
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running'")
+    row = cursor.fetchone()
+    while row and int(row[1]) > BACKFILL_MAX_THREADS_RUNNING:
+        time.sleep(1)
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running'")
+        row = cursor.fetchone()
+
+def run_batches(connection, version, step, table, statement, params=()):
+    """Run statement over id ranges (id > %s AND id <= %s come first in its parameters).
+
+    Each batch commits together with its checkpoint, so an interrupted run resumes after the last
+    finished batch. The batch size adapts to BACKFILL_TARGET_SECONDS. Rows inserted after the run
+    starts are beyond max_id and are already written by the current code.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT last_id, rows_done FROM schema_migration_checkpoints
+        WHERE version = %s AND step = %s
+    """, (version, step))
+    checkpoint = cursor.fetchone()
+    last_id, rows_done = checkpoint if checkpoint else (0, 0)
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    max_id = cursor.fetchone()[0]
+    if last_id:
+        print(f"   ↪️  Resuming {step} after id {last_id} ({rows_done} rows done)")
+
+    batch_size = BACKFILL_BATCH_SIZE
+    while last_id < max_id:
+        upper = min(last_id + batch_size, max_id)
+        started = time.perf_counter()
+        cursor.execute(statement, [last_id, upper] + list(params))
+        rows_done += max(cursor.rowcount, 0)
+        cursor.execute("""
+            INSERT INTO schema_migration_checkpoints (version, step, last_id, rows_done)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), rows_done = VALUES(rows_done)
+        """, (version, step, upper, rows_done))
+        connection.commit()
+        last_id = upper
+
+        elapsed = time.perf_counter() - started
+        if elapsed > BACKFILL_TARGET_SECONDS:
+            batch_size = max(100, batch_size // 2)
+        elif elapsed < BACKFILL_TARGET_SECONDS / 4:
+            batch_size = min(BACKFILL_MAX_BATCH_SIZE, batch_size * 2)
+        print(f"   ... {step}: id {last_id}/{max_id}, {rows_done} rows")
+        throttle(cursor)
+    cursor.close()
+    return rows_done
+
+def backfill(connection, version, step, table, assignments, where='1=1', params=(), ignore=False):
+    """UPDATE table SET assignments WHERE where, in throttled id batches"""
+    statement = (f"UPDATE {'IGNORE ' if ignore else ''}{table} SET {assignments} "
+                 f"WHERE id > %s AND id <= %s AND ({where})")
+    return run_batches(connection, version, step, table, statement, params)
+
+def copy_rows(connection, version, step, source, target, columns, where='1=1', params=()):
+    """INSERT IGNORE rows from source into target, in throttled id batches"""
+    column_list = ', '.join(columns)
+    statement = f"""
+        INSERT IGNORE INTO {target} ({column_list})
+        SELECT {column_list} FROM {source} WHERE id > %s AND id <= %s AND ({where})
+    """
+    return run_batches(connection, version, step, source, statement, params)
+
+# ================== MIGRATIONS ==================
+@migration(1, 'Add section_id to subnets and ip_inventory')
+def add_section_ids(connection, cursor):
+    for table, index in (('subnets', 'idx_section_id_subnets'), ('ip_inventory', 'idx_section_id_ip')):
+        if not column_exists(cursor, table, 'section_id'):
+            after = 'description' if table == 'subnets' else 'subnet'
+            online_alter(cursor, table, [f"ADD COLUMN section_id INT AFTER {after}",
+                                         f"ADD INDEX {index} (section_id)"])
+
+@migration(2, 'Make IP and subnet uniqueness per section')
+def add_section_unique_keys(connection, cursor):
+    clauses = []
+    if index_exists(cursor, 'ip_inventory', 'ip_address'):
+        clauses.append("DROP INDEX ip_address")
+    if not index_exists(cursor, 'ip_inventory', 'unique_ip_section'):
+        clauses.append("ADD UNIQUE KEY unique_ip_section (ip_address, section_id)")
+    if clauses:
+        online_alter(cursor, 'ip_inventory', clauses)
+    if not index_exists(cursor, 'subnets', 'unique_subnet_section'):
+        online_alter(cursor, 'subnets', ["ADD UNIQUE KEY unique_subnet_section (subnet, section_id)"])
+
+@migration(3, 'Add section foreign keys')
+def add_section_foreign_keys(connection, cursor):
+    for table, constraint in (('subnets', 'fk_subnets_section'), ('ip_inventory', 'fk_ip_inventory_section')):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLE_CONSTRAINTS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+        """, (table,))
+        if cursor.fetchone()[0]:
+            continue
+        # Clear orphaned section ids first (what ON DELETE SET NULL would have done)
+        backfill(connection, 3, f'{table}_orphans', table, 'section_id = NULL',
+                 'section_id IS NOT NULL AND section_id NOT IN (SELECT id FROM network_sections)')
+        # With checks off the constraint is added in place instead of by copying the table
+        cursor.execute("SET SESSION foreign_key_checks = 0")
         try:
-            cursor.execute("SHOW CREATE TABLE ip_inventory")
-            table_def = cursor.fetchone()[1]
-            if 'FOREIGN KEY' not in table_def or 'section_id' not in table_def:
-                print("📝 Adding foreign key constraint for ip_inventory.section_id...")
-                cursor.execute("""
-                    ALTER TABLE ip_inventory 
-                    ADD CONSTRAINT fk_ip_inventory_section 
-                    FOREIGN KEY (section_id) REFERENCES network_sections(id) 
-                    ON DELETE SET NULL
-                """)
-                print("✅ Added foreign key constraint for ip_inventory")
-            else:
-                print("✅ Foreign key constraint already exists for ip_inventory")
-        except Error as e:
-            print(f"⚠️  Could not add foreign key for ip_inventory (data might exist): {e}")
-        
+            online_alter(cursor, table, [f"ADD CONSTRAINT {constraint} FOREIGN KEY (section_id) "
+                                         "REFERENCES network_sections(id) ON DELETE SET NULL"])
+        finally:
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+
+@migration(4, 'IPv6 address model: wide address columns and 128-bit ip_bin / network_bin')
+def add_address_model(connection, cursor):
+    # Generated columns are VIRTUAL (as in init_database): adding a STORED one copies the table, while a
+    # virtual column is instant and its index is built online (queries read the values from the index)
+    network_bin, broadcast_bin = subnet_bounds_sql('subnet')
+    if not column_exists(cursor, 'ip_inventory', 'ip_bin'):
+        online_alter(cursor, 'ip_inventory', [
+            "MODIFY ip_address VARCHAR(45) NOT NULL",
+            "MODIFY subnet VARCHAR(49) NOT NULL",
+            "ADD COLUMN ip_family TINYINT AS (IF(IS_IPV6(ip_address), 6, 4)) VIRTUAL",
+            f"ADD COLUMN ip_bin VARBINARY(16) AS ({SQL_ADDRESS_BIN.format('ip_address')}) VIRTUAL"
+        ])
+    if not index_exists(cursor, 'ip_inventory', 'idx_ip_bin'):
+        online_alter(cursor, 'ip_inventory', ["ADD INDEX idx_ip_bin (ip_bin)"])
+
+    if not column_exists(cursor, 'subnets', 'network_bin'):
+        online_alter(cursor, 'subnets', [
+            "MODIFY subnet VARCHAR(49) NOT NULL",
+            "MODIFY master_subnet VARCHAR(49)",
+            "ADD COLUMN ip_family TINYINT AS (IF(IS_IPV6(SUBSTRING_INDEX(subnet, '/', 1)), 6, 4)) VIRTUAL",
+            f"ADD COLUMN network_bin VARBINARY(16) AS ({network_bin}) VIRTUAL",
+            f"ADD COLUMN broadcast_bin VARBINARY(16) AS ({broadcast_bin}) VIRTUAL"
+        ])
+    if not index_exists(cursor, 'subnets', 'idx_network_range'):
+        online_alter(cursor, 'subnets', ["ADD INDEX idx_network_range (network_bin, broadcast_bin)"])
+
+    # Small bookkeeping tables; a copy is acceptable if MySQL needs one
+    for table, columns in (('change_log', ['ip_address VARCHAR(45)', 'subnet VARCHAR(49)']),
+                           ('subnet_alerts', ['subnet VARCHAR(49) NOT NULL', 'capacity DECIMAL(39,0) NOT NULL DEFAULT 0']),
+                           ('utilization_history', ['capacity DECIMAL(39,0) NOT NULL DEFAULT 0']),
+                           ('capacity_forecasts', ['capacity DECIMAL(39,0) NOT NULL DEFAULT 0'])):
+        if table_exists(cursor, table):
+            online_alter(cursor, table, [f"MODIFY {column}" for column in columns], allow_copy=True)
+
+@migration(5, 'Full-text search index')
+def add_search_index(connection, cursor):
+    if not index_exists(cursor, 'ip_inventory', 'ft_search'):
+        # InnoDB cannot build a FULLTEXT index with LOCK=NONE; reads continue, writes wait
+        online_alter(cursor, 'ip_inventory',
+                     ["ADD FULLTEXT INDEX ft_search (hostname, description, vrf_vpn) WITH PARSER ngram"],
+                     lock='SHARED')
+
+@migration(6, 'Indexed derived_status column')
+def add_derived_status(connection, cursor):
+    if not column_exists(cursor, 'ip_inventory', 'derived_status'):
+        online_alter(cursor, 'ip_inventory', [
+            f"ADD COLUMN derived_status ENUM('used', 'available', 'reserved') AS ({SQL_DERIVED_STATUS}) VIRTUAL"
+        ])
+    if not index_exists(cursor, 'ip_inventory', 'idx_subnet_derived_status'):
+        online_alter(cursor, 'ip_inventory', ["ADD INDEX idx_subnet_derived_status (subnet, derived_status)"])
+
+@migration(7, 'Canonical text form for IPv6 addresses')
+def canonicalize_ipv6(connection, cursor):
+    # Exact-match lookups compare ip_address text; store IPv6 the way Python's ipaddress prints it.
+    # IGNORE leaves a row alone if its canonical form already exists in the same section.
+    backfill(connection, 7, 'ipv6_text', 'ip_inventory', 'ip_address = INET6_NTOA(INET6_ATON(ip_address))',
+             "IS_IPV6(ip_address) AND BINARY ip_address != INET6_NTOA(INET6_ATON(ip_address))", ignore=True)
+
+@migration(8, 'Index section counts by derived_status')
+def add_section_status_index(connection, cursor):
+    if not index_exists(cursor, 'ip_inventory', 'idx_section_derived_status'):
+        online_alter(cursor, 'ip_inventory', ["ADD INDEX idx_section_derived_status (section_id, derived_status)"])
+
+@migration(9, 'Per-subnet usage counters and section-scoped indexes')
+def add_subnet_counters(connection, cursor):
+    if not column_exists(cursor, 'subnets', 'counters_updated_at'):
+        online_alter(cursor, 'subnets', [
+            "ADD COLUMN used_count INT NOT NULL DEFAULT 0",
+            "ADD COLUMN reserved_count INT NOT NULL DEFAULT 0",
+            "ADD COLUMN capacity DECIMAL(39,0)",
+            "ADD COLUMN utilization DECIMAL(5,2)",
+            "ADD COLUMN counters_updated_at DATETIME"
+        ])
+    if not index_exists(cursor, 'subnets', 'idx_section_utilization'):
+        online_alter(cursor, 'subnets', ["ADD INDEX idx_section_utilization (section_id, utilization)"])
+    if not index_exists(cursor, 'ip_inventory', 'idx_section_subnet_status'):
+        online_alter(cursor, 'ip_inventory', ["ADD INDEX idx_section_subnet_status (section_id, subnet, derived_status)"])
+    # Section-wide counts read the wider covering index now
+    if index_exists(cursor, 'ip_inventory', 'idx_section_derived_status'):
+        online_alter(cursor, 'ip_inventory', ["DROP INDEX idx_section_derived_status"])
+
+    counter_cursor = connection.cursor(dictionary=True)
+    print(f"   ✅ subnets: counted {refresh_stale_subnet_counters(counter_cursor)} subnets")
+    counter_cursor.close()
+
+@migration(10, 'Partitioned section archive tables')
+def add_archive_tables(connection, cursor):
+    for ddl in ARCHIVE_TABLE_DDL.values():
+        cursor.execute(ddl)
+
+@migration(11, 'Change feed indexes on change_log')
+def add_change_feed_indexes(connection, cursor):
+    clauses = [f"ADD INDEX {index} ({column}, id)"
+               for index, column in (('idx_section_seq', 'section_id'), ('idx_subnet_seq', 'subnet'), ('idx_vrf_seq', 'vrf_vpn'))
+               if not index_exists(cursor, 'change_log', index)]
+    if clauses:
+        online_alter(cursor, 'change_log', clauses)
+
+@migration(12, 'Webhook outbox')
+def add_webhook_outbox(connection, cursor):
+    cursor.execute(WEBHOOK_OUTBOX_DDL)
+
+@migration(13, 'Pending alert notifications')
+def add_pending_alert_notifications(connection, cursor):
+    if not column_exists(cursor, 'subnet_alerts', 'pending_event'):
+        online_alter(cursor, 'subnet_alerts', [
+            "ADD COLUMN pending_event ENUM('triggered', 'reminder', 'resolved')",
+            "ADD COLUMN pending_at DATETIME",
+            "ADD INDEX idx_pending (pending_event, pending_at)"
+        ])
+
+@migration(14, 'Commit-ordered change_log ids')
+def add_change_log_sequence(connection, cursor):
+    cursor.execute(CHANGE_LOG_SEQUENCE_DDL)
+    cursor.execute(CHANGE_LOG_SEQUENCE_SEED)
+
+# ================== RUNNER ==================
+def migrate_database(target=None):
+    """Apply pending migrations in version order; stops at the first failure"""
+    connection = get_db_connection()
+    if not connection:
+        return False
+    cursor = connection.cursor()
+    try:
+        ensure_migration_tables(cursor)
         connection.commit()
-        cursor.close()
-        connection.close()
-        
+        done = applied_versions(cursor)
+        pending = [entry for entry in MIGRATIONS if entry[0] not in done and (target is None or entry[0] <= target)]
+        if not pending:
+            print("✅ Database schema is up to date")
+            return True
+
+        for version, name, function in pending:
+            print(f"📝 [{version}] {name}...")
+            started = time.perf_counter()
+            function(connection, cursor)
+            cursor.execute("""
+                INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)
+            """, (version, name, int((time.perf_counter() - started) * 1000)))
+            cursor.execute("DELETE FROM schema_migration_checkpoints WHERE version = %s", (version,))
+            connection.commit()
+            print(f"✅ [{version}] done")
+
         print("🎉 Database migration completed successfully!")
         return True
-        
+
     except Error as e:
+        connection.rollback()
         print(f"❌ Database migration error: {e}")
+        print("   Completed migrations and batch checkpoints are kept; rerun to resume")
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+def print_status():
+    """List migrations with their applied time"""
+    connection = get_db_connection()
+    if not connection:
+        return
+    cursor = connection.cursor()
+    ensure_migration_tables(cursor)
+    cursor.execute("SELECT version, applied_at FROM schema_migrations")
+    applied = dict(cursor.fetchall())
+    for version, name, _ in MIGRATIONS:
+        state = f"applied {applied[version]}" if version in applied else "pending"
+        print(f"   {'✅' if version in applied else '⏳'} {version:>3}  {name}  ({state})")
+    cursor.close()
+    connection.close()
+
+# ================== SECTION ARCHIVE ==================
+# Archive and restore runs keep their batch checkpoints under this pseudo version
+ARCHIVE_CHECKPOINT_VERSION = 0
+
+def find_section(cursor, name):
+    cursor.execute("SELECT id FROM network_sections WHERE name = %s", (name,))
+    row = cursor.fetchone()
+    if not row:
+        raise Error(msg=f"Section '{name}' not found")
+    return row[0]
+
+def partition_exists(cursor, table, partition):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME = %s
+    """, (table, partition))
+    return cursor.fetchone() is not None
+
+def clear_checkpoints(connection, cursor, section_id):
+    cursor.execute("""
+        DELETE FROM schema_migration_checkpoints WHERE version = %s AND step LIKE %s
+    """, (ARCHIVE_CHECKPOINT_VERSION, f"%:{section_id}:%"))
+    connection.commit()
+
+# Live table -> (column naming a row in conflict reports, change_log fields read from the archive copy)
+ARCHIVE_CHANGE_FIELDS = {
+    'ip_inventory': ('ip_address', "'ip' as entity_type, id as entity_id, ip_address, subnet, section_id, "
+                                   "status, vrf_vpn, hostname, description"),
+    'subnets': ('subnet', "'subnet' as entity_type, id as entity_id, NULL as ip_address, subnet, section_id, "
+                          "NULL as status, vrf as vrf_vpn, NULL as hostname, description")
+}
+
+def log_archived_rows(connection, action, table, section_id):
+    """Write change_log rows (and webhook events) for a section's archived rows, in checkpointed batches"""
+    archive = ARCHIVE_TABLES[table][0]
+    step = f"log-{action}:{section_id}:{table}"
+    cursor = connection.cursor(dictionary=True)
+    status_cursor = connection.cursor()
+    cursor.execute("""
+        SELECT last_id, rows_done FROM schema_migration_checkpoints
+        WHERE version = %s AND step = %s
+    """, (ARCHIVE_CHECKPOINT_VERSION, step))
+    checkpoint = cursor.fetchone() or {'last_id': 0, 'rows_done': 0}
+    last_id, rows_done = checkpoint['last_id'], checkpoint['rows_done']
+
+    while True:
+        cursor.execute(f"""
+            SELECT id, {ARCHIVE_CHANGE_FIELDS[table][1]}
+            FROM {archive}
+            WHERE section_id = %s AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (section_id, last_id, BACKFILL_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        record_changes(cursor, [dict(row, action=action, source='migration') for row in rows])
+        rows_done += len(rows)
+        cursor.execute("""
+            INSERT INTO schema_migration_checkpoints (version, step, last_id, rows_done)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), rows_done = VALUES(rows_done)
+        """, (ARCHIVE_CHECKPOINT_VERSION, step, last_id, rows_done))
+        connection.commit()
+        throttle(status_cursor)
+    status_cursor.close()
+    cursor.close()
+    return rows_done
+
+def restore_conflicts(cursor, table, section_id):
+    """Archived rows of the section that did not make it back into the live table"""
+    archive = ARCHIVE_TABLES[table][0]
+    key = ARCHIVE_CHANGE_FIELDS[table][0]
+    cursor.execute(f"""
+        SELECT archived.id, archived.{key}
+        FROM {archive} archived
+        LEFT JOIN {table} live ON live.id = archived.id AND live.section_id = archived.section_id
+        WHERE archived.section_id = %s AND live.id IS NULL
+        ORDER BY archived.id
+    """, (section_id,))
+    return cursor.fetchall()
+
+def archive_section(name):
+    """Move a section's subnets and addresses into its own archive partition.
+
+    Rows are copied in throttled id batches, then deleted from the live table only where the
+    archive copy exists, so an interrupted run can simply be repeated.
+    """
+    connection = get_db_connection()
+    if not connection:
+        return False
+    cursor = connection.cursor()
+    try:
+        ensure_migration_tables(cursor)
+        section_id = find_section(cursor, name)
+        partition = archive_partition_name(section_id)
+        cursor.execute("SELECT DISTINCT subnet FROM ip_inventory WHERE section_id = %s "
+                       "UNION SELECT subnet FROM subnets WHERE section_id = %s", (section_id, section_id))
+        subnets = [row[0] for row in cursor.fetchall()]
+
+        for table, (archive, columns) in ARCHIVE_TABLES.items():
+            if not partition_exists(cursor, archive, partition):
+                cursor.execute(f"ALTER TABLE {archive} ADD PARTITION (PARTITION {partition} VALUES IN ({section_id}))")
+            copied = copy_rows(connection, ARCHIVE_CHECKPOINT_VERSION, f"archive:{section_id}:{table}",
+                               table, archive, columns, 'section_id = %s', (section_id,))
+            log_archived_rows(connection, 'archive', table, section_id)
+            deleted = run_batches(connection, ARCHIVE_CHECKPOINT_VERSION, f"purge:{section_id}:{table}", table, f"""
+                DELETE live FROM {table} live
+                JOIN {archive} archived ON archived.section_id = live.section_id AND archived.id = live.id
+                WHERE live.id > %s AND live.id <= %s AND live.section_id = %s
+            """, (section_id,))
+            print(f"   ✅ {table}: {copied} rows archived, {deleted} removed from the live table")
+        clear_checkpoints(connection, cursor, section_id)
+
+        # Alerts for the moved subnets resolve once they are re-measured
+        if subnets:
+            alert_engine.evaluate(subnets)
+        print(f"🎉 Section '{name}' archived to partition {partition}")
+        return True
+
+    except Error as e:
+        connection.rollback()
+        print(f"❌ Archive error: {e}")
+        print("   Finished batches are kept; rerun to resume")
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+def restore_section(name):
+    """Copy an archived section back into the live tables and drop its archive partitions"""
+    connection = get_db_connection()
+    if not connection:
         return False
+    cursor = connection.cursor()
+    try:
+        ensure_migration_tables(cursor)
+        section_id = find_section(cursor, name)
+        partition = archive_partition_name(section_id)
+        subnets = []
+
+        for table, (archive, columns) in ARCHIVE_TABLES.items():
+            if not partition_exists(cursor, archive, partition):
+                continue
+            cursor.execute(f"SELECT DISTINCT subnet FROM {archive} WHERE section_id = %s", (section_id,))
+            subnets.extend(row[0] for row in cursor.fetchall())
+            restored = copy_rows(connection, ARCHIVE_CHECKPOINT_VERSION, f"restore:{section_id}:{table}",
+                                 archive, table, columns, 'section_id = %s', (section_id,))
+            print(f"   ✅ {table}: {restored} rows restored")
+
+        # INSERT IGNORE skips rows whose address or subnet has been reused in the live section meanwhile;
+        # keep the archive partitions until every archived row is back
+        conflicts = {table: restore_conflicts(cursor, table, section_id) for table in ARCHIVE_TABLES
+                     if partition_exists(cursor, ARCHIVE_TABLES[table][0], partition)}
+        if any(conflicts.values()):
+            for table, rows in conflicts.items():
+                for row_id, key in rows[:20]:
+                    print(f"   ❌ {table}: archived id {row_id} ({key}) conflicts with a live row")
+                if len(rows) > 20:
+                    print(f"   ... and {len(rows) - 20} more in {table}")
+            clear_checkpoints(connection, cursor, section_id)
+            print("   Archive partitions kept; resolve the conflicting live rows and rerun the restore")
+            return False
+
+        for table in ARCHIVE_TABLES:
+            if partition_exists(cursor, ARCHIVE_TABLES[table][0], partition):
+                log_archived_rows(connection, 'restore', table, section_id)
+
+        counter_cursor = connection.cursor(dictionary=True)
+        refresh_stale_subnet_counters(counter_cursor)
+        counter_cursor.close()
+        connection.commit()
+
+        for archive, _ in ARCHIVE_TABLES.values():
+            if partition_exists(cursor, archive, partition):
+                cursor.execute(f"ALTER TABLE {archive} DROP PARTITION {partition}")
+        clear_checkpoints(connection, cursor, section_id)
+
+        if subnets:
+            alert_engine.evaluate(set(subnets))
+        print(f"🎉 Section '{name}' restored")
+        return True
+
+    except Error as e:
+        connection.rollback()
+        print(f"❌ Restore error: {e}")
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+def drop_archive(name):
+    """Permanently delete an archived section (a metadata-only DROP PARTITION)"""
+    connection = get_db_connection()
+    if not connection:
+        return False
+    cursor = connection.cursor()
+    try:
+        section_id = find_section(cursor, name)
+        partition = archive_partition_name(section_id)
+        for archive, _ in ARCHIVE_TABLES.values():
+            if partition_exists(cursor, archive, partition):
+                cursor.execute(f"ALTER TABLE {archive} DROP PARTITION {partition}")
+                print(f"   🗑️  {archive}: dropped partition {partition}")
+        return True
+    except Error as e:
+        print(f"❌ Drop archive error: {e}")
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+def print_archive():
+    """List archived sections with approximate row counts"""
+    connection = get_db_connection()
+    if not connection:
+        return
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT id, name FROM network_sections")
+    names = {row['id']: row['name'] for row in cursor.fetchall()}
+    sections = archived_sections(cursor)
+    if not sections:
+        print("   No archived sections")
+    for entry in sections:
+        print(f"   📦 {names.get(entry['section_id'], entry['section_id'])}: "
+              f"~{entry['ips']} IPs, ~{entry['subnets']} subnets")
+    cursor.close()
+    connection.close()
 
 def main():
     """Main function"""
-    print("🚀 Database Migration for Network Sections")
+    print("🚀 IPAM Database Migrations")
     print("=" * 50)
-    
-    if migrate_database():
+
+    if '--status' in sys.argv:
+        print_status()
+        return
+
+    if '--archived' in sys.argv:
+        print_archive()
+        return
+
+    for flag, action in (('--archive-section', archive_section), ('--restore-section', restore_section),
+                         ('--drop-archive', drop_archive)):
+        if flag in sys.argv:
+            if not action(sys.argv[sys.argv.index(flag) + 1]):
+                sys.exit(1)
+            return
+
+    target = int(sys.argv[sys.argv.index('--to') + 1]) if '--to' in sys.argv else None
+    if migrate_database(target):
         print("✅ Migration completed successfully")
-        print("\n📊 Database is now ready for Network Sections feature!")
-        print("   - section_id columns added to subnets and ip_inventory tables")
-        print("   - Composite unique constraints added")
-        print("   - Foreign key relationships established")
         print("\n🔄 You can now run create_section_sample_data.py to create sample data")
     else:
         print("❌ Migration failed")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+"""
+Utilization Snapshot Job for IPAM System
+Records per-subnet, per-VRF, per-section and overall utilization into utilization_history,
+rolls 5-minute samples up to hourly and daily points, applies retention and refreshes
+capacity forecasts once per FORECAST_REFRESH_INTERVAL
+
+Usage:
+    python snapshot_utilization.py          # one sample (run from cron every 5 minutes)
+    python snapshot_utilization.py --loop   # keep sampling every IPAM_UTILIZATION_INTERVAL seconds
+"""
+
+import sys
+
+from main_server import app, run_utilization_snapshot, utilization_sampler_loop
+
+def main():
+    """Main function"""
+    print("🚀 IPAM Utilization Snapshot")
+    print("=" * 50)
+
+    if '--loop' in sys.argv[1:]:
+        print(f"🔄 Sampling every {app.config['UTILIZATION_SAMPLE_INTERVAL']} seconds (Ctrl+C to stop)")
+        utilization_sampler_loop()
+        return
+
+    try:
+        result = run_utilization_snapshot()
+    except Exception as e:
+        print(f"❌ Utilization snapshot failed: {e}")
+        sys.exit(1)
+
+    print(f"✅ Recorded {result['samples']} samples")
+    for resolution, rows in result['rolled_up'].items():
+        print(f"   - rolled up {resolution}: {rows} rows affected")
+    for resolution, rows in result['deleted'].items():
+        if rows:
+            print(f"   - pruned {resolution}: {rows} expired points")
+    if result['forecasts']:
+        print(f"📈 Forecasts refreshed: {', '.join(f'{scope}={count}' for scope, count in result['forecasts'].items())}")
+
+if __name__ == "__main__":
+    main()